@@ -0,0 +1,99 @@
+"""Requests/sec of the local HTTP API on localhost
+
+Starts the API in-process on a temporary planner and drives it from keep-alive
+client threads: first page of the list, the same page revalidated with
+If-None-Match (304), one task by id, and PATCH of a task's status.
+
+Run from the repo root: python -m benchmarks.bench_api [n_tasks] [seconds_per_scenario]
+"""
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_storage import make_tasks
+from planner.server import PlannerService, make_server
+from planner.storage import storage
+
+CLIENTS=[1, 8]
+SECONDS=2.0
+
+
+def worker(port, scenario, ids, stop, out):
+      conn=http.client.HTTPConnection("127.0.0.1", port)
+      etag=None
+      samples=[]
+      i=0
+      while not stop.is_set():
+            tid=ids[(i * 7919) % len(ids)]
+            headers={}
+            body=None
+            if scenario == "list":
+                  method, url="GET", "/tasks?sort=duedate&limit=50"
+            elif scenario == "list-304":
+                  method, url="GET", "/tasks?sort=duedate&limit=50"
+                  if etag:
+                        headers["If-None-Match"]=etag
+            elif scenario == "get":
+                  method, url="GET", "/tasks/" + tid
+            else:
+                  method, url="PATCH", "/tasks/" + tid
+                  body=json.dumps({"status": "Done" if i % 2 else "To Do"})
+                  headers["Content-Type"]="application/json"
+            start=time.perf_counter()
+            conn.request(method, url, body, headers)
+            resp=conn.getresponse()
+            resp.read()
+            samples.append(time.perf_counter() - start)
+            if resp.status >= 400:
+                  raise RuntimeError(f"{method} {url}: {resp.status}")
+            etag=resp.getheader("ETag")
+            i += 1
+      conn.close()
+      out.extend(samples)
+
+
+def run(port, scenario, ids, clients, seconds):
+      stop=threading.Event()
+      results=[[] for _ in range(clients)]
+      threads=[threading.Thread(target=worker, args=(port, scenario, ids, stop, results[c])) for c in range(clients)]
+      for t in threads:
+            t.start()
+      time.sleep(seconds)
+      stop.set()
+      for t in threads:
+            t.join()
+      samples=sorted(s for r in results for s in r)
+      return len(samples) / seconds, samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def main():
+      n=int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+      seconds=float(sys.argv[2]) if len(sys.argv) > 2 else SECONDS
+      with tempfile.TemporaryDirectory() as d:
+            path=os.path.join(d, "planner.json")
+            tasks=make_tasks(n)
+            storage(path).save(tasks)
+            ids=[t.id for t in tasks]
+            service=PlannerService(storage(path))
+            server=make_server(service, port=0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            port=server.server_address[1]
+            print(f"{n} tasks")
+            print(f"{'scenario':>10} {'clients':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+            try:
+                  for scenario in ("list", "list-304", "get", "patch"):
+                        for clients in CLIENTS:
+                              rps, p50, p99=run(port, scenario, ids, clients, seconds)
+                              print(f"{scenario:>10} {clients:>8} {rps:>9.0f} {p50 * 1000:>8.2f} {p99 * 1000:>8.2f}")
+            finally:
+                  server.shutdown()
+                  server.server_close()
+                  service.close()
+
+
+if __name__ == "__main__":
+      main()
@@ -0,0 +1,69 @@
+"""Backup size and time: full pretty-printed copies vs the delta BackupStore
+
+Simulates many backup generations with a small fraction of tasks edited,
+added or deleted between each one, then times restoring the newest one.
+
+Run from the repo root: python -m benchmarks.bench_backup [n_tasks] [generations]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from planner.backup import BackupStore
+from planner.core import Task, write_tasks_json
+from planner.storage import storage
+from benchmarks.bench_storage import make_tasks
+
+CHURN=0.01
+
+
+def dir_size(path: str) -> int:
+      return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+
+
+def mutate(tasks, rng):
+      for t in rng.sample(tasks, max(1, int(len(tasks) * CHURN))):
+            t.title += "*"
+      del tasks[rng.randrange(len(tasks))]
+      tasks.append(Task(str(uuid.uuid4()), "new", "Subject 0", "2026/05/05"))
+
+
+def run():
+      n=int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+      generations=int(sys.argv[2]) if len(sys.argv) > 2 else 50
+      rng=random.Random(42)
+      tasks=make_tasks(n)
+      start_time=datetime(2026, 1, 1)
+      with tempfile.TemporaryDirectory() as d:
+            full_dir=os.path.join(d, "full")
+            os.makedirs(full_dir)
+            store=BackupStore(os.path.join(d, "store"), keep_last=generations, keep_hourly=0, keep_daily=0)
+            full_time=store_time=0.0
+            for g in range(generations):
+                  mutate(tasks, rng)
+                  start=time.perf_counter()
+                  with open(os.path.join(full_dir, f"planner-{g}.json"), "w", encoding="utf-8") as f:
+                        write_tasks_json(tasks, f)
+                  full_time += time.perf_counter() - start
+                  start=time.perf_counter()
+                  store.backup(tasks, start_time + timedelta(minutes=g))
+                  store_time += time.perf_counter() - start
+            start=time.perf_counter()
+            old=storage(os.path.join(full_dir, f"planner-{generations - 1}.json")).load()
+            full_restore=time.perf_counter() - start
+            start=time.perf_counter()
+            new=store.restore()
+            store_restore=time.perf_counter() - start
+            assert [t.as_tuple() for t in old] == [t.as_tuple() for t in new]
+            print(f"{n} tasks, {generations} generations, {CHURN:.0%} churn")
+            print(f"  {'':>6} {'size MB':>9} {'backup ms/gen':>14} {'restore ms':>11}")
+            print(f"  {'full':>6} {dir_size(full_dir) / 1e6:>9.2f} {full_time / generations * 1000:>14.1f} {full_restore * 1000:>11.1f}")
+            print(f"  {'store':>6} {dir_size(store.root) / 1e6:>9.2f} {store_time / generations * 1000:>14.1f} {store_restore * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+      run()
@@ -0,0 +1,68 @@
+"""Load and refresh cost of date handling at 100k tasks
+
+Compares the strptime-per-call helpers the app used to have with the cached
+ordinal parser, for storage.load and for tagging every row the way
+refresh_table did before the table was virtualized.
+
+Run from the repo root: python -m benchmarks.bench_dates [n_tasks]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+from main import row_values
+from planner.core import dateformat, date_ordinal
+from planner.storage import storage
+from benchmarks.bench_storage import make_tasks
+
+
+def strptime_valid(s):
+      try:
+            datetime.strptime(s, dateformat)
+            return True
+      except Exception:
+            return False
+
+
+def strptime_row(t, index, today):
+      tags=["even" if index % 2 == 0 else "odd"]
+      try:
+            d=datetime.strptime(t.duedate, dateformat).date()
+      except Exception:
+            d=None
+      if d:
+            if d < today:
+                  tags.append("overdue")
+            elif d == today:
+                  tags.append("today")
+      return tags
+
+
+def timed(fn, *args):
+      start=time.perf_counter()
+      fn(*args)
+      return (time.perf_counter() - start) * 1000
+
+
+def run():
+      n=int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+      tasks=make_tasks(n)
+      dates=[t.duedate for t in tasks]
+      today=date.today()
+      print(f"{n} tasks")
+      print(f"  validate  strptime  {timed(lambda: [strptime_valid(d) for d in dates]):8.1f} ms")
+      print(f"  validate  ordinal   {timed(lambda: [date_ordinal(d) for d in dates]):8.1f} ms")
+      print(f"  refresh   strptime  {timed(lambda: [strptime_row(t, i, today) for i, t in enumerate(tasks)]):8.1f} ms")
+      print(f"  refresh   ordinal   {timed(lambda: [row_values(t, i, today.toordinal()) for i, t in enumerate(tasks)]):8.1f} ms")
+      print(f"  sort      string    {timed(lambda: sorted(tasks, key=lambda t: t.duedate)):8.1f} ms")
+      print(f"  sort      ordinal   {timed(lambda: sorted(tasks, key=lambda t: t.due_ord)):8.1f} ms")
+      with tempfile.TemporaryDirectory() as d:
+            path=os.path.join(d, "planner.json")
+            storage(path).save(tasks)
+            print(f"  load      storage   {timed(storage(path).load):8.1f} ms")
+
+
+if __name__ == "__main__":
+      run()
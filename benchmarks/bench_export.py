@@ -0,0 +1,56 @@
+"""Export throughput and peak memory for CSV, JSON Lines and iCalendar
+
+Streams from an in-memory task list (what the app exports) and from the SQLite engine's
+cursor (what the CLI exports). The peak is what tracemalloc sees during the export on
+top of the tasks already loaded; it should stay flat as the task count grows.
+
+Run from the repo root: python -m benchmarks.bench_export [n_tasks ...]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.synth import generate
+from planner.export import EXPORT_FORMATS, export_file
+from planner.storage import sqlitestorage
+
+SIZES=[100_000, 1_000_000]
+
+
+def run_export(source, path, fmt, trace: bool):
+      if trace:
+            tracemalloc.start()
+      start=time.perf_counter()
+      n=export_file(source(), path, fmt)
+      secs=time.perf_counter() - start
+      peak=0
+      if trace:
+            peak=tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+      return n, secs, peak
+
+
+def main():
+      sizes=[int(a) for a in sys.argv[1:]] or SIZES
+      print(f"{'tasks':>9} {'source':>7} {'format':>6} {'secs':>7} {'rows/s':>10} {'MB/s':>7} {'peak MB':>8}")
+      with tempfile.TemporaryDirectory() as d:
+            for n in sizes:
+                  tasks=generate(n)
+                  db=sqlitestorage(os.path.join(d, f"planner-{n}.json"))
+                  db.save(tasks)
+                  sources={"memory": lambda: iter(tasks), "sqlite": db.iter}
+                  for name, source in sources.items():
+                        for fmt, (_, ext) in EXPORT_FORMATS.items():
+                              path=os.path.join(d, f"export-{n}{ext}")
+                              count, secs, _=run_export(source, path, fmt, False)
+                              assert count == n
+                              _, _, peak=run_export(source, path, fmt, True)
+                              size=os.path.getsize(path) / 1e6
+                              print(f"{n:>9} {name:>7} {fmt:>6} {secs:>7.2f} {n / secs:>10.0f} {size / secs:>7.1f} {peak / 1e6:>8.2f}", flush=True)
+                  db.close()
+
+
+if __name__ == "__main__":
+      main()
@@ -0,0 +1,41 @@
+"""Cold-start load time and file size of planner.json vs the compact .jsonl format
+
+Each load runs in a fresh interpreter so nothing is warm except the OS page cache.
+
+Run from the repo root: python -m benchmarks.bench_format [n_tasks ...]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+from planner.storage import storage
+from benchmarks.bench_storage import make_tasks
+
+SIZES=[10_000, 100_000, 1_000_000]
+LOAD="import time; from planner.storage import storage; t=time.perf_counter(); n=len(storage(%r).load()); print(n, time.perf_counter()-t)"
+
+
+def cold_load(path: str):
+      out=subprocess.run([sys.executable, "-c", LOAD % path], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+      n, secs=out.stdout.split()
+      return int(n), float(secs)
+
+
+def run():
+      sizes=[int(a) for a in sys.argv[1:]] or SIZES
+      print(f"{'tasks':>8} {'format':>6} {'size MB':>8} {'load ms':>9}")
+      with tempfile.TemporaryDirectory() as d:
+            for n in sizes:
+                  tasks=make_tasks(n)
+                  for ext in ("json", "jsonl"):
+                        path=os.path.join(d, f"planner-{n}.{ext}")
+                        storage(path).save(tasks)
+                        loaded, secs=cold_load(path)
+                        assert loaded == n
+                        print(f"{n:>8} {ext:>6} {os.path.getsize(path) / 1e6:>8.2f} {secs * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+      run()
@@ -0,0 +1,52 @@
+"""Bytes per task of the old dataclass Task vs the slotted Task
+
+Run from the repo root: python -m benchmarks.bench_memory [n_tasks]
+"""
+import gc
+import sys
+import tracemalloc
+import uuid
+from dataclasses import dataclass
+
+from planner.core import Task, statusoptions
+
+
+@dataclass
+class DataclassTask:
+      id: str
+      title: str
+      subject: str
+      duedate: str
+      status: str="To Do"
+
+
+def rows(n: int):
+      """Fresh strings per row, like json.load produces"""
+      for i in range(n):
+            yield (str(uuid.UUID(int=i)), f"Task {i}", "".join(["Subject ", str(i % 40)]),
+                   "".join(["2026/", f"{i % 12 + 1:02d}/", f"{i % 28 + 1:02d}"]), "".join(statusoptions[i % 3]))
+
+
+def measure(build, n: int) -> float:
+      gc.collect()
+      tracemalloc.start()
+      data=build(n)
+      size=tracemalloc.get_traced_memory()[0]
+      tracemalloc.stop()
+      del data
+      return size / n
+
+
+def run():
+      n=int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+      builders={
+            "dataclass": lambda n: [DataclassTask(*r) for r in rows(n)],
+            "slotted": lambda n: [Task(*r) for r in rows(n)],
+      }
+      print(f"{n} tasks")
+      for name, build in builders.items():
+            print(f"  {name:>10} {measure(build, n):8.1f} bytes/task")
+
+
+if __name__ == "__main__":
+      run()
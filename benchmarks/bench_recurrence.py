@@ -0,0 +1,63 @@
+"""Repeating tasks: stored size and window expansion vs storing every occurrence as a task
+
+Run from the repo root: python -m benchmarks.bench_recurrence [n_series]
+"""
+import json
+import sys
+import time
+from datetime import date
+
+from planner.core import TaskCollection, write_tasks_json
+from planner.recurrence import RecurringTasks, Series, recurrence_window
+
+SIZES=[10, 100, 1_000]
+DAYS=365
+
+
+class _Counter:
+      def __init__(self):
+            self.n=0
+      def write(self, s):
+            self.n += len(s)
+
+
+def make_series(n: int):
+      series=[]
+      for i in range(n):
+            s=Series(f"series-{i}", f"Revision {i}", f"Subject {i % 40}", "2026/01/01", "daily", 1, count=DAYS)
+            # a handful of exceptions each: some days done, one skipped
+            for d in range(0, DAYS, 30):
+                  s.overrides[s.start_ord + d]={"status": "Done"}
+            s.skip(s.start_ord + 100)
+            series.append(s)
+      return series
+
+
+def bench(n: int):
+      series=make_series(n)
+      stored=len(json.dumps([s.to_dict() for s in series]))
+      every=[o for s in series for o in s.expand(s.start_ord, s.start_ord + DAYS)]
+      out=_Counter()
+      write_tasks_json(every, out)
+      today=date(2026, 6, 1).toordinal()
+      tasks=TaskCollection()
+      recurring=RecurringTasks(series)
+      start=time.perf_counter()
+      recurring.show(tasks, recurrence_window(today))
+      first=time.perf_counter() - start
+      start=time.perf_counter()
+      recurring.show(tasks, recurrence_window(today + 1))
+      roll=time.perf_counter() - start
+      return stored, out.n, len(every), len(tasks), first, roll
+
+
+def main():
+      sizes=[int(sys.argv[1])] if len(sys.argv) > 1 else SIZES
+      print(f"{'series':>7} {'series KB':>10} {'as tasks KB':>12} {'tasks':>8} {'shown':>7} {'expand ms':>10} {'next day ms':>12}")
+      for n in sizes:
+            stored, flat, count, shown, first, roll=bench(n)
+            print(f"{n:>7} {stored / 1024:>10.1f} {flat / 1024:>12.1f} {count:>8} {shown:>7} {first * 1000:>10.1f} {roll * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+      main()
@@ -0,0 +1,42 @@
+"""Study schedule: full plan vs re-planning after a single task changes
+
+Run from the repo root: python -m benchmarks.bench_schedule [n_tasks]
+"""
+import sys
+import time
+
+from benchmarks.bench_storage import make_tasks
+from planner.schedule import SCHEDULE_MODES, StudySchedule
+
+SIZES=[1_000, 10_000, 100_000]
+CHANGES=100
+
+
+def bench(tasks, mode: str):
+      start=time.perf_counter()
+      plan=StudySchedule(4, mode=mode)
+      plan.rebuild(tasks)
+      full=time.perf_counter() - start
+      samples=[]
+      for i in range(CHANGES):
+            t=tasks[(i * 7919) % len(tasks)]
+            t.duedate=f"2026/{i % 12 + 1:02d}/{(i * 7) % 28 + 1:02d}"
+            start=time.perf_counter()
+            plan.update(t)
+            samples.append(time.perf_counter() - start)
+      samples.sort()
+      return full, samples[len(samples) // 2], samples[-1]
+
+
+def main():
+      sizes=[int(sys.argv[1])] if len(sys.argv) > 1 else SIZES
+      print(f"{'tasks':>8} {'mode':>12} {'plan ms':>9} {'replan med':>11} {'replan max':>11}")
+      for n in sizes:
+            tasks=make_tasks(n)
+            for mode in SCHEDULE_MODES:
+                  full, med, worst=bench(tasks, mode)
+                  print(f"{n:>8} {mode:>12} {full * 1000:>9.1f} {med * 1000:>11.2f} {worst * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+      main()
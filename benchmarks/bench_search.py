@@ -0,0 +1,79 @@
+"""Keystroke-to-render latency of live search
+
+Types a query one character at a time over a large planner and times each
+keystroke from the search entry to the rendered table. Without a display it
+falls back to timing the search + sort + visible-row work only.
+
+Run from the repo root: python -m benchmarks.bench_search [n_tasks]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import main
+from planner.core import SearchIndex
+from planner.storage import storage
+from benchmarks.bench_storage import make_tasks
+
+QUERIES=["subject 1", "task 99"]
+
+
+def linear_scan(tasks, q):
+      q=q.lower()
+      return [t for t in tasks if q in t.title.lower() or q in t.subject.lower()]
+
+
+def headless(tasks):
+      index=SearchIndex()
+      index.rebuild(tasks)
+      print(f"{'query':>12} {'scan ms':>10} {'index ms':>10} {'hits':>8}")
+      for query in QUERIES:
+            for i in range(1, len(query) + 1):
+                  q=query[:i]
+                  start=time.perf_counter()
+                  old=sorted(linear_scan(tasks, q), key=lambda t: t.duedate)[:14]
+                  mid=time.perf_counter()
+                  hits=index.search(q)
+                  new=sorted(hits, key=lambda t: t.duedate)[:14]
+                  end=time.perf_counter()
+                  assert [t.id for t in old] == [t.id for t in new]
+                  print(f"{q!r:>12} {(mid - start) * 1000:>10.2f} {(end - mid) * 1000:>10.2f} {len(hits):>8}")
+
+
+def with_tk(tasks, root):
+      with tempfile.TemporaryDirectory() as d:
+            main.DATA_FILE=os.path.join(d, "planner.json")
+            storage(main.DATA_FILE).save(tasks)
+            app=main.App(root)
+            root.update()
+            print(f"{'query':>12} {'render ms':>10}")
+            for query in QUERIES:
+                  app.search_var.set("")
+                  app._run_search()
+                  for i in range(1, len(query) + 1):
+                        app.search_var.set(query[:i])
+                        start=time.perf_counter()
+                        app._run_search()
+                        root.update_idletasks()
+                        print(f"{query[:i]!r:>12} {(time.perf_counter() - start) * 1000:>10.2f}")
+            app.persister.stop()
+            app.storage.close()
+
+
+def run():
+      n=int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+      tasks=make_tasks(n)
+      try:
+            root=main.Style(theme="minty").master
+            root.withdraw()
+      except main.tk.TclError:
+            print("no display, timing search without Tk")
+            headless(tasks)
+            return
+      with_tk(tasks, root)
+      root.destroy()
+
+
+if __name__ == "__main__":
+      run()
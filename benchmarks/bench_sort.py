@@ -0,0 +1,60 @@
+"""Sorting: full re-sort per edit vs the cached-key view that moves the edited row
+
+Run from the repo root: python -m benchmarks.bench_sort [n_tasks]
+"""
+import random
+import sys
+import time
+
+from benchmarks.bench_storage import make_tasks
+from planner.core import SortedView, TaskCollection, filter_sort, statusoptions
+
+SIZES=[100_000]
+SPECS=[
+      (("duedate", False),),
+      (("title", True),),
+      (("status", False), ("duedate", True), ("title", False)),
+]
+EDITS=200
+
+
+def bench(n: int, spec):
+      rng=random.Random(n)
+      tasks=TaskCollection()
+      view=SortedView()
+      tasks.subscribe(view.on_change)
+      tasks.load(make_tasks(n))
+      ids=[t.id for t in tasks]
+      start=time.perf_counter()
+      filter_sort(tasks, sort_key=spec)
+      full=time.perf_counter() - start
+      start=time.perf_counter()
+      view.set_spec(spec)
+      keyed=time.perf_counter() - start
+      samples=[]
+      for i in range(EDITS):
+            tid=rng.choice(ids)
+            start=time.perf_counter()
+            tasks.update(tid, status=rng.choice(statusoptions), title=f"Edited {i}", duedate=f"2026/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}")
+            filter_sort(tasks, sort_key=spec, view=view)
+            samples.append(time.perf_counter() - start)
+      samples.sort()
+      same=[t.id for t in view.rows] == [t.id for t in filter_sort(tasks, sort_key=spec)]
+      return full, keyed, samples[len(samples) // 2], same
+
+
+def main():
+      sizes=[int(sys.argv[1])] if len(sys.argv) > 1 else SIZES
+      print(f"{'tasks':>8} {'spec':<36} {'full ms':>8} {'rekey ms':>9} {'edit ms':>8}  check")
+      failed=False
+      for n in sizes:
+            for spec in SPECS:
+                  full, keyed, edit, same=bench(n, spec)
+                  label=",".join(("-" if desc else "") + col for col, desc in spec)
+                  print(f"{n:>8} {label:<36} {full * 1000:>8.1f} {keyed * 1000:>9.1f} {edit * 1000:>8.2f}  {'ok' if same else 'MISMATCH'}")
+                  failed=failed or not same
+      sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+      main()
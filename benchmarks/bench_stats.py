@@ -0,0 +1,61 @@
+"""Task statistics: running counters per edit vs a full recount, checked against each other
+
+Run from the repo root: python -m benchmarks.bench_stats [n_tasks]
+"""
+import random
+import sys
+import time
+
+from benchmarks.bench_storage import make_tasks
+from planner.core import TaskCollection, statusoptions
+from planner.stats import TaskStats
+
+SIZES=[1_000, 10_000, 100_000]
+EDITS=2_000
+
+
+def bench(n: int):
+      rng=random.Random(n)
+      tasks=TaskCollection()
+      stats=TaskStats()
+      tasks.subscribe(stats.on_change)
+      tasks.load(make_tasks(n))
+      start=time.perf_counter()
+      TaskStats.from_tasks(tasks)
+      full=time.perf_counter() - start
+      ids=[t.id for t in tasks]
+      extra=make_tasks(EDITS // 4)
+      start=time.perf_counter()
+      for i in range(EDITS):
+            op=i % 4
+            if op == 0:
+                  t=extra[i // 4]
+                  t.id="bench-" + t.id
+                  tasks.add(t)
+                  ids.append(t.id)
+            elif op == 1:
+                  j=rng.randrange(len(ids))
+                  ids[j], ids[-1]=ids[-1], ids[j]
+                  tasks.remove(ids.pop())
+            else:
+                  tasks.update(rng.choice(ids), status=rng.choice(statusoptions), duedate=f"2026/{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}")
+      per_edit=(time.perf_counter() - start) / EDITS
+      stats.set_today(stats.today + 3)
+      return full, per_edit, stats.verify(tasks)
+
+
+def main():
+      sizes=[int(sys.argv[1])] if len(sys.argv) > 1 else SIZES
+      print(f"{'tasks':>8} {'recount ms':>11} {'edit us':>9}  check")
+      failed=False
+      for n in sizes:
+            full, per_edit, diffs=bench(n)
+            print(f"{n:>8} {full * 1000:>11.1f} {per_edit * 1e6:>9.1f}  {'ok' if not diffs else 'MISMATCH'}")
+            for d in diffs:
+                  print("   ", d)
+            failed=failed or bool(diffs)
+      sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+      main()
@@ -0,0 +1,56 @@
+"""Save latency of the full-rewrite JSON storage vs the journal engine
+
+Run from the repo root: python -m benchmarks.bench_storage
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+from planner.core import Task, statusoptions
+from planner.storage import storage, journalstorage
+
+SIZES=[1_000, 10_000, 100_000]
+CLICKS=50
+
+
+def make_tasks(n: int):
+      return [Task(id=str(uuid.uuid4()), title=f"Task {i}", subject=f"Subject {i % 40}",
+                   duedate=f"2026/{i % 12 + 1:02d}/{i % 28 + 1:02d}", status=statusoptions[i % 3])
+              for i in range(n)]
+
+
+def toggle(t: Task):
+      t.status="To Do" if t.status == "Done" else "Done"
+
+
+def bench(engine, tasks, clicks: int):
+      """Time one checkbox toggle + persist, the way App._on_tree_click does it"""
+      engine.save(tasks)
+      samples=[]
+      for i in range(clicks):
+            t=tasks[(i * 7919) % len(tasks)]
+            toggle(t)
+            start=time.perf_counter()
+            engine.apply(tasks, changed=[t])
+            samples.append(time.perf_counter() - start)
+      engine.close()
+      samples.sort()
+      return samples[len(samples) // 2], samples[-1]
+
+
+def main():
+      clicks=int(sys.argv[1]) if len(sys.argv) > 1 else CLICKS
+      print(f"{'tasks':>8} {'engine':>8} {'median ms':>10} {'max ms':>10}")
+      with tempfile.TemporaryDirectory() as d:
+            for n in SIZES:
+                  tasks=make_tasks(n)
+                  for name, cls in (("json", storage), ("journal", journalstorage)):
+                        path=os.path.join(d, f"{name}-{n}.json")
+                        med, worst=bench(cls(path), tasks, clicks)
+                        print(f"{n:>8} {name:>8} {med * 1000:>10.2f} {worst * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+      main()
@@ -0,0 +1,69 @@
+"""Subject/tag filtering: TagIndex lookup vs scanning every task's subject and title
+
+Run from the repo root: python -m benchmarks.bench_tags [n_tasks]
+"""
+import sys
+import time
+
+from benchmarks.synth import generate
+from planner.core import SortedView, TaskCollection, filter_sort, normalize
+from planner.tags import TagIndex, group_key, subject_parts, task_tags
+
+SIZES=[100_000]
+UNITS=5
+REPEAT=5
+
+
+def make_tasks(n: int):
+      tasks=generate(n)
+      for i, t in enumerate(tasks):
+            t.subject=f"{t.subject}/Unit {i % UNITS + 1}"
+            if i % 4 == 0:
+                  t.title += " #exam"
+      return tasks
+
+
+def scan(tasks, label: str):
+      """What filtering costs without the index: split and normalize every task"""
+      key=group_key(label)
+      if key.startswith("#"):
+            return [t for t in tasks if any("#" + normalize(tag) == key for tag in task_tags(t.title))]
+      paths=("/".join(normalize(p) for p in subject_parts(t.subject)) for t in tasks)
+      return [t for t, path in zip(tasks, paths) if path == key or path.startswith(key + "/")]
+
+
+def best(fn):
+      samples=[]
+      for _ in range(REPEAT):
+            start=time.perf_counter()
+            out=fn()
+            samples.append(time.perf_counter() - start)
+      return min(samples), out
+
+
+def main():
+      sizes=[int(sys.argv[1])] if len(sys.argv) > 1 else SIZES
+      print(f"{'tasks':>8} {'group':<16} {'build ms':>9} {'scan ms':>8} {'index ms':>9} {'rows':>7}  check")
+      failed=False
+      for n in sizes:
+            tasks=make_tasks(n)
+            coll=TaskCollection()
+            view=SortedView()
+            index=TagIndex()
+            coll.subscribe(view.on_change)
+            start=time.perf_counter()
+            index.rebuild(tasks)
+            build=time.perf_counter() - start
+            coll.subscribe(index.on_change)
+            coll.load(tasks)
+            for label in ("Maths", "Maths/Unit 2", "#exam"):
+                  scanned, expected=best(lambda: sorted(scan(tasks, label), key=view.key))
+                  indexed, got=best(lambda: filter_sort(coll, view=view, group=index.lookup(label)))
+                  same=[t.id for t in got] == [t.id for t in expected]
+                  failed=failed or not same
+                  print(f"{n:>8} {label:<16} {build * 1000:>9.1f} {scanned * 1000:>8.1f} {indexed * 1000:>9.2f} {len(got):>7}  {'ok' if same else 'MISMATCH'}")
+      sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+      main()
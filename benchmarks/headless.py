@@ -0,0 +1,112 @@
+"""Just enough of tk/ttk to run App.refresh_table, App.refresh_board and App._filtered_sorted without a display
+
+The App is built from its model alone (App._init_model) with stub widgets in place of the
+window, so the Python side of those paths (filtering, sorting, row values, card diffing)
+runs unchanged and only the calls into Tcl cost nothing. Timings from it leave out the
+widget work a real window does; the suite labels them display=stub.
+"""
+import contextlib
+import os
+import shutil
+import subprocess
+import tkinter as tk
+import types
+
+
+class StubWidget:
+      """Accepts any widget call; the few whose results the benchmarked paths read answer sensibly"""
+      def __init__(self, *args, **kw):
+            self._columns=0
+      def __getattr__(self, name):
+            return _ignore
+      def insert(self, parent, index, iid=None, **kw):
+            return iid
+      def selection(self):
+            return ()
+      def bbox(self, *args):
+            return None
+      def create_window(self, *args, **kw):
+            return 1
+      def grid_columnconfigure(self, index, **kw):
+            self._columns=max(self._columns, index + 1)
+      def grid_size(self):
+            return self._columns, 1
+
+
+def _ignore(*args, **kw):
+      return None
+
+
+class StubVar:
+      def __init__(self, value=""):
+            self._value=value
+      def get(self):
+            return self._value
+      def set(self, value):
+            self._value=value
+
+
+class StubNotebook(StubWidget):
+      def __init__(self, selected: str):
+            super().__init__()
+            self.selected=selected
+      def select(self, tab=None):
+            if tab is None:
+                  return self.selected
+            self.selected=str(tab)
+
+
+# what main.py reaches through its tk and ttk module names on those paths
+STUB_TK=types.SimpleNamespace(Frame=StubWidget, Label=StubWidget, Button=StubWidget, Scrollbar=StubWidget,
+                              Canvas=StubWidget, Treeview=StubWidget, END=tk.END)
+
+
+@contextlib.contextmanager
+def stubbed(gui):
+      """main's tk and ttk swapped for the stubs, so BoardColumn and VirtualTable build stub widgets"""
+      saved=gui.tk, gui.ttk
+      gui.tk=gui.ttk=STUB_TK
+      try:
+            yield
+      finally:
+            gui.tk, gui.ttk=saved
+
+
+def headless_app(gui):
+      """An App with its real model and stub widgets, showing the board tab; use inside stubbed(gui)"""
+      app=gui.App.__new__(gui.App)
+      app.status_filter_var=StubVar("ALL")
+      app.group_filter_var=StubVar("ALL")
+      app.search_var=StubVar("")
+      app.grouped_var=StubVar(False)
+      app.board_group_var=StubVar("status")
+      app.tab_board, app.tab_schedule, app.tab_dashboard, app.tab_debug="board", "schedule", "dashboard", "debug"
+      app.nb=StubNotebook(app.tab_board)
+      app.table=gui.VirtualTable(StubWidget(), StubWidget(), app._row_values)
+      app.board=StubWidget()
+      app.board_columns={}
+      app._board_stale=True
+      app._init_model()
+      return app
+
+
+def virtual_display():
+      """Start Xvfb on a free display and point DISPLAY at it; the process, or None without Xvfb"""
+      xvfb=shutil.which("Xvfb")
+      if xvfb is None:
+            return None
+      r, w=os.pipe()
+      with os.fdopen(r) as f:
+            try:
+                  # -displayfd writes the display number once the server accepts connections
+                  proc=subprocess.Popen([xvfb, "-displayfd", str(w), "-screen", "0", "1280x800x24", "-nolisten", "tcp"],
+                                        pass_fds=(w,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            finally:
+                  os.close(w)
+            number=f.readline().strip()
+      if not number:
+            proc.kill()
+            proc.wait()
+            return None
+      os.environ["DISPLAY"]=f":{number}"
+      return proc
@@ -0,0 +1,284 @@
+"""Reproducible benchmark suite: seeded planners through every hot path, results as JSON
+
+Times storage load/save for each engine, CSV export/import, search/filter/sort the way
+the list view runs them, and App.refresh_table, App.refresh_board and App._filtered_sorted.
+Those run on a real Tk window, under Xvfb when there is no display but Xvfb is installed,
+and otherwise on the stub widgets of benchmarks.headless (recorded with display=stub).
+The data comes from benchmarks.synth, so the same seed and sizes give the same planner
+on every commit.
+
+Run from the repo root:
+python -m benchmarks.suite [--sizes 1000,10000] [--seed 1] [--repeat 5] [--out results.json]
+python -m benchmarks.suite --compare before.json [--threshold 1.25]   # exits 1 on regressions
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import headless, synth
+from planner.core import CsvImport, SearchIndex, SortedView, TaskCollection, filter_sort, parse_sort, write_tasks_csv
+from planner.storage import STORAGE_ENGINES, open_storage
+
+SIZES=[1_000, 10_000, 100_000]
+REPEAT=5
+THRESHOLD=1.25
+# differences smaller than this are timer noise whatever the ratio
+NOISE_MS=0.5
+# (search text, status filter, sort); the two searches aren't prefixes of each other, so
+# running them in turn times a full index scan rather than a narrowed repeat
+QUERIES=[
+      ("", "ALL", "duedate"),
+      ("", "Done", "duedate"),
+      ("maths", "ALL", "duedate"),
+      ("revise ch", "ALL", "title"),
+      ("", "ALL", "status,-duedate,title"),
+]
+TYPING="revise chapter"
+SORTS=["duedate", "-title", "status,-duedate,title"]
+
+
+class Results:
+      """Collects timings as records keyed by name, size and parameters"""
+      def __init__(self):
+            self.records=[]
+      def add(self, name: str, n: int, samples, **params):
+            ms=[s * 1000 for s in samples]
+            self.records.append({
+                  "name": name, "n": n, "params": params, "runs_ms": [round(v, 3) for v in ms],
+                  "min_ms": round(min(ms), 3), "median_ms": round(statistics.median(ms), 3),
+            })
+            label=" ".join(f"{k}={v}" for k, v in params.items())
+            print(f"{n:>8} {name:<22} {label:<40} {min(ms):>9.2f} {statistics.median(ms):>9.2f}", flush=True)
+
+
+def timed(fn, repeat: int, setup=None):
+      samples=[]
+      for _ in range(repeat):
+            if setup is not None:
+                  setup()
+            start=time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - start)
+      return samples
+
+
+def bench_storage(res: Results, tasks, d: str, repeat: int):
+      n=len(tasks)
+      for engine in STORAGE_ENGINES:
+            path=os.path.join(d, f"planner-{engine}-{n}.json")
+            engine_storage=open_storage(path, engine)
+            try:
+                  res.add("storage.save", n, timed(lambda: engine_storage.save(tasks), repeat), engine=engine)
+                  res.add("storage.load", n, timed(engine_storage.load, repeat), engine=engine)
+            finally:
+                  engine_storage.close()
+
+
+def bench_csv(res: Results, tasks, d: str, repeat: int):
+      n=len(tasks)
+      path=os.path.join(d, f"export-{n}.csv")
+      def export():
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                  write_tasks_csv(tasks, f)
+      res.add("export_csv", n, timed(export, repeat))
+      jobs=[]
+      res.add("import_csv", n, timed(lambda: jobs.append(CsvImport(path, ()).run()), repeat))
+      if jobs[-1].added != n:
+            raise RuntimeError(f"import read {jobs[-1].added} of {n} tasks")
+
+
+def bench_queries(res: Results, tasks, repeat: int):
+      """filter_sort with the search index and sorted view the App keeps"""
+      n=len(tasks)
+      coll=TaskCollection()
+      index=SearchIndex()
+      view=SortedView()
+      coll.subscribe(index.on_change)
+      coll.subscribe(view.on_change)
+      coll.load(tasks)
+      specs={sort: parse_sort(sort) for sort in SORTS + [q[2] for q in QUERIES]}
+      for sort in SORTS:
+            other=specs[SORTS[(SORTS.index(sort) + 1) % len(SORTS)]]
+            res.add("view.set_spec", n, timed(lambda: view.set_spec(specs[sort]), repeat, lambda: view.set_spec(other)), sort=sort)
+      samples={case: [] for case in QUERIES}
+      for _ in range(repeat):
+            for case in QUERIES:
+                  q, status, sort=case
+                  view.set_spec(specs[sort])
+                  start=time.perf_counter()
+                  filter_sort(coll, q, status, specs[sort], index=index, view=view)
+                  samples[case].append(time.perf_counter() - start)
+      for (q, status, sort), runs in samples.items():
+            res.add("filter_sort", n, runs, q=q, status=status, sort=sort)
+      def typing():
+            for i in range(1, len(TYPING) + 1):
+                  filter_sort(coll, TYPING[:i], "ALL", specs["duedate"], index=index, view=view)
+      res.add("search.typing", n, timed(typing, repeat, lambda: index.search("zz")), q=TYPING)
+
+
+def bench_gui(res: Results, tasks, d: str, repeat: int) -> str:
+      """Time the App on a Tk window, or on stub widgets without a display; returns why it was skipped, or "" """
+      try:
+            import main as gui
+            from tkinter import TclError
+      except ImportError as e:
+            return f"GUI not importable: {e}"
+      gui.DATA_FILE=os.path.join(d, f"gui-{len(tasks)}.json")
+      try:
+            style=gui.Style(theme="minty")
+      except TclError:
+            with headless.stubbed(gui):
+                  app=headless.headless_app(gui)
+                  try:
+                        app.tasks.load(tasks)
+                        time_app(res, app, len(tasks), repeat, lambda: None, display="stub")
+                  finally:
+                        app.persister.stop(timeout=10)
+                        app.storage.close()
+            return ""
+      root=style.master
+      root.geometry("900x560")
+      app=gui.App(root)
+      try:
+            root.update()
+            app.tasks.load(tasks)
+            root.update()
+            time_app(res, app, len(tasks), repeat, root.update_idletasks)
+      finally:
+            app.persister.stop(timeout=10)
+            app.storage.close()
+            root.destroy()
+      return ""
+
+
+def time_app(res: Results, app, n: int, repeat: int, settle, **params):
+      """The App's refresh paths, each followed by settle() to let Tk draw what it queued"""
+      def refresh(fn):
+            def run():
+                  fn()
+                  settle()
+            return run
+      res.add("App.refresh_table", n, timed(refresh(app.refresh_table), repeat), **params)
+      res.add("App.refresh_board", n, timed(refresh(app.refresh_board), repeat), **params)
+      for q, status, sort in QUERIES:
+            app.search_var.set(q)
+            app.status_filter_var.set(status)
+            app.sorted_view.set_spec(parse_sort(sort))
+            res.add("App._filtered_sorted", n, timed(app._filtered_sorted, repeat), q=q, status=status, sort=sort, **params)
+
+
+def git_commit() -> dict:
+      root=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+      try:
+            head=subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+            dirty=subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True).stdout.strip()
+      except (OSError, subprocess.CalledProcessError):
+            return {"commit": None, "dirty": None}
+      return {"commit": head, "dirty": bool(dirty)}
+
+
+def run(args) -> dict:
+      res=Results()
+      gui_skipped=""
+      xvfb=headless.virtual_display() if args.gui and not os.environ.get("DISPLAY") else None
+      print(f"{'tasks':>8} {'benchmark':<22} {'params':<40} {'min ms':>9} {'median ms':>9}")
+      try:
+            with tempfile.TemporaryDirectory() as d:
+                  for n in args.sizes:
+                        tasks=synth.generate(n, args.seed, args.subjects, args.days, status_mix=args.status_mix, skew=args.skew)
+                        bench_storage(res, tasks, d, args.repeat)
+                        bench_csv(res, tasks, d, args.repeat)
+                        bench_queries(res, tasks, args.repeat)
+                        if args.gui and not gui_skipped:
+                              gui_skipped=bench_gui(res, tasks, d, args.repeat)
+                              if gui_skipped:
+                                    print(f"skipping GUI benchmarks, {gui_skipped}")
+      finally:
+            if xvfb is not None:
+                  xvfb.terminate()
+                  xvfb.wait()
+      return {
+            "meta": {
+                  **git_commit(),
+                  "date": datetime.now().isoformat(timespec="seconds"),
+                  "python": platform.python_version(),
+                  "platform": platform.platform(),
+                  "gui_skipped": gui_skipped if args.gui else "not requested",
+                  "gui_display": "xvfb" if xvfb is not None else os.environ.get("DISPLAY") or "stub",
+            },
+            "config": {
+                  "sizes": args.sizes, "seed": args.seed, "repeat": args.repeat, "subjects": args.subjects,
+                  "days": args.days, "status_mix": list(args.status_mix), "skew": args.skew,
+            },
+            "results": res.records,
+      }
+
+
+def _key(record: dict):
+      return record["name"], record["n"], tuple(sorted(record["params"].items()))
+
+
+def compare(old: dict, new: dict, threshold: float):
+      """Print min-time ratios of the benchmarks both runs have; returns the ones slower than threshold"""
+      before={_key(r): r for r in old.get("results", [])}
+      slower=[]
+      differs=[k for k, v in new["config"].items() if k not in ("sizes", "repeat") and old.get("config", {}).get(k) != v]
+      if differs:
+            print(f"\nnote: the earlier run used different {', '.join(differs)}; timings may not be comparable")
+      print(f"\ncompared with {old.get('meta', {}).get('commit') or 'unknown commit'} (min ms; flagged above {threshold}x and {NOISE_MS} ms)")
+      for r in new["results"]:
+            base=before.get(_key(r))
+            if base is None or not base["min_ms"]:
+                  continue
+            ratio=r["min_ms"] / base["min_ms"]
+            flag="  SLOWER" if ratio > threshold and r["min_ms"] - base["min_ms"] > NOISE_MS else ""
+            label=" ".join(f"{k}={v}" for k, v in r["params"].items())
+            print(f"{r['n']:>8} {r['name']:<22} {label:<40} {base['min_ms']:>9.2f} {r['min_ms']:>9.2f} {ratio:>6.2f}x{flag}")
+            if flag:
+                  slower.append(r)
+      return slower
+
+
+def _sizes(text: str):
+      return [int(s) for s in text.split(",")]
+
+
+def main(argv=None) -> int:
+      ap=argparse.ArgumentParser(prog="python -m benchmarks.suite", description="run the benchmark suite and write JSON results")
+      ap.add_argument("--sizes", type=_sizes, default=SIZES, help="comma separated task counts")
+      ap.add_argument("--repeat", type=int, default=REPEAT)
+      ap.add_argument("--seed", type=int, default=synth.SEED)
+      ap.add_argument("--subjects", type=int, default=synth.SUBJECTS)
+      ap.add_argument("--days", type=int, default=synth.SPREAD_DAYS)
+      ap.add_argument("--status-mix", type=synth.parse_mix, default=synth.STATUS_MIX)
+      ap.add_argument("--skew", type=float, default=synth.SKEW)
+      ap.add_argument("--no-gui", dest="gui", action="store_false", help="skip the Tk benchmarks")
+      ap.add_argument("--out", help="write the results here, e.g. bench-<commit>.json")
+      ap.add_argument("--compare", help="results file of an earlier run")
+      ap.add_argument("--threshold", type=float, default=THRESHOLD)
+      args=ap.parse_args(argv)
+      if args.repeat < 1:
+            ap.error("--repeat must be at least 1")
+      baseline=None
+      if args.compare:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                  baseline=json.load(f)
+      results=run(args)
+      if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                  json.dump(results, f, indent=2)
+            print(f"results written to {args.out}")
+      if baseline is not None and compare(baseline, results, args.threshold):
+            return 1
+      return 0
+
+
+if __name__ == "__main__":
+      sys.exit(main())
@@ -0,0 +1,87 @@
+"""Seeded synthetic planners: the same arguments always give the same tasks
+
+Run from the repo root to write a sample planner file:
+python -m benchmarks.synth 100000 sample.json [--seed 1] [--subjects 40] [--days 365] [--status-mix 50,20,30]
+"""
+import argparse
+import random
+import sys
+import uuid
+from datetime import date, datetime
+
+from planner.core import Task, dateformat, statusoptions, write_tasks_csv
+from planner.storage import storage
+
+SEED=1
+SUBJECTS=40
+SPREAD_DAYS=365
+START="2026/01/01"
+# weights in statusoptions order: To Do, Done, In progress
+STATUS_MIX=(50, 30, 20)
+# subject popularity falls off as 1/rank**SKEW; 0 spreads tasks evenly
+SKEW=1.0
+VERBS=("Read", "Revise", "Write", "Practice", "Summarise", "Review", "Finish", "Prepare", "Outline", "Memorise")
+TOPICS=("chapter", "essay", "problem set", "lab report", "flashcards", "past paper", "notes", "lecture", "project", "quiz")
+SUBJECT_NAMES=("Maths", "Physics", "Chemistry", "Biology", "History", "Geography", "English", "French", "Spanish",
+               "Economics", "Computing", "Art", "Music", "Philosophy", "Statistics", "Psychology")
+
+
+def subject_names(n: int):
+      """n distinct subjects, the plain names first and then numbered variants"""
+      base=len(SUBJECT_NAMES)
+      return [SUBJECT_NAMES[i] if i < base else f"{SUBJECT_NAMES[i % base]} {i // base + 1}" for i in range(n)]
+
+
+def generate(n: int, seed: int=SEED, subjects: int=SUBJECTS, spread_days: int=SPREAD_DAYS, start: str=START,
+             status_mix=STATUS_MIX, skew: float=SKEW):
+      """n tasks with due dates spread over spread_days from start and statuses drawn from status_mix"""
+      if len(status_mix) != len(statusoptions):
+            raise ValueError(f"status_mix needs {len(statusoptions)} weights")
+      if subjects < 1 or spread_days < 1:
+            raise ValueError("subjects and spread_days must be at least 1")
+      rng=random.Random(seed)
+      names=subject_names(subjects)
+      first=datetime.strptime(start, dateformat).date().toordinal()
+      days=[(first + d, date.fromordinal(first + d).strftime(dateformat)) for d in range(spread_days)]
+      subject_picks=rng.choices(range(subjects), weights=[1 / (k + 1) ** skew for k in range(subjects)], k=n)
+      day_picks=rng.choices(days, k=n)
+      status_picks=rng.choices(range(len(statusoptions)), weights=status_mix, k=n)
+      tasks=[]
+      for i in range(n):
+            due_ord, due=day_picks[i]
+            title=f"{rng.choice(VERBS)} {rng.choice(TOPICS)} {i}"
+            tid=str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            tasks.append(Task.from_valid(tid, title, names[subject_picks[i]], due, due_ord, status_picks[i]))
+      return tasks
+
+
+def parse_mix(text: str):
+      return tuple(float(w) for w in text.split(","))
+
+
+def main(argv=None) -> int:
+      ap=argparse.ArgumentParser(prog="python -m benchmarks.synth", description="write a seeded synthetic planner file")
+      ap.add_argument("n", type=int)
+      ap.add_argument("path", help="planner file to write; .jsonl and .csv extensions pick those formats")
+      ap.add_argument("--seed", type=int, default=SEED)
+      ap.add_argument("--subjects", type=int, default=SUBJECTS)
+      ap.add_argument("--days", type=int, default=SPREAD_DAYS, help="due dates are spread over this many days")
+      ap.add_argument("--start", default=START)
+      ap.add_argument("--status-mix", type=parse_mix, default=STATUS_MIX, help="weights for " + ",".join(statusoptions))
+      ap.add_argument("--skew", type=float, default=SKEW)
+      args=ap.parse_args(argv)
+      try:
+            tasks=generate(args.n, args.seed, args.subjects, args.days, args.start, args.status_mix, args.skew)
+      except ValueError as e:
+            ap.error(str(e))
+      if args.path.endswith(".csv"):
+            with open(args.path, "w", encoding="utf-8", newline="") as f:
+                  write_tasks_csv(tasks, f)
+      else:
+            storage(args.path).save(tasks, replace=True)
+      print(f"wrote {len(tasks)} task(s) to {args.path}")
+      return 0
+
+
+if __name__ == "__main__":
+      sys.exit(main())
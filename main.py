@@ -1,16 +1,14 @@
 import uuid
 
 import os
- 
-import json
 
-import csv
+import json
 
-from dataclasses import dataclass, asdict   
+import time
 
 from datetime import datetime, date
 
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 
 import tkinter as tk
 
@@ -20,87 +18,58 @@ from ttkbootstrap import Style
 
 from ttkbootstrap.constants import *
 
+from planner.core import (
+      DATA_FILE, CsvImport, SearchIndex, SortedView, Task, TaskCollection, filter_sort, statusoptions, tasks_from_records,
+      today_str, valid_date,
+)
+from planner.storage import PersistWorker, open_storage
+from planner.backup import BackupStore
+
+from planner.schedule import SCHEDULE_MODES, day_str, load_schedule, save_schedule, schedule_path
+
+from planner.stats import DUE_BUCKETS, TaskStats
+
+from planner.metrics import metrics
+
+from planner.export import EXPORT_FORMATS, export_file
+
+from planner.tags import SUBJECT_SEP, TAG_PREFIX, TAGS_KEY, TagIndex
+
+from planner.recurrence import RECURRENCE_FREQS, Occurrence, Series, load_series, recurrence_window, save_series, series_path
+
 
-dateformat="%Y/%m/%d"
 apptitle="Smart Study Planner"
-statusoptions=["To Do", "Done","In progress"]
-statusorder={a:b for b,a in enumerate(statusoptions)}
-DATA_FILE="planner.json"
-BACKUP_DIR="backups"
-CSV_HEADERS=["id","title","subject","duedate","status"]
+ROW_HEIGHT=28
+TABLE_BUFFER_ROWS=50
+BOARD_PAGE_SIZE=50
+BOARD_SUBJECT_COLUMNS=5
+GROUP_PAGE_SIZE=200
+SEARCH_DEBOUNCE_MS=150
+IMPORT_POLL_MS=100
+TICK_MS=1000
 CHECK_EMPTY = "☐" 
 CHECK_FULL = "☑"
 
-@dataclass
-class Task:
-    id:str
-    title:str
-    subject:str
-    duedate:str
-    status:str="To Do"
-def today_str()->str:
-        return datetime.now().strftime(dateformat)
-def valid_date(s:str)->bool:
-        try:
-            datetime.strptime(s,dateformat)
-            return True
-        except Exception:
-            return False
-def parse_date(s:str)-> Optional[date]:
-      try:
-            return datetime.strptime(s, dateformat).date()
-      except Exception:
-            return None
-
-class storage:
-      """Tiny JSON storage helper"""
-      def __init__(self,path: str):
-            self.path=path
-      def load(self) ->List[Task]:
-            if not os.path.exists(self.path):
-                  return[]
-            try:
-                  with open(self.path,"r", encoding="utf-8") as f:
-                        raw= json.load(f)
-            except Exception:
-                  return[]
-            tasks: List[Task]=[]
-            if isinstance(raw,list):
-                  for item in raw:
-                        if not isinstance(item,dict):
-                              continue
-                        
-                  
-                        tid=str(item.get("id") or uuid.uuid4())
-                        title=str(item.get("title") or "").strip()
-                        subject=str(item.get("subject") or "").strip()
-                        duedate=str(item.get("duedate") or today_str()).strip()
-                        status=str(item.get("status") or "To Do").strip()
-                        if not title or not subject or not valid_date(duedate):
-                          continue
-                        if status not in statusoptions:
-                          status="To Do"
-                        tasks.append(Task(id=tid, title=title, subject=subject,duedate=duedate,status=status))
-                  
-                        
-                        
-                  
-                  
-            return tasks
-      def save(self, tasks: List[Task]) -> None:
-            payload = [asdict(t) for t in tasks]
-            tmp = self.path + ".tmp"
-            with open(tmp,"w",encoding="utf-8") as f:
-                  json.dump(payload, f, ensure_ascii=False, indent=2)
-            os.replace(tmp, self.path)
+def row_values(t: Task, index: int, today: int):
+      """Treeview values and tags for a task; today is date.today().toordinal()"""
+      tags=["even" if index % 2 ==0 else "odd"]
+      chk=CHECK_FULL if t.status=="Done" else CHECK_EMPTY
+      if t.due_ord:
+            if t.due_ord < today:
+                  tags.append("overdue")
+            elif t.due_ord == today:
+                  tags.append("today")
+      return (chk,t.title,t.subject,t.duedate, t.status), tuple(tags)
 
 class TaskDialog(tk.Toplevel):
-      def __init__(self,parent,on_save,task:Optional[Task]=None):
+      """Add or edit one task; with on_repeat the add form can also start a repeating series"""
+      def __init__(self,parent,on_save,task:Optional[Task]=None,on_repeat=None):
             super().__init__(parent)
             self.title("Add Task" if task is None else "Edit Task")
             self.resizable(False,False)
             self.grab_set()
             self.on_save=on_save
+            self.on_repeat=on_repeat
             self.var_title=StringVar(value=task.title if task else "")
             self.var_subject=StringVar(value=task.subject if task else "")
             self.var_due=StringVar(value=task.duedate if task else today_str())
@@ -117,8 +86,26 @@ class TaskDialog(tk.Toplevel):
             ttk.Entry(frm,textvariable=self.var_due,width=36).grid(row=2,column=1,sticky=W,padx=6,pady=6)
             ttk.Label(frm,text="Status").grid(row=3,column=0,sticky=E,padx=6,pady=6)
             ttk.Combobox(frm,textvariable=self.var_status,values=statusoptions,state="readonly",width=20).grid(row=3,column=1,sticky=W,padx=6,pady=6)
+            self.var_repeat=StringVar(value="never")
+            self.var_every=StringVar(value="1")
+            self.var_until=StringVar()
+            self.var_count=StringVar()
+            if on_repeat is not None:
+                  ttk.Label(frm,text="Repeat").grid(row=4,column=0,sticky=E,padx=6,pady=6)
+                  rep=ttk.Frame(frm)
+                  rep.grid(row=4,column=1,sticky=W,padx=6,pady=6)
+                  ttk.Combobox(rep,textvariable=self.var_repeat,values=["never"] + list(RECURRENCE_FREQS),state="readonly",width=8).pack(side=LEFT)
+                  ttk.Label(rep,text=" every ").pack(side=LEFT)
+                  ttk.Spinbox(rep,from_=1,to=52,textvariable=self.var_every,width=4).pack(side=LEFT)
+                  ttk.Label(frm,text="Ends (date or times)").grid(row=5,column=0,sticky=E,padx=6,pady=6)
+                  ends=ttk.Frame(frm)
+                  ends.grid(row=5,column=1,sticky=W,padx=6,pady=6)
+                  ttk.Entry(ends,textvariable=self.var_until,width=12).pack(side=LEFT)
+                  ttk.Label(ends,text=" or after ").pack(side=LEFT)
+                  ttk.Spinbox(ends,from_=1,to=999,textvariable=self.var_count,width=5).pack(side=LEFT)
+                  ttk.Label(ends,text=" times").pack(side=LEFT)
             btns=ttk.Frame(frm)
-            btns.grid(row=4,column=0,columnspan=2,pady=10)
+            btns.grid(row=6,column=0,columnspan=2,pady=10)
             ttk.Button(btns,text="Cancel",command=self.destroy).pack(side=RIGHT,padx=6)
             ttk.Button(btns,text="Save",bootstyle=SUCCESS,command=self._save).pack(side=RIGHT)
             self.bind("<Return>",lambda e:self._save())
@@ -142,42 +129,393 @@ class TaskDialog(tk.Toplevel):
             if status not in statusoptions:
                   messagebox.showerror("validation","invalid status selected")
                   return
-            self.on_save(title,subject,due,status)
+            if self.var_repeat.get() in RECURRENCE_FREQS:
+                  until=self.var_until.get().strip() or None
+                  if until and not valid_date(until):
+                        messagebox.showerror("validation","End date needs to be valid")
+                        return
+                  try:
+                        every=int(self.var_every.get())
+                        count=int(self.var_count.get()) if self.var_count.get().strip() else None
+                  except ValueError:
+                        messagebox.showerror("validation","Repeat every and times need to be whole numbers")
+                        return
+                  if every < 1 or (count is not None and count < 1):
+                        messagebox.showerror("validation","Repeat every and times need to be at least 1")
+                        return
+                  self.on_repeat(title,subject,due,status,self.var_repeat.get(),every,until,count)
+            else:
+                  self.on_save(title,subject,due,status)
+            self.destroy()
+class RestoreDialog(tk.Toplevel):
+      def __init__(self,parent,generations,on_restore):
+            super().__init__(parent)
+            self.title("Restore Backup")
+            self.grab_set()
+            self.on_restore=on_restore
+            frm=ttk.Frame(self,padding=12)
+            frm.pack(fill=BOTH,expand=YES)
+            self.list=ttk.Treeview(frm,columns=("time","kind","count","changed"),show="headings",height=12,selectmode="browse")
+            for key,label,width in (("time","Taken",170),("kind","Kind",70),("count","Tasks",70),("changed","Changed",80)):
+                  self.list.heading(key,text=label,anchor=W)
+                  self.list.column(key,width=width,anchor=W)
+            for g in reversed(generations):
+                  self.list.insert("",tk.END,iid=g["name"],values=(g["time"].replace("T"," "),g["kind"],g["count"],g["changed"]))
+            self.list.pack(fill=BOTH,expand=YES)
+            btns=ttk.Frame(frm)
+            btns.pack(fill=X,pady=(10,0))
+            ttk.Button(btns,text="Cancel",command=self.destroy).pack(side=RIGHT,padx=6)
+            ttk.Button(btns,text="Restore",bootstyle=WARNING,command=self._restore).pack(side=RIGHT)
+            self.bind("<Escape>",lambda e:self.destroy())
+            self.geometry(f"+{parent.winfo_rootx()+60}+{parent.winfo_rooty()+60}")
+      def _restore(self):
+            sel=self.list.selection()
+            if not sel:
+                  messagebox.showinfo("Restore Backup","Please select a backup",parent=self)
+                  return
+            if not messagebox.askyesno("Restore Backup", "This will replace all current tasks.\nContinue?",parent=self):
+                  return
             self.destroy()
+            self.on_restore(sel[0])
+
+class VirtualTable:
+      """Treeview that only holds the rows in the viewport and recycles them on scroll"""
+      def __init__(self, tree: ttk.Treeview, scrollbar: ttk.Scrollbar, row_values, buffer: int=TABLE_BUFFER_ROWS):
+            self.tree=tree
+            self.scrollbar=scrollbar
+            self.row_values=row_values
+            self.buffer=buffer
+            self.total=0
+            self.first=0
+            self.visible=14
+            self.selected_ids: List[str]=[]
+            self.slots: List[str]=[]
+            self.rendered: list=[]
+            self._fetch=lambda offset, n: []
+            self._cache: List[Task]=[]
+            self._cache_offset=0
+            scrollbar.configure(command=self.yview)
+            tree.bind("<Configure>", self._on_configure, add="+")
+            tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+            tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+            tree.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+            tree.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+            tree.bind("<Up>", lambda e: self._step(-1))
+            tree.bind("<Down>", lambda e: self._step(1))
+            tree.bind("<Prior>", lambda e: self._step(-self.visible))
+            tree.bind("<Next>", lambda e: self._step(self.visible))
+      def set_source(self, total: int, fetch, scroll_top: bool=False):
+            """fetch(offset, n) returns the filtered/sorted tasks in that range"""
+            self.total=total
+            self._fetch=fetch
+            self._cache=[]
+            if scroll_top:
+                  self.first=0
+            self.render()
+      def task_id(self, slot: str) -> Optional[str]:
+            try:
+                  i=self.slots.index(slot)
+            except ValueError:
+                  return None
+            return self.rendered[i][0]
+      def _window(self, first: int, n: int) -> List[Task]:
+            lo=first - self._cache_offset
+            if lo < 0 or lo + n > len(self._cache):
+                  self._cache_offset=max(0, first - self.buffer)
+                  self._cache=self._fetch(self._cache_offset, n + 2 * self.buffer)
+                  lo=first - self._cache_offset
+            return self._cache[lo:lo + n]
+      def render(self):
+            self.first=max(0, min(self.first, self.total - self.visible))
+            rows=self._window(self.first, min(self.visible, self.total - self.first))
+            tree=self.tree
+            while len(self.slots) < len(rows):
+                  self.slots.append(tree.insert("", tk.END, iid=f"row{len(self.slots)}"))
+                  self.rendered.append(None)
+                  metrics.count("table.rows_created")
+            while len(self.slots) > len(rows):
+                  tree.delete(self.slots.pop())
+                  self.rendered.pop()
+                  metrics.count("table.rows_deleted")
+            selected=[]
+            updated=0
+            for i, t in enumerate(rows):
+                  values, tags=self.row_values(t, self.first + i)
+                  key=(t.id, values, tags)
+                  if self.rendered[i] != key:
+                        tree.item(self.slots[i], values=values, tags=tags)
+                        self.rendered[i]=key
+                        updated += 1
+                  if t.id in self.selected_ids:
+                        selected.append(self.slots[i])
+            metrics.count("table.rows_updated", updated)
+            if set(tree.selection()) != set(selected):
+                  tree.selection_set(selected)
+            if self.total:
+                  self.scrollbar.set(self.first / self.total, (self.first + len(rows)) / self.total)
+            else:
+                  self.scrollbar.set(0, 1)
+      def yview(self, *args):
+            if args[0] == "moveto":
+                  self.first=int(float(args[1]) * self.total)
+                  self.render()
+            elif args[0] == "scroll":
+                  self.scroll(int(args[1]), args[2])
+      def scroll(self, n: int, what: str="units"):
+            self.first += n * (self.visible if what == "pages" else 1)
+            self.render()
+            return "break"
+      def _step(self, delta: int):
+            ids=[r[0] for r in self.rendered]
+            anchor=self.selected_ids[-1] if self.selected_ids else None
+            index=self.first + ids.index(anchor) if anchor in ids else self.first - 1
+            index=max(0, min(self.total - 1, index + delta))
+            if index < self.first:
+                  self.first=index
+            elif index >= self.first + self.visible:
+                  self.first=index - self.visible + 1
+            self.selected_ids=[self._window(index, 1)[0].id] if self.total else []
+            self.render()
+            return "break"
+      def _on_select(self, _event=None):
+            ids=[self.task_id(s) for s in self.tree.selection()]
+            visible={r[0] for r in self.rendered}
+            # render() re-applies the selection for rows scrolled back into view; only a
+            # selection that differs from that is a user change, and then it wins outright
+            if set(ids) != {tid for tid in self.selected_ids if tid in visible}:
+                  self.selected_ids=ids
+      def _on_configure(self, event):
+            header=self.tree.bbox(self.slots[0])[1] if self.slots and self.tree.bbox(self.slots[0]) else ROW_HEIGHT
+            visible=max(1, (event.height - header) // ROW_HEIGHT)
+            if visible != self.visible:
+                  self.visible=visible
+                  self.render()
+
+class GroupedTree:
+      """Treeview of subject and tag groups; a group's rows are only built when it is opened
+
+      subgroups(key) gives (key, label, count) of the groups under key, "" being the top
+      level; group_rows(key) the filtered, sorted tasks filed in it. Long groups load a
+      page at a time behind a "Show more" node.
+      """
+      def __init__(self, tree: ttk.Treeview, row_values, subgroups, group_rows, page_size: int=GROUP_PAGE_SIZE):
+            self.tree=tree
+            self.row_values=row_values
+            self.subgroups=subgroups
+            self.group_rows=group_rows
+            self.page_size=page_size
+            self.nodes: Dict[str, str]={"": ""}
+            self.rows: Dict[str, str]={}
+            self.pages: Dict[str, tuple]={}
+            self.loaded: Set[str]=set()
+            tree.bind("<<TreeviewOpen>>", self._on_open, add="+")
+      def task_id(self, iid: str) -> Optional[str]:
+            return self.rows.get(iid)
+      def selected_ids(self) -> List[str]:
+            return [self.rows[iid] for iid in self.tree.selection() if iid in self.rows]
+      def refresh(self):
+            """Rebuild from the top, reloading the groups that were open"""
+            tree=self.tree
+            reopen={iid for iid in self.loaded if iid and tree.exists(iid) and tree.item(iid, "open")}
+            selected=set(self.selected_ids())
+            tree.delete(*tree.get_children())
+            self.nodes={"": ""}
+            self.rows.clear()
+            self.pages.clear()
+            self.loaded.clear()
+            self._load("", reopen)
+            tree.selection_set([iid for iid, tid in self.rows.items() if tid in selected])
+      def _load(self, iid: str, reopen=()):
+            tree=self.tree
+            key=self.nodes[iid]
+            if tree.exists(iid + "|stub"):
+                  tree.delete(iid + "|stub")
+            subs=self.subgroups(key)
+            for sub, label, count in subs:
+                  node="g:" + sub
+                  self.nodes[node]=sub
+                  tree.insert(iid, tk.END, iid=node, text=f"{label}  ({count})", open=False)
+                  # an empty child so the node gets an expander before its rows exist
+                  tree.insert(node, tk.END, iid=node + "|stub", text="")
+            if key:
+                  self._add_page(iid, key, self.group_rows(key), 0)
+            self.loaded.add(iid)
+            for sub, _, _ in subs:
+                  if "g:" + sub in reopen:
+                        tree.item("g:" + sub, open=True)
+                        self._load("g:" + sub, reopen)
+      def _add_page(self, parent: str, key: str, tasks: List[Task], offset: int):
+            tree=self.tree
+            page=tasks[offset:offset + self.page_size]
+            for i, t in enumerate(page, offset):
+                  values, tags=self.row_values(t, i)
+                  iid=f"r:{key}:{t.id}"
+                  tree.insert(parent, tk.END, iid=iid, text="", values=values, tags=tags)
+                  self.rows[iid]=t.id
+            metrics.count("table.rows_created", len(page))
+            remaining=len(tasks) - offset - len(page)
+            if remaining > 0:
+                  more=f"m:{key}:{offset + len(page)}"
+                  tree.insert(parent, tk.END, iid=more, text=f"Show {min(remaining, self.page_size)} more ({remaining} left)", open=False)
+                  tree.insert(more, tk.END, iid=more + "|stub", text="")
+                  self.pages[more]=(parent, key, tasks, offset + len(page))
+      def _on_open(self, _event=None):
+            iid=self.tree.focus()
+            if iid in self.pages:
+                  parent, key, tasks, offset=self.pages.pop(iid)
+                  self.tree.delete(iid)
+                  self._add_page(parent, key, tasks, offset)
+            elif iid in self.nodes and iid not in self.loaded:
+                  self._load(iid)
+
+class BoardColumn:
+      """Scrollable board column that keeps one card per task id and patches them in place"""
+      def __init__(self, parent, title: str, page_size: int=BOARD_PAGE_SIZE):
+            self.page_size=page_size
+            self.limit=page_size
+            self.tasks: List[Task]=[]
+            self.cards: dict={}
+            self.order: List[str]=[]
+            self.title=title
+            self.frame=ttk.Frame(parent,padding=6)
+            ttk.Label(self.frame,text=title,font=("Segoe UI", 12, "bold")).pack(anchor=W,pady=(0,6))
+            body=ttk.Frame(self.frame)
+            body.pack(fill=BOTH,expand=YES)
+            self.canvas=tk.Canvas(body,highlightthickness=0,borderwidth=0)
+            scroll=ttk.Scrollbar(body,orient=VERTICAL,command=self.canvas.yview)
+            self.canvas.configure(yscrollcommand=lambda lo, hi: self._on_scroll(scroll, lo, hi))
+            scroll.pack(side=RIGHT,fill=Y)
+            self.canvas.pack(side=LEFT,fill=BOTH,expand=YES)
+            self.inner=ttk.Frame(self.canvas)
+            self._window=self.canvas.create_window(0,0,window=self.inner,anchor=NW)
+            self.inner.bind("<Configure>",lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+            self.canvas.bind("<Configure>",lambda e: self.canvas.itemconfigure(self._window,width=e.width))
+            self.more=ttk.Button(self.frame,text="",bootstyle=(SECONDARY, LINK),command=self.show_more)
+      def show(self, tasks: List[Task]):
+            self.tasks=tasks
+            wanted=tasks[:self.limit]
+            ids={t.id for t in wanted}
+            for tid in [k for k in self.cards if k not in ids]:
+                  self.cards.pop(tid)[0].destroy()
+                  metrics.count("widgets.destroyed", 3)
+            for t in wanted:
+                  text=(t.title, f"{t.subject}- Due {t.duedate}")
+                  card=self.cards.get(t.id)
+                  if card is None:
+                        self.cards[t.id]=self._make_card(text)
+                  elif card[3] != text:
+                        card[1].configure(text=text[0])
+                        card[2].configure(text=text[1])
+                        self.cards[t.id]=card[:3] + (text,)
+            order=[t.id for t in wanted]
+            if order != self.order:
+                  packed=[tid for tid in self.order if tid in ids]
+                  for i, tid in enumerate(order):
+                        if i < len(packed) and packed[i] == tid:
+                              continue
+                        frame=self.cards[tid][0]
+                        if i == 0:
+                              frame.pack(fill=X,pady=6,before=self.cards[packed[0]][0]) if packed else frame.pack(fill=X,pady=6)
+                        else:
+                              frame.pack(fill=X,pady=6,after=self.cards[order[i - 1]][0])
+                        if tid in packed:
+                              packed.remove(tid)
+                        packed.insert(i, tid)
+                  self.order=order
+            remaining=len(tasks) - len(wanted)
+            if remaining > 0:
+                  self.more.configure(text=f"Show {min(remaining, self.page_size)} more ({remaining} hidden)")
+                  self.more.pack(anchor=W)
+            else:
+                  self.more.pack_forget()
+      def _make_card(self, text):
+            card=ttk.Frame(self.inner, padding=8)
+            title=ttk.Label(card, text=text[0], font=("Segoe U",10,"bold"))
+            title.pack(anchor=W)
+            sub=ttk.Label(card,text=text[1])
+            sub.pack(anchor=W)
+            metrics.count("widgets.created", 3)
+            return (card, title, sub, text)
+      def show_more(self):
+            if self.limit < len(self.tasks):
+                  self.limit += self.page_size
+                  self.show(self.tasks)
+      def _on_scroll(self, scroll, lo, hi):
+            scroll.set(lo, hi)
+            if float(hi) >= 0.98 and self.limit < len(self.tasks):
+                  self.canvas.after_idle(self.show_more)
+
 class App(ttk.Frame):
       def __init__(self,master):
             super().__init__(master,padding=12)
             self.status_filter_var=StringVar(value="ALL")
-            self.pack(fill=BOTH,expand=YES)
-            self.tasks:List[Task]=[]
+            self.group_filter_var=StringVar(value="ALL")
             self.search_var=StringVar()
-            self.sort_key="duedate"
-            self.sort_reverse=False
-            self.storage=storage(DATA_FILE)
+            self.pack(fill=BOTH,expand=YES)
+            self._init_model()
             self._apply_styles()
             self._build_header()
             self._build_center()
             self._build_statusbar()
-            self._tick()
             self._build_menu()
             self.bind_all("<Control-n>",lambda e:self.open_add_dialog())
             self.bind_all("<Delete>",lambda e:self.delete_selected())
             self.bind_all("<Control-e>",lambda e:self.open_edit_dialog())
+            self.bind_all("<Control-Shift-D>",lambda e:self.toggle_debug_tab())
             self.tree.bind("<Button-1>",self._on_tree_click, add="+")  
-            self._load_initial()  
+            self.group_tree.bind("<Button-1>",self._on_tree_click, add="+")
+            self._load_initial()
+            # after the load, so the first poll has the file's tasks to compare against
+            self._tick()
+      def _init_model(self):
+            """Tasks, their indexes and storage, and the listeners that keep them in step; none of it needs a window"""
+            self.tasks=TaskCollection()
+            self.search_index=SearchIndex()
+            self.tag_index=TagIndex()
+            self._search_job=None
+            self._last_search=""
+            self._import: Optional[CsvImport]=None
+            self._today=date.today().toordinal()
+            self._last_tick: Optional[float]=None
+            self.sorted_view=SortedView()
+            self.storage=open_storage(DATA_FILE)
+            self.persister=PersistWorker(self.storage)
+            self.backups=BackupStore()
+            self.schedule_file=schedule_path(DATA_FILE)
+            self.schedule=load_schedule(self.schedule_file)
+            self.series_file=series_path(DATA_FILE)
+            self.recurring=load_series(self.series_file)
+            self.tasks.subscribe(self._on_tasks_changed)
+            self.tasks.subscribe(self.search_index.on_change)
+            self.tasks.subscribe(self.tag_index.on_change)
+            self.tasks.subscribe(self.sorted_view.on_change)
+            self.tasks.subscribe(self.schedule.on_change)
+            self.stats=TaskStats()
+            self.tasks.subscribe(self.stats.on_change)
+            self.tasks.subscribe(lambda kind, changed, removed: self.refresh_views())
       def _build_menu(self):
             root = self.winfo_toplevel()
             menubar = tk.Menu(root)
 
             file_menu = tk.Menu(menubar, tearoff=0)
             file_menu.add_command(label="Import CSV...",  command=self.import_csv)
-            file_menu.add_command(label="Export CSV...",  command=self.export_csv)
+            file_menu.add_command(label="Export...",  command=self.export_tasks)
+            file_menu.add_command(label="Export Current View...",  command=lambda: self.export_tasks(view_only=True))
             file_menu.add_separator()
             file_menu.add_command(label="Backup JSON...", command=self.backup_json)
+            file_menu.add_command(label="Restore Backup...", command=self.restore_backup)
             file_menu.add_command(label="Restore JSON...", command=self.restore_json)
             file_menu.add_separator()
             file_menu.add_command(label="Exit", command=self.on_close)
             menubar.add_cascade(label="File", menu=file_menu)
+
+            edit_menu = tk.Menu(menubar, tearoff=0)
+            for status in statusoptions:
+                  edit_menu.add_command(label=f"Mark Selected as {status}", command=lambda s=status: self.set_selected_status(s))
+            edit_menu.add_separator()
+            edit_menu.add_command(label="Stop Repeating Selected", command=self.stop_selected_series)
+            edit_menu.add_command(label="Delete Selected", command=self.delete_selected)
+            menubar.add_cascade(label="Edit", menu=edit_menu)
             root.config(menu=menubar)
 
             
@@ -187,7 +525,7 @@ class App(ttk.Frame):
 
       def _apply_styles(self):
             s=ttk.Style()
-            s.configure("Treeview",rowheight=28,padding=2)
+            s.configure("Treeview",rowheight=ROW_HEIGHT,padding=2)
             s.configure("Treeview.Heading",padding=(6,4))
             s.map("Treeview",background=[("selected", "white")],foreground=[("selected","blue")])
       def _build_header(self):
@@ -198,7 +536,7 @@ class App(ttk.Frame):
             ttk.Label(top,text=" Search:").pack(side=LEFT,padx=(16,0))
             entry=ttk.Entry(top, textvariable=self.search_var,width=34)
             entry.pack(side=LEFT)
-            entry.bind("<KeyRelease>",lambda e: self.refresh_table())
+            entry.bind("<KeyRelease>",self._on_search_key)
 
             ttk.Label(top, text="  Status  ").pack(side=LEFT,padx=(12,0))
             self.cb_filter=ttk.Combobox(
@@ -210,6 +548,17 @@ class App(ttk.Frame):
                   )
             self.cb_filter.pack(side=LEFT)
             self.cb_filter.bind("<<ComboboxSelected>>",lambda e: self.refresh_views())
+
+            ttk.Label(top, text="  Subject/Tag  ").pack(side=LEFT,padx=(12,0))
+            self.cb_group=ttk.Combobox(
+                  top,
+                  textvariable=self.group_filter_var,
+                  state="readonly",
+                  width=18,
+                  postcommand=lambda: self.cb_group.configure(values=["ALL"] + self.tag_index.options())
+                  )
+            self.cb_group.pack(side=LEFT)
+            self.cb_group.bind("<<ComboboxSelected>>",lambda e: self.refresh_views())
             
             ttk.Button(top, text="Add Task (Ctrl+N)",bootstyle=SUCCESS,command=self.
             open_add_dialog).pack(side=RIGHT,padx=6)
@@ -221,9 +570,30 @@ class App(ttk.Frame):
             self.nb.pack(fill=BOTH,expand=YES)
             self.tab_list=ttk.Frame(self.nb,padding=8)
             self.nb.add(self.tab_list, text="list")
+            bar=ttk.Frame(self.tab_list)
+            bar.pack(fill=X,pady=(0,6))
+            self.grouped_var=tk.BooleanVar(value=False)
+            ttk.Checkbutton(bar,text="Group by subject and tag",variable=self.grouped_var,command=self._on_grouped).pack(side=LEFT)
+            ttk.Label(bar,text='Nest subjects with "/" (Math/Calculus), tag titles with #words').pack(side=RIGHT)
             cols=("check","title", "subject","duedate","status")
-            self.tree=ttk.Treeview(self.tab_list,columns=cols,show="headings",height=14)
-            self.tree.pack(fill=BOTH,expand=YES)
+            self.flat_frame=ttk.Frame(self.tab_list)
+            self.flat_frame.pack(fill=BOTH,expand=YES)
+            self.tree=ttk.Treeview(self.flat_frame,columns=cols,show="headings",height=14)
+            scroll=ttk.Scrollbar(self.flat_frame,orient=VERTICAL)
+            scroll.pack(side=RIGHT,fill=Y)
+            self.tree.pack(side=LEFT,fill=BOTH,expand=YES)
+            self.table=VirtualTable(self.tree,scroll,self._row_values)
+            # grouped mode: a real tree, filled lazily as groups are opened
+            self.group_frame=ttk.Frame(self.tab_list)
+            self.group_tree=ttk.Treeview(self.group_frame,columns=cols,show="tree headings",height=14)
+            scroll=ttk.Scrollbar(self.group_frame,orient=VERTICAL,command=self.group_tree.yview)
+            self.group_tree.configure(yscrollcommand=scroll.set)
+            scroll.pack(side=RIGHT,fill=Y)
+            self.group_tree.pack(side=LEFT,fill=BOTH,expand=YES)
+            self.group_tree.heading("#0",text="Group",anchor=W)
+            self.group_tree.column("#0",width=200,anchor=W,stretch=False)
+            self.group_table=GroupedTree(self.group_tree,self._row_values,self._subgroups,self._group_rows)
+            self._col_labels={}
             self._define_col("check","✓",   48,  tk.CENTER)
             self._define_col("title","Title",380,"w")
             self._define_col("subject","Subject",160,"w")
@@ -231,33 +601,125 @@ class App(ttk.Frame):
             self._define_col("status","Status",120,"w")
             
 
-            for c in cols:
-                  self.tree.heading(c,command=lambda col=c:self._sort_by(col))
+            for tree in (self.tree, self.group_tree):
+                  for c in cols:
+                        tree.heading(c,command=lambda col=c:self._sort_by(col))
+                  tree.bind("<Shift-Button-1>",self._on_tree_shift_click)
 
-            self.tree.tag_configure("even",background="white")
-            self.tree.tag_configure("odd",background="white")
-            
-            self.tree.tag_configure("today", background="lightblue")
-            self.tree.tag_configure("overdue", foreground="red")
+                  tree.tag_configure("even",background="white")
+                  tree.tag_configure("odd",background="white")
+
+                  tree.tag_configure("today", background="lightblue")
+                  tree.tag_configure("overdue", foreground="red")
+            self._update_headings()
 
             self.tab_board=ttk.Frame(self.nb,padding=8)
             self.nb.add(self.tab_board,text= "board")
-            board=ttk.Frame(self.tab_board)
-            board.pack(fill=BOTH,expand=YES)
-            board.grid_columnconfigure(0, weight=1, uniform="col")
-            board.grid_columnconfigure(1, weight=1, uniform="col")
-            board.grid_columnconfigure(2, weight=1, uniform="col")
-            self.col_frames={}
-            for idx, status in enumerate(statusoptions):
-                  col=ttk.Frame(board,padding=6)
-                  col.grid(row=0,column=idx,sticky=NSEW,padx=6)
-                  head=ttk.Label(col,text=status,font=("Segoe UI", 12, "bold"))
-                  head.pack(anchor=W,pady=(0,6))
-                  inner=ttk.Frame(col)
-                  inner.pack(fill=BOTH,expand=YES)
-                  self.col_frames[status]=inner
+            bar=ttk.Frame(self.tab_board)
+            bar.pack(fill=X,pady=(0,6))
+            self.board_group_var=StringVar(value="status")
+            ttk.Label(bar,text="Columns by").pack(side=LEFT)
+            cb=ttk.Combobox(bar,textvariable=self.board_group_var,values=["status","subject"],state="readonly",width=10)
+            cb.pack(side=LEFT,padx=6)
+            cb.bind("<<ComboboxSelected>>",lambda e: self.refresh_board())
+            self.board=ttk.Frame(self.tab_board)
+            self.board.pack(fill=BOTH,expand=YES)
+            self.board.grid_rowconfigure(0, weight=1)
+            self.board_columns={}
+            self._board_stale=True
+            self._set_board_columns([(status, status) for status in statusoptions])
+
+            self.tab_schedule=ttk.Frame(self.nb,padding=8)
+            self.nb.add(self.tab_schedule,text="schedule")
+            bar=ttk.Frame(self.tab_schedule)
+            bar.pack(fill=X,pady=(0,6))
+            self.capacity_var=StringVar(value=f"{self.schedule.capacity / 60:g}")
+            self.mode_var=StringVar(value=self.schedule.mode)
+            self.effort_var=StringVar(value=f"{self.schedule.default_effort / 60:g}")
+            self.schedule_info=StringVar()
+            ttk.Label(bar,text="Hours/day").pack(side=LEFT)
+            cap=ttk.Spinbox(bar,from_=0.5,to=16,increment=0.5,width=5,textvariable=self.capacity_var,command=self._on_schedule_settings)
+            cap.pack(side=LEFT,padx=6)
+            cap.bind("<Return>",lambda e: self._on_schedule_settings())
+            ttk.Label(bar,text="Mode").pack(side=LEFT,padx=(12,0))
+            mode=ttk.Combobox(bar,textvariable=self.mode_var,values=SCHEDULE_MODES,state="readonly",width=11)
+            mode.pack(side=LEFT,padx=6)
+            mode.bind("<<ComboboxSelected>>",lambda e: self._on_schedule_settings())
+            ttk.Label(bar,text="Effort (h)").pack(side=LEFT,padx=(12,0))
+            ttk.Spinbox(bar,from_=0,to=100,increment=0.5,width=5,textvariable=self.effort_var).pack(side=LEFT,padx=6)
+            ttk.Button(bar,text="Set for selected",bootstyle=(SECONDARY, OUTLINE),command=self._set_effort).pack(side=LEFT)
+            ttk.Label(bar,textvariable=self.schedule_info).pack(side=RIGHT)
+            cols=("day","hours","title","subject","duedate")
+            self.schedule_tree=ttk.Treeview(self.tab_schedule,columns=cols,show="headings",height=14)
+            scroll=ttk.Scrollbar(self.tab_schedule,orient=VERTICAL)
+            scroll.pack(side=RIGHT,fill=Y)
+            self.schedule_tree.pack(side=LEFT,fill=BOTH,expand=YES)
+            self.schedule_table=VirtualTable(self.schedule_tree,scroll,self._schedule_row_values)
+            for key,label,width in (("day","Day",110),("hours","Hours",70),("title","Title",330),("subject","Subject",160),("duedate","Due Date",110)):
+                  self.schedule_tree.heading(key,text=label,anchor=W)
+                  self.schedule_tree.column(key,width=width,anchor=W,stretch=True)
+            self.schedule_tree.tag_configure("today", background="lightblue")
+            self.schedule_tree.tag_configure("late", foreground="red")
+            self.schedule_tree.bind("<<TreeviewSelect>>",self._on_schedule_select,add="+")
+
+            self.tab_dashboard=ttk.Frame(self.nb,padding=8)
+            self.nb.add(self.tab_dashboard,text="dashboard")
+            cards=ttk.Frame(self.tab_dashboard)
+            cards.pack(fill=X,pady=(0,8))
+            self.stat_vars={}
+            for i,name in enumerate(["total"] + statusoptions + list(DUE_BUCKETS[:3])):
+                  card=ttk.Labelframe(cards,text=name.capitalize() if name.islower() else name,padding=(10,4))
+                  card.grid(row=0,column=i,sticky=NSEW,padx=4)
+                  cards.grid_columnconfigure(i,weight=1,uniform="card")
+                  self.stat_vars[name]=StringVar(value="0")
+                  ttk.Label(card,textvariable=self.stat_vars[name],font=("Segoe UI", 18, "bold")).pack(anchor=W)
+            cols=("subject","open","done","total","progress")
+            self.subject_tree=ttk.Treeview(self.tab_dashboard,columns=cols,show="headings",height=10)
+            scroll=ttk.Scrollbar(self.tab_dashboard,orient=VERTICAL)
+            scroll.pack(side=RIGHT,fill=Y)
+            self.subject_tree.pack(side=LEFT,fill=BOTH,expand=YES)
+            self.subject_table=VirtualTable(self.subject_tree,scroll,self._subject_row_values)
+            for key,label,width in (("subject","Subject",260),("open","Open",80),("done","Done",80),("total","Total",80),("progress","Done %",90)):
+                  self.subject_tree.heading(key,text=label,anchor=W)
+                  self.subject_tree.column(key,width=width,anchor=W,stretch=True)
+
+            # hidden until Ctrl+Shift+D; timings are only recorded while profiling is on
+            self.tab_debug=ttk.Frame(self.nb,padding=8)
+            self.nb.add(self.tab_debug,text="debug",state="hidden")
+            bar=ttk.Frame(self.tab_debug)
+            bar.pack(fill=X,pady=(0,6))
+            self.profile_var=tk.BooleanVar(value=metrics.enabled)
+            ttk.Checkbutton(bar,text="Record timings",variable=self.profile_var,command=self._toggle_profiling).pack(side=LEFT)
+            ttk.Button(bar,text="Reset",bootstyle=SECONDARY,command=self._reset_metrics).pack(side=LEFT,padx=6)
+            ttk.Button(bar,text="Export JSON...",bootstyle=INFO,command=self.export_metrics).pack(side=LEFT)
+            self.debug_info=StringVar()
+            ttk.Label(bar,textvariable=self.debug_info).pack(side=RIGHT)
+            cols=("count","mean","p50","p90","p99","max")
+            self.debug_tree=ttk.Treeview(self.tab_debug,columns=cols,show="tree headings",height=14)
+            scroll=ttk.Scrollbar(self.tab_debug,orient=VERTICAL,command=self.debug_tree.yview)
+            self.debug_tree.configure(yscrollcommand=scroll.set)
+            scroll.pack(side=RIGHT,fill=Y)
+            self.debug_tree.pack(side=LEFT,fill=BOTH,expand=YES)
+            self.debug_tree.heading("#0",text="Span / counter",anchor=W)
+            self.debug_tree.column("#0",width=220,anchor=W)
+            for key,label in zip(cols,("Count","Mean ms","p50 ms","p90 ms","p99 ms","Max ms")):
+                  self.debug_tree.heading(key,text=label,anchor=E)
+                  self.debug_tree.column(key,width=90,anchor=E,stretch=True)
+            self.nb.bind("<<NotebookTabChanged>>",lambda e: self._on_tab_changed())
 
+      def _on_search_key(self, _event=None):
+            if self._search_job:
+                  self.after_cancel(self._search_job)
+            self._search_job=self.after(SEARCH_DEBOUNCE_MS, self._run_search)
+      def _run_search(self):
+            self._search_job=None
+            q=self.search_var.get().strip()
+            if q == self._last_search:
+                  return
+            self._last_search=q
+            self.refresh_table(scroll_top=True)
       def _define_col(self,key,label,width,anchor):
+                  self._col_labels[key]=label
                   self.tree.heading(key,text=label,anchor=anchor)
                   self.tree.column(key,width=width,anchor=anchor,stretch=True)
       def _build_statusbar (self):
@@ -267,247 +729,548 @@ class App(ttk.Frame):
             self.clock_var=StringVar(value=datetime.now().strftime("%Y/%m/%d %H:%M:%S"))
             ttk.Label(bar,textvariable=self.status_var).pack(side=LEFT,padx=6)
             ttk.Label(bar,textvariable=self.clock_var).pack(side=RIGHT, padx=6)
+            self.cancel_btn=ttk.Button(bar,text="Cancel",bootstyle=(DANGER, LINK),command=self.cancel_import)
 
       def open_add_dialog(self):
-            TaskDialog(self, on_save=self._add_task)
+            TaskDialog(self, on_save=self._add_task, on_repeat=self._add_series)
       
       def open_edit_dialog(self):
             iid=self._selected_iid()
             if not iid:
                   messagebox.showinfo("Edit Task","Please select a task to edit")
                   return
-            task=next((t for t in self.tasks if t.id==iid),None)
+            task=self.tasks.get(iid)
             if not task:
                   messagebox.showerror("Edit Task","Could not find the task asociated with the iid") 
                   return
             def apply_edits(newtitle:str,newsubject:str,newdue:str,newstatus:str):
-                  task.title=newtitle
-                  task.subject=newsubject
-                  task.duedate=newdue
-                  task.status=newstatus
+                  self.tasks.update(task.id,title=newtitle,subject=newsubject,duedate=newdue,status=newstatus)
                   self.status("Task has been updated")
-                  self._persist()
-                  self.refresh_views()
             TaskDialog(self,on_save=apply_edits,task=task)         
             
       def _add_task(self,title:str,subject:str, due:str,status:str):
             t=Task(id=str(uuid.uuid4()),title=title,subject=subject,duedate=due,status=status)
-            self.tasks.append(t)
+            self.tasks.add(t)
             self.status("Task Added")
-            self._persist()
-            self.refresh_views()
+
+      def _add_series(self,title:str,subject:str,start:str,status:str,freq:str,every:int,until:Optional[str],count:Optional[int]):
+            try:
+                  series=Series(str(uuid.uuid4()),title,subject,start,freq,every,until,count,status)
+            except ValueError as e:
+                  messagebox.showerror("Repeat",str(e))
+                  return
+            self.recurring.add(series,self.tasks)
+            self._save_series()
+            self.status(f"Repeating {freq} task added")
+
+      def stop_selected_series(self):
+            sids={self.tasks.get(iid).series_id for iid in self._selected_iids() if self.recurring.owns(iid)}
+            if not sids:
+                  messagebox.showinfo("Stop Repeating","Please select one or more occurrences of a repeating task")
+                  return
+            if not messagebox.askyesno("Stop Repeating", f"Remove {len(sids)} repeating task(s) and all their occurrences?"):
+                  return
+            for sid in sids:
+                  self.recurring.remove(sid,self.tasks)
+            self._save_series()
+            self.status(f"Stopped {len(sids)} repeating task(s)")
 
       def delete_selected(self):
-            iid=self._selected_iid()
-            if not iid:
+            iids=self._selected_iids()
+            if not iids:
                   return
-            if messagebox.askyesno("Delete", "Delete selected task?"):
-                  self.tasks=[t for t in self.tasks if t.id !=iid]
-                  self.status("Task Deleted")
-                  self._persist()
-                  self.refresh_views()
+            prompt="Delete selected task?" if len(iids) == 1 else f"Delete {len(iids)} selected tasks?"
+            if messagebox.askyesno("Delete", prompt):
+                  removed=self.tasks.remove_many(iids)
+                  self.status("Task Deleted" if len(removed) == 1 else f"{len(removed)} tasks deleted")
+
+      def set_selected_status(self, status: str):
+            iids=self._selected_iids()
+            if not iids:
+                  messagebox.showinfo("Change Status","Please select one or more tasks")
+                  return
+            changed=self.tasks.set_status(iids, status)
+            self.status(f"Marked {len(changed)} task(s) as {status}")
             
       def _selected_iid(self) -> Optional[str]:
-            sel=self.tree.selection()
-            if not sel:
-                  return None
-            return sel[0]
-      def _sort_by(self,key:str):
-            if self.sort_key == key:
-                  self.sort_reverse = not self.sort_reverse
+            iids=self._selected_iids()
+            return iids[0] if iids else None
+      def _selected_iids(self) -> List[str]:
+            ids=self.group_table.selected_ids() if self.grouped_var.get() else self.table.selected_ids
+            return [iid for iid in ids if iid in self.tasks]
+      def _sort_by(self,key:str,add:bool=False):
+            """Click sorts by one column, again flips it; shift-click adds a column or flips it in place"""
+            spec=list(self.sorted_view.spec)
+            cols=[col for col, _ in spec]
+            if add and key in cols:
+                  i=cols.index(key)
+                  spec[i]=(key, not spec[i][1])
+            elif add:
+                  spec.append((key, False))
             else:
-                  self.sort_key, self.sort_reverse = key,False
-            self.refresh_table()
-      def _filtered_sorted(self) -> List[Task]:
+                  spec=[(key, not spec[0][1] if cols == [key] else False)]
+            self.sorted_view.set_spec(spec)
+            self._update_headings()
+            self.refresh_table(scroll_top=True)
+      def _update_headings(self):
+            spec=self.sorted_view.spec
+            for tree in (self.tree, self.group_tree):
+                  for i, (col, desc) in enumerate(spec):
+                        mark=("▼" if desc else "▲") + (str(i + 1) if len(spec) > 1 else "")
+                        tree.heading(col, text=f"{self._col_labels[col]} {mark}")
+                  for col, label in self._col_labels.items():
+                        if col not in dict(spec):
+                              tree.heading(col, text=label)
+      def _on_tree_shift_click(self, event):
+            tree=event.widget
+            if tree.identify_region(event.x, event.y) != "heading":
+                  # shift-click on rows still extends the selection and toggles the check box
+                  return self._on_tree_click(event)
+            col=tree.column(tree.identify_column(event.x), "id")
+            if not col:
+                  return "break"
+            self._sort_by(col, add=True)
+            return "break"
+      def _queries_storage(self) -> bool:
+            # occurrences aren't in the database and groups come from the in-memory index, so while
+            # either is in play the list filters and sorts in memory; so does it while edits wait in
+            # the write window, which the Tk thread shouldn't block on
+            return (hasattr(self.storage, "query") and not self.persister.pending
+                    and not self.recurring.expanded and self._group_filter() is None)
+      def _group_filter(self) -> Optional[Dict[str, Task]]:
+            label=self.group_filter_var.get().strip()
+            return None if label in ("", "ALL") else self.tag_index.lookup(label)
+      @metrics.timed("_filtered_sorted")
+      def _filtered_sorted(self, limit: Optional[int]=None, offset: int=0, group: Optional[Dict[str, Task]]=None,
+                           in_memory: bool=False) -> List[Task]:
             q=self.search_var.get().strip().lower() 
-            items=self.tasks
             status_filter=self.status_filter_var.get().strip()
-            if q:
-                  items=[t for t in items if q in t.title.lower() or q in t.subject.lower()]
-            if status_filter !="All":
-                  items=[t for t in items if t.status==status_filter]
-            def keyfunc(t:Task):
-                  if self.sort_key=="check":
-                        return 1 if t.status=="Done" else 0
-                  if self.sort_key=="title":
-                        return t.title.lower()
-                  if self.sort_key=="subject":
-                        return t.subject.lower()
-                  if self.sort_key=="duedate":
-                        return t.duedate
-                  if self.sort_key=="status":
-                        return STATUS_ORDER.get(t.status,999)
-                  return t.duedate
-                 
-            return sorted(items, key=keyfunc,reverse=self.sort_reverse)
-      def refresh_table(self):
-            for iid in self.tree.get_children():
-                  self.tree.delete(iid)
-            today= date.today()
-            
-            for i,t in enumerate(self._filtered_sorted()):
-                  tags=["even" if i % 2 ==0 else "odd"]
-                  chk=CHECK_FULL if t.status=="Done" else CHECK_EMPTY
-                  
-                  d=parse_date(t.duedate)
-                  if d:
-                        if d < today:
-                              tags.append("overdue")
-                        
-                        elif d == today:
-                              tags.append("today")
-                  self.tree.insert(
-                        "", tk.END, iid=t.id,
-                        values=(chk,t.title,t.subject,t.duedate, t.status),
-                        tags=tuple(tags)
-                  )  
+            if group is None and not in_memory and self._queries_storage():
+                  return self.storage.query(q, status_filter, self.sorted_view.spec, False, limit, offset)
+            selected=self._group_filter()
+            if selected is not None:
+                  group=selected if group is None else {tid: t for tid, t in group.items() if tid in selected}
+            items=filter_sort(self.tasks, q, status_filter, self.sorted_view.spec, index=self.search_index, view=self.sorted_view, group=group)
+            return items[offset:] if limit is None else items[offset:offset + limit]
+      def _subgroups(self, key: str):
+            index=self.tag_index
+            # nested subjects show their own part of the path, the parents are above them
+            subs=[(k, index.labels[k].rpartition(SUBJECT_SEP)[2], len(index.groups[k])) for k in index.subgroups(key)]
+            if key == "" and index.subgroups(TAGS_KEY):
+                  subs.append((TAGS_KEY, "Tags", len(index.subgroups(TAGS_KEY))))
+            return subs
+      def _group_rows(self, key: str) -> List[Task]:
+            if key == TAGS_KEY:
+                  return []
+            # a subject lists its own tasks, its subgroups hold the rest; a tag lists all of its tasks
+            group=self.tag_index.groups.get(key, {}) if key.startswith(TAG_PREFIX) else self.tag_index.exact.get(key, {})
+            return self._filtered_sorted(group=group)
+      def _on_grouped(self):
+            if self.grouped_var.get():
+                  self.flat_frame.pack_forget()
+                  self.group_frame.pack(fill=BOTH,expand=YES)
+            else:
+                  self.group_frame.pack_forget()
+                  self.flat_frame.pack(fill=BOTH,expand=YES)
+            self.refresh_table(scroll_top=True)
+      @metrics.timed("refresh_table")
+      def refresh_table(self, scroll_top: bool=False):
+            if self.grouped_var.get():
+                  self.group_table.refresh()
+                  return
+            if self._queries_storage():
+                  total=self.storage.count(self.search_var.get().strip().lower(), self.status_filter_var.get().strip())
+                  self.table.set_source(total, lambda offset, n: self._filtered_sorted(n, offset), scroll_top)
+            else:
+                  rows=self._filtered_sorted(in_memory=True)
+                  self.table.set_source(len(rows), lambda offset, n: rows[offset:offset + n], scroll_top)
+      def _row_values(self, t: Task, index: int):
+            return row_values(t, index, self._today)
 
+      @metrics.timed("refresh_views")
       def refresh_views(self):
             self.refresh_table()
             self.refresh_board()
+            self.refresh_schedule()
+            self.refresh_dashboard()
+
+      def _on_tab_changed(self):
+            if self._board_stale:
+                  self.refresh_board()
+            self.refresh_schedule()
+            self.refresh_dashboard()
+            self.refresh_debug()
+
+      @metrics.timed("refresh_dashboard")
+      def refresh_dashboard(self):
+            # the counters are kept current by their listener; only the visible tab is redrawn
+            if self.nb.select() != str(self.tab_dashboard):
+                  return
+            stats=self.stats
+            values={"total": stats.total, **dict(zip(statusoptions, stats.by_status)), **stats.by_bucket}
+            for name,var in self.stat_vars.items():
+                  var.set(str(values[name]))
+            rows=stats.subjects()
+            self.subject_table.set_source(len(rows), lambda offset, n: rows[offset:offset + n])
+      def _subject_row_values(self, r, index: int):
+            progress=f"{r.done * 100 // r.total}%" if r.total else "-"
+            return (r.id, r.total - r.done, r.done, r.total, progress), ("even" if index % 2 == 0 else "odd",)
+
+      def toggle_debug_tab(self):
+            if self.nb.tab(self.tab_debug,"state") == "hidden":
+                  self.nb.tab(self.tab_debug,state="normal")
+                  self.nb.select(self.tab_debug)
+            else:
+                  self.nb.tab(self.tab_debug,state="hidden")
+      def refresh_debug(self):
+            if self.nb.select() != str(self.tab_debug):
+                  return
+            snap=metrics.snapshot()
+            rows=[(f"span:{name}", name, (h["count"],) + tuple(f"{h[k]:.2f}" for k in ("mean_ms","p50_ms","p90_ms","p99_ms","max_ms")))
+                  for name,h in snap["spans"].items()]
+            counters=snap["counters"]
+            rows += [(f"count:{name}", name, (n,) + ("",) * 5) for name,n in counters.items()]
+            if "widgets.created" in counters:
+                  rows.append(("count:widgets.live", "widgets.live", (counters["widgets.created"] - counters.get("widgets.destroyed", 0),) + ("",) * 5))
+            tree=self.debug_tree
+            wanted={iid for iid,_,_ in rows}
+            for iid in tree.get_children():
+                  if iid not in wanted:
+                        tree.delete(iid)
+            for iid,name,values in rows:
+                  if tree.exists(iid):
+                        tree.item(iid,values=values)
+                  else:
+                        tree.insert("",tk.END,iid=iid,text=name,values=values)
+            persist=self.persister.stats()
+            self.debug_info.set(f"recording {'on' if metrics.enabled else 'off'} for {snap['seconds']:.0f}s | "
+                                f"{persist['writes']} write(s), {persist['coalesced']} coalesced, {persist['queued']} queued")
+      def _toggle_profiling(self):
+            metrics.enabled=self.profile_var.get()
+            self.refresh_debug()
+      def _reset_metrics(self):
+            metrics.reset()
+            self.refresh_debug()
+      def export_metrics(self):
+            path=fd.asksaveasfilename(
+                  title="Export Timings",
+                  defaultextension=".json",
+                  filetypes=[("JSON Files", "*.json")]
+            )
+            if not path:
+                  return
+            try:
+                  metrics.export(path, {"persist": self.persister.stats(), "tasks": len(self.tasks), "engine": type(self.storage).__name__})
+            except OSError as e:
+                  messagebox.showerror("Export Timings", f"Could not write file:\n{e}")
+                  return
+            self.status(f"Timings exported to {path}")
+
+      @metrics.timed("refresh_schedule")
+      def refresh_schedule(self):
+            # the plan itself is kept current by its listener; rows are only built while the tab is shown
+            if self.nb.select() != str(self.tab_schedule):
+                  return
+            rows=self.schedule.rows()
+            self.schedule_table.set_source(len(rows), lambda offset, n: rows[offset:offset + n])
+            info=self.schedule.summary()
+            late=f"{info['late']} late (worst {info['max_late_days']} day(s))" if info["late"] else "all on time"
+            self.schedule_info.set(f"{info['tasks']} task(s), {info['hours']:g}h, {late}, done by {day_str(info['last_day'])}")
+      def _schedule_row_values(self, r, index: int):
+            tags=["even" if index % 2 == 0 else "odd"]
+            if self.schedule.finish[r.id] > r.task.due_ord:
+                  tags.append("late")
+            if r.day == self._today:
+                  tags.append("today")
+            return (day_str(r.day), f"{r.minutes / 60:g}", r.task.title, r.task.subject, r.task.duedate), tuple(tags)
+      def _on_schedule_select(self, _event=None):
+            ids=self.schedule_table.selected_ids
+            if ids:
+                  self.effort_var.set(f"{self.schedule.effort(ids[-1]):g}")
+      def _on_schedule_settings(self):
+            try:
+                  capacity=float(self.capacity_var.get())
+            except ValueError:
+                  self.status("Hours per day must be a number")
+                  return
+            if capacity <= 0:
+                  self.status("Hours per day must be more than 0")
+                  return
+            self.schedule.configure(capacity, self.mode_var.get())
+            self._save_schedule()
+            self.refresh_schedule()
+      def _set_effort(self):
+            try:
+                  hours=float(self.effort_var.get())
+            except ValueError:
+                  self.status("Effort must be a number of hours")
+                  return
+            ids=self.schedule_table.selected_ids if self.nb.select() == str(self.tab_schedule) else self._selected_iids()
+            ids=[tid for tid in dict.fromkeys(ids) if tid in self.tasks]
+            if not ids or hours < 0:
+                  self.status("Select one or more tasks and enter their effort in hours")
+                  return
+            for tid in ids:
+                  self.schedule.set_effort(tid, hours)
+            self._save_schedule()
+            self.refresh_schedule()
+            self.status(f"Effort set to {hours:g}h for {len(ids)} task(s)")
+      def _save_schedule(self):
+            try:
+                  save_schedule(self.schedule_file, self.schedule, self.tasks)
+            except OSError as e:
+                  self.status(f"Could not save schedule settings: {e}")
       
+      @metrics.timed("refresh_board")
       def refresh_board(self):
-            for status, frame in self.col_frames.items():
-                  for child in frame.winfo_children():
-                        child.destroy()
-            for t in self._filtered_sorted():
-                  parent=self.col_frames.get(t.status)
-                  if not parent:
-                        continue
-                  card=ttk.Frame(parent, padding=8)
-                  card.pack(fill=X,pady=6)
-                  ttk.Label(card, text=t.title, font=("Segoe U",10,"bold")).pack(anchor=W)
-                  ttk.Label(card,text=f"{t.subject}- Due {t.duedate}").pack(anchor=W)
+            # cards are only rebuilt while the tab is shown; changes made meanwhile wait for it to open
+            if self.nb.select() != str(self.tab_board):
+                  self._board_stale=True
+                  return
+            self._board_stale=False
+            # every column needs its rows, which the in-memory view has without a round trip to SQL
+            rows=self._filtered_sorted(in_memory=True)
+            if self.board_group_var.get() == "subject":
+                  index=self.tag_index
+                  top=index.subgroups("")
+                  # the biggest subjects get a column each, the rest share one
+                  keys=set(sorted(top, key=lambda k: -len(index.groups[k]))[:BOARD_SUBJECT_COLUMNS])
+                  columns=[(k, index.labels[k]) for k in top if k in keys]
+                  if len(top) > len(keys):
+                        columns.append(("", "Other"))
+                  def column_of(t):
+                        key=index.top_subject(t.id)
+                        return key if key in keys else ""
+            else:
+                  columns=[(status, status) for status in statusoptions]
+                  column_of=lambda t: t.status
+            self._set_board_columns(columns)
+            buckets={key: [] for key, _ in columns}
+            for t in rows:
+                  bucket=buckets.get(column_of(t))
+                  if bucket is not None:
+                        bucket.append(t)
+            for key, col in self.board_columns.items():
+                  col.show(buckets[key])
+      def _set_board_columns(self, columns):
+            """Board columns for (key, title) pairs, reusing the ones that stay"""
+            if [(key, col.title) for key, col in self.board_columns.items()] == list(columns):
+                  return
+            old=self.board_columns
+            self.board_columns={}
+            for key, title in columns:
+                  col=old.get(key)
+                  if col is None or col.title != title:
+                        col=BoardColumn(self.board,title)
+                  else:
+                        del old[key]
+                  self.board_columns[key]=col
+            for col in old.values():
+                  metrics.count("widgets.destroyed", 3 * len(col.cards))
+                  col.frame.destroy()
+            for idx, col in enumerate(self.board_columns.values()):
+                  col.frame.grid(row=0,column=idx,sticky=NSEW,padx=6)
+                  self.board.grid_columnconfigure(idx, weight=1, uniform="col")
+            # columns left over from a wider board stop taking space
+            for idx in range(len(self.board_columns), self.board.grid_size()[0]):
+                  self.board.grid_columnconfigure(idx, weight=0, uniform="")
       
       def status(self,msg:str):
             self.status_var.set(msg)
 
       def _tick(self):
-            self.clock_var.set(datetime.now().strftime("%Y/%m/%d %H:%M:%S"))   
-            self.after(1000,self._tick)
+            now=datetime.now()
+            tick=time.perf_counter()
+            if self._last_tick is not None:
+                  # how late the timer fired is how long the event loop was busy with something else
+                  metrics.observe("tk.loop_lag", max(0.0, tick - self._last_tick - TICK_MS / 1000))
+            self._last_tick=tick
+            self.clock_var.set(now.strftime("%Y/%m/%d %H:%M:%S"))   
+            if now.toordinal() != self._today:
+                  self._today=now.toordinal()
+                  self.schedule.configure(today=self._today)
+                  self.stats.set_today(self._today)
+                  self.recurring.show(self.tasks, recurrence_window(self._today))
+                  if self.tasks:
+                        self.refresh_table()
+                        self.refresh_schedule()
+                        self.refresh_dashboard()
+            errors=self.persister.take_errors()
+            if errors:
+                  self.status(f"Save failed, will retry: {errors[-1]}")
+            if self.storage.changed():
+                  self._merge_from_disk()
+            self.refresh_debug()
+            self.after(TICK_MS,self._tick)
+      def _merge_from_disk(self):
+            """Pick up tasks another window or script saved; the views only patch the rows that differ"""
+            with metrics.span("storage.poll"):
+                  incoming=self.storage.poll(list(self._stored()))
+            if incoming:
+                  changed, removed=incoming
+                  self.tasks.merge(changed, removed)
+                  self.status(f"Merged {len(changed) + len(removed)} change(s) saved elsewhere")
 
       def _on_tree_click(self, event):
-            region=self.tree.identify_region(event.x, event.y)
+            tree=event.widget
+            table=self.group_table if tree is self.group_tree else self.table
+            region=tree.identify_region(event.x, event.y)
             if region !="cell":
                   return
-            col=self.tree.identify_column(event.x)
-            row_iid=self.tree.identify_row(event.y)
+            col=tree.identify_column(event.x)
+            row_iid=table.task_id(tree.identify_row(event.y))
             if not row_iid:
                   return
             if col !="#1":
                   return
-            task = next((t for t in self.tasks if t.id == row_iid), None)
+            task = self.tasks.get(row_iid)
             if not task:
                   return
             
             if task.status=="Done":
-               task.status="To Do"
+               self.tasks.update(task.id, status="To Do")
                self.status("Marked as To Do")
             else:
-                  task.status="Done"
+                  self.tasks.update(task.id, status="Done")
                   self.status("Marked as Done")
-            
-            self._persist()
-            self.refresh_views()
       def _load_initial(self):
-            loaded=self.storage.load()
-            self.tasks=loaded
-            self.refresh_views()
-            self.status(f"Loaded {len(self.tasks)} task(s).")
-      def _persist(self):
+            with metrics.span("storage.load"):
+                  loaded=self.storage.load()
+            self.tasks.load(loaded)
+            self.recurring.show(self.tasks, recurrence_window(self._today))
+            self.status(f"Loaded {len(loaded)} task(s).")
+      def _on_tasks_changed(self, kind: str, changed: List[Task], removed: List[str]):
+            if kind in ("load", "merge"):
+                  return
+            if kind == "reset":
+                  # a restore: the file becomes exactly this, never merged with what's on disk
+                  self._persist(replace=True)
+                  return
+            if self.recurring.expanded:
+                  # edits to occurrences belong to their series, not to the planner file
+                  changed, removed, touched=self.recurring.record(changed, removed)
+                  if touched:
+                        self._save_series()
+                  if not changed and not removed:
+                        return
+            self._persist(changed, removed)
+      def _persist(self, changed: Optional[List[Task]]=None, removed: Optional[List[str]]=None, replace: bool=False):
+            self.persister.submit(self._stored(), changed, removed, replace)
+      def _stored(self):
+            """The tasks that belong in the planner file, for one pass; occurrences of a series only live in memory"""
+            if not self.recurring.expanded:
+                  return self.tasks
+            # lazy, so an edit the persistence worker writes as a change set never filters the whole list
+            return (t for t in self.tasks if not isinstance(t, Occurrence))
+      def _save_series(self):
             try:
-                  self.storage.save(self.tasks)
-            except Exception as e:
-                  messagebox.showerror("Save Error", f"Could not save tasks:\n{e}")
+                  save_series(self.series_file, self.recurring)
+            except OSError as e:
+                  self.status(f"Could not save repeating tasks: {e}")
       def import_csv(self):
+            if self._import:
+                  self.status("An import is already running")
+                  return
             path= fd.askopenfilename(
                   title="Import CSV",
                   filetypes=[("CSV Files", "*.csv"), ("ALL Files", "*.*")]
             )
             if not path:
                   return
-            added = skipped_dup=invalid = 0
-            existing_ids = {t.id for t in self.tasks}
-            try:
-                  with open(path, "r", encoding="utf-8", newline="") as f:
-                        reader=csv.DictReader(f)
-                        missing = [h for h in ["title", "subject", "duedate"]if h not in reader.fieldnames]
-                        if missing:
-                              messagebox.showerror("Import CSV", f"Missing required column(s): {','.join(missing)}")
-                              return
-                        for row in reader:
-                              title=(row.get("title")or "").strip()
-                              subject=(row.get("subject")or "").strip()
-                              duedate=(row.get("duedate")or "").strip()
-                              status=(row.get("status")or "To Do").strip()
-                              tid=(row.get("id")or "").strip()
-                              if not title or not subject or not valid_date(duedate):
-                                    invalid +=1
-                                    continue
-                              if status not in statusoptions:
-                                    status="To Do"
-                              if not tid:
-                                    tid= str(uuid.uuid4())
-                              if tid in existing_ids:
-                                    skipped_dup +=1
-                                    continue
-                              self.tasks.append(Task(id=tid,title=title, subject=subject,duedate=duedate, status=status))
-                              existing_ids.add(tid)
-                              added +=1
-            except Exception as e:
-                  messagebox.showerror("Import CSV", f"Could not import file:\n{e}")
-                  return
+            self._import=CsvImport(path, self.tasks).start()
+            self.cancel_btn.pack(side=LEFT,padx=6)
+            self._poll_import()
+
+      def cancel_import(self):
+            if self._import:
+                  self._import.cancel()
 
-            self._persist()
-            self.refresh_views()
+      def _poll_import(self):
+            job=self._import
+            if not job.done.is_set():
+                  self.status(f"Importing {os.path.basename(job.path)}: {job.rows} row(s) read...")
+                  self.after(IMPORT_POLL_MS, self._poll_import)
+                  return
+            self._import=None
+            self.cancel_btn.pack_forget()
+            if job.cancelled.is_set():
+                  self.status("Import cancelled, nothing was added")
+                  return
+            if job.error:
+                  self.status("Import failed")
+                  messagebox.showerror("Import CSV", f"Could not import file:\n{job.error}")
+                  return
+            if job.missing:
+                  self.status("Import failed")
+                  messagebox.showerror("Import CSV", f"Missing required column(s): {','.join(job.missing)}")
+                  return
+            # ids added from the UI while the worker was running count as duplicates too
+            fresh=[t for t in job.tasks if t.id not in self.tasks]
+            skipped_dup=job.skipped_dup + len(job.tasks) - len(fresh)
+            self.tasks.add_many(fresh)
+            self.status(f"Imported {len(fresh)} task(s)")
             messagebox.showinfo(
                   "Import CSV",
-                  f"Imported from: {os.path.basename(path)}\n\n"
-                  f"Added: {added}\n"
+                  f"Imported from: {os.path.basename(job.path)}\n\n"
+                  f"Added: {len(fresh)}\n"
                   f"Skipped (duplicate ids): {skipped_dup}\n"
-                  f"Invalid rows: {invalid}"
+                  f"Invalid rows: {job.invalid}"
             )
 
-      def export_csv(self):
+      def _view_iter(self):
+            """The list view's rows, searched, filtered and sorted, as a stream"""
+            q=self.search_var.get().strip().lower()
+            status_filter=self.status_filter_var.get().strip()
+            if self._queries_storage():
+                  return self.storage.iter_query(q, status_filter, self.sorted_view.spec)
+            return iter(self._filtered_sorted(in_memory=True))
+
+      def export_tasks(self, view_only: bool=False):
+            title="Export Current View" if view_only else "Export"
             path = fd.asksaveasfilename(
-                  title="Export CSV",
+                  title=title,
                   defaultextension=".csv",
-                  filetypes=[("CSV Files", "*.csv")]
-
+                  filetypes=[(f"{label} Files", f"*{ext}") for label, ext in EXPORT_FORMATS.values()]
             )
             if not path:
                   return
-                  
             try:
-                  with open(path, "w", encoding="utf-8", newline="") as f:
-                        writer=csv.DictWriter(f, fieldnames=CSV_HEADERS)
-                        writer.writeheader()
-                        for t in self.tasks:
-                              writer.writerow({
-                                    "id": t.id,
-                                    "title": t.title,
-                                    "subject": t.subject,
-                                    "duedate": t.duedate,
-                                    "status": t.status
-                              })
+                  # the file's extension picks the format; anything else is written as CSV
+                  n=export_file(self._view_iter() if view_only else self._stored(), path)
             except Exception as e:
-                  messagebox.showerror("Export CSV", f"Could not expert file:\n{e}")
+                  messagebox.showerror(title, f"Could not export file:\n{e}")
                   return
-            messagebox.showinfo("Export CSV", f"Exported {len(self.tasks)} task(s) to:\n{path}")
+            messagebox.showinfo(title, f"Exported {n} task(s) to:\n{path}")
       
       def backup_json(self):
-            os.makedirs(BACKUP_DIR, exist_ok=True)
-            ts=datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-            path= os.path.join(BACKUP_DIR, f"planner-{ts}.json")
-
             try:
-                  payload = [asdict(t) for t in self.tasks]
-                  with open(path, "w", encoding="utf-8") as f:
-                        json.dump(payload, f, ensure_ascii=False, indent=2)
+                  entry=self.backups.backup(self._stored())
             except Exception as e:
                   messagebox.showerror("Backup JSON", f"Could not create backup:\n{e}")
                   return
-            messagebox.showinfo("Backup JSON", f"Backup saved to:\n{path}")
+            what="full snapshot" if entry["kind"] == "full" else f"{entry['changed']} changed task(s)"
+            messagebox.showinfo("Backup JSON", f"Backup {entry['name']} saved ({what}) to:\n{self.backups.root}")
+
+      def restore_backup(self):
+            try:
+                  gens=self.backups.generations()
+            except Exception as e:
+                  messagebox.showerror("Restore Backup", f"Could not read backups:\n{e}")
+                  return
+            if not gens:
+                  messagebox.showinfo("Restore Backup", "No backups yet. Use File > Backup JSON first.")
+                  return
+            RestoreDialog(self, gens, on_restore=self._restore_generation)
+
+      def _restore_generation(self, name: str):
+            try:
+                  restored=self.backups.restore(name)
+            except Exception as e:
+                  messagebox.showerror("Restore Backup", f"Could not restore backup:\n{e}")
+                  return
+            self.tasks.replace(restored)
+            self.recurring.show(self.tasks)
+            messagebox.showinfo("Restore Backup", f"Restored {len(restored)} task(s) from backup {name}")
 
       def restore_json(self):
             path=fd.askopenfilename(
@@ -527,30 +1290,20 @@ class App(ttk.Frame):
             restored: List[Task]=[]
             try:
                   if isinstance(raw, list):
-                        for item in raw:
-                              if not isinstance(item,dict):
-                                    continue
-                              tid=str(item.get("id")or uuid.uuid4())
-                              title=str(item.get("title")or "").strip()
-                              subject=str(item.get("subject")or "").strip()
-                              duedate=str(item.get("duedate")or "").strip()
-                              status=str(item.get("status")or "").strip()
-                              if not title or not subject or not valid_date(duedate):
-                                    continue
-                              if status not in statusoptions:
-                                    status="To Do"
-                              restored.append(Task(id=tid, title=title, subject=subject,duedate=duedate,status=status))
+                        # tasks without a due date were always skipped on restore
+                        restored=tasks_from_records([item for item in raw if not isinstance(item, dict) or item.get("duedate")])
             except Exception as e:
                   messagebox.showerror("Restore JSON", f"Backup content invalid:\n{e}")
                   return
-            self.tasks=restored
-            self._persist()
-            self.refresh_views()
-            messagebox.showinfo("Restore JSON", f"Restored {len(self.tasks)} task(s from:\n{path})")
+            self.tasks.replace(restored)
+            self.recurring.show(self.tasks)
+            messagebox.showinfo("Restore JSON", f"Restored {len(restored)} task(s from:\n{path})")
      
       def on_close(self):
             try:
-                  self._persist()
+                  if not self.persister.stop(timeout=10):
+                        messagebox.showerror("Save Error", f"Could not save tasks:\n{self.persister.take_errors() or 'timed out'}")
+                  self.storage.close()
             finally:
                   self.winfo_toplevel().destroy()
 
@@ -0,0 +1 @@
+"""Headless core of the Smart Study Planner: tasks, storage, backups and the CLI"""
@@ -0,0 +1,177 @@
+import os
+
+import json
+
+import gzip
+
+import hashlib
+
+import re
+
+from datetime import datetime
+
+from typing import List, Optional
+
+from planner.core import BACKUP_DIR, Task, tasks_from_records
+
+
+BACKUP_STORE_DIR=os.path.join(BACKUP_DIR,"store")
+BACKUP_FULL_EVERY=10
+BACKUP_KEEP_LAST=10
+BACKUP_KEEP_HOURLY=24
+BACKUP_KEEP_DAILY=30
+_LEGACY_TIME=re.compile(r"(\d{4}-\d{2}-\d{2}-\d{2}-\d{2}-\d{2})\.json$")
+
+def legacy_backup_time(path: str) -> datetime:
+      """When an old backups/planner-<yyyy-mm-dd-HH-MM-SS>.json was taken; its mtime if the name doesn't say"""
+      m=_LEGACY_TIME.search(os.path.basename(path))
+      if m:
+            try:
+                  return datetime.strptime(m.group(1), "%Y-%m-%d-%H-%M-%S")
+            except ValueError:
+                  pass
+      return datetime.fromtimestamp(os.path.getmtime(path))
+
+class BackupStore:
+      """Content-addressed backups: a full snapshot every full_every generations, deltas of changed tasks between"""
+      def __init__(self, root: str=BACKUP_STORE_DIR, full_every: int=BACKUP_FULL_EVERY, keep_last: int=BACKUP_KEEP_LAST,
+                   keep_hourly: int=BACKUP_KEEP_HOURLY, keep_daily: int=BACKUP_KEEP_DAILY):
+            self.root=root
+            self.objects=os.path.join(root, "objects")
+            self.index_path=os.path.join(root, "index.json")
+            self.full_every=full_every
+            self.keep_last=keep_last
+            self.keep_hourly=keep_hourly
+            self.keep_daily=keep_daily
+            self._head: Optional[str]=None
+            self._hashes: dict={}
+      def generations(self) -> List[dict]:
+            """Index entries, oldest first: name, time, kind, object, base, count, changed"""
+            try:
+                  with open(self.index_path, "r", encoding="utf-8") as f:
+                        return json.load(f)
+            except (OSError, ValueError):
+                  return []
+      def _write_index(self, gens: List[dict]) -> None:
+            tmp=self.index_path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                  json.dump(gens, f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self.index_path)
+      def _put(self, payload: dict) -> str:
+            data=json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            name=hashlib.sha256(data).hexdigest()[:32]
+            path=os.path.join(self.objects, name + ".json.gz")
+            if not os.path.exists(path):
+                  with open(path + ".tmp", "wb") as f:
+                        f.write(gzip.compress(data, compresslevel=6))
+                  os.replace(path + ".tmp", path)
+            return name
+      def _get(self, name: str) -> dict:
+            with open(os.path.join(self.objects, name + ".json.gz"), "rb") as f:
+                  return json.loads(gzip.decompress(f.read()))
+      @staticmethod
+      def _digest(row: list) -> bytes:
+            return hashlib.blake2b("\x1f".join(row).encode("utf-8"), digest_size=8).digest()
+      def _chain(self, gens: List[dict], name: str) -> List[dict]:
+            by_name={g["name"]: g for g in gens}
+            chain=[by_name[name]]
+            while chain[-1]["kind"] != "full":
+                  chain.append(by_name[chain[-1]["base"]])
+            chain.reverse()
+            return chain
+      def _rows(self, gens: List[dict], name: str) -> dict:
+            rows: dict={}
+            for g in self._chain(gens, name):
+                  obj=self._get(g["object"])
+                  if g["kind"] == "full":
+                        rows={r[0]: r for r in obj["tasks"]}
+                        continue
+                  for r in obj["put"]:
+                        rows[r[0]]=r
+                  for tid in obj["del"]:
+                        rows.pop(tid, None)
+            return rows
+      def backup(self, tasks, now: Optional[datetime]=None) -> dict:
+            """Store a new generation and apply the retention policy; returns its index entry"""
+            now=now or datetime.now()
+            os.makedirs(self.objects, exist_ok=True)
+            gens=self.generations()
+            rows={t.id: [t.id, t.title, t.subject, t.duedate, t.status] for t in tasks}
+            hashes={tid: self._digest(r) for tid, r in rows.items()}
+            head=gens[-1] if gens else None
+            if head and self._head != head["name"]:
+                  self._hashes={tid: self._digest(r) for tid, r in self._rows(gens, head["name"]).items()}
+            depth=len(self._chain(gens, head["name"])) if head else 0
+            if not head or depth >= self.full_every:
+                  kind, changed="full", len(rows)
+                  obj=self._put({"kind": "full", "tasks": list(rows.values())})
+            else:
+                  prev=self._hashes
+                  put=[rows[tid] for tid, h in hashes.items() if prev.get(tid) != h]
+                  dels=[tid for tid in prev if tid not in hashes]
+                  kind, changed="delta", len(put) + len(dels)
+                  obj=self._put({"kind": "delta", "put": put, "del": dels})
+            name=now.strftime("%Y-%m-%d-%H-%M-%S")
+            taken={g["name"] for g in gens}
+            n=1
+            while name in taken:
+                  n += 1
+                  name=f"{now:%Y-%m-%d-%H-%M-%S}-{n}"
+            entry={"name": name, "time": now.isoformat(timespec="seconds"), "kind": kind, "object": obj,
+                   "base": head["name"] if kind == "delta" else None, "count": len(rows), "changed": changed}
+            gens.append(entry)
+            self.prune(gens, now)
+            self._head, self._hashes=name, hashes
+            return entry
+      def import_generations(self, snapshots) -> int:
+            """Add (time, tasks) snapshots from before the store existed, oldest first
+
+            Only into an empty store, so importing twice or into existing history changes nothing.
+            The retention policy applies as if each had been backed up at its time.
+            """
+            if self.generations():
+                  return 0
+            n=0
+            for taken, tasks in snapshots:
+                  self.backup(tasks, taken)
+                  n += 1
+            return n
+      def prune(self, gens: List[dict], now: Optional[datetime]=None) -> List[dict]:
+            """Keep the last N, newest per hour and per day, plus whatever their delta chains need
+
+            Writes the index of what's kept, then deletes the objects nothing references any more.
+            """
+            now=now or datetime.now()
+            keep={g["name"] for g in gens[-self.keep_last:]} if self.keep_last else set()
+            hourly, daily={}, {}
+            for g in gens:
+                  t=datetime.fromisoformat(g["time"])
+                  age=now - t
+                  if age.total_seconds() < self.keep_hourly * 3600:
+                        hourly[t.strftime("%Y%m%d%H")]=g["name"]
+                  if age.days < self.keep_daily:
+                        daily[t.strftime("%Y%m%d")]=g["name"]
+            keep |= set(hourly.values()) | set(daily.values())
+            for name in list(keep):
+                  keep.update(g["name"] for g in self._chain(gens, name))
+            kept=[g for g in gens if g["name"] in keep]
+            # index first: a crash before the deletes leaves unused objects, never an index pointing at missing ones
+            self._write_index(kept)
+            used={g["object"] for g in kept}
+            if os.path.isdir(self.objects):
+                  for fn in os.listdir(self.objects):
+                        if fn.endswith(".json.gz") and fn[:-len(".json.gz")] not in used:
+                              os.remove(os.path.join(self.objects, fn))
+            return kept
+      def restore(self, name: Optional[str]=None, at: Optional[datetime]=None) -> List[Task]:
+            """Tasks as of a generation, or of the newest generation taken at or before at"""
+            gens=self.generations()
+            if name is None:
+                  if at is not None:
+                        gens_before=[g for g in gens if datetime.fromisoformat(g["time"]) <= at]
+                  else:
+                        gens_before=gens
+                  if not gens_before:
+                        raise LookupError("no backup at or before that time")
+                  name=gens_before[-1]["name"]
+            return tasks_from_records(list(self._rows(gens, name).values()))
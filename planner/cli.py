@@ -0,0 +1,338 @@
+"""Command line interface: python -m planner <command> [options]
+
+Exit codes: 0 success, 1 error, 2 bad usage, 3 import finished but skipped invalid rows.
+"""
+import argparse
+
+import itertools
+
+import json
+
+import os
+
+import sys
+
+import uuid
+
+from datetime import datetime
+
+from typing import Iterable, List, Optional
+
+from planner.core import DATA_FILE, CsvImport, Task, dateformat, filter_sort, normalize, parse_sort, statusoptions
+
+from planner.export import EXPORT_FORMATS, export_file, export_format, export_tasks
+
+from planner.metrics import metrics
+
+from planner.tags import TagIndex
+
+from planner.storage import STORAGE_ENGINE, StorageError, open_storage, storage
+
+
+EXIT_OK=0
+EXIT_ERROR=1
+EXIT_USAGE=2
+EXIT_PARTIAL=3
+
+
+class CliError(Exception):
+      pass
+
+
+def _open(args) -> storage:
+      if args.engine == "json":
+            return storage(args.file)
+      return open_storage(args.file, args.engine)
+
+
+def _save(store: storage, tasks: List[Task], replace: bool=False) -> None:
+      store.save(tasks, replace)
+      store.close()
+
+
+def _select(args, store: storage) -> Iterable[Task]:
+      end=None if args.limit is None else args.offset + args.limit
+      if args.group:
+            # subjects and tags are indexed in memory, so a group needs every task loaded once
+            tasks=store.load()
+            index=TagIndex()
+            index.rebuild(tasks)
+            group=index.lookup(args.group)
+            if args.sort != "none":
+                  return filter_sort(tasks, args.search or "", args.status, args.sort, args.reverse, group=group)[args.offset:end]
+            items=(t for t in tasks if t.id in group)
+      elif args.sort != "none" and hasattr(store, "iter_query"):
+            return store.iter_query(args.search or "", args.status, args.sort, args.reverse, args.limit, args.offset)
+      elif args.sort != "none":
+            return filter_sort(store.load(), args.search or "", args.status, args.sort, args.reverse)[args.offset:end]
+      else:
+            # file order: stream straight from storage without holding every task
+            items=store.iter()
+      if args.search:
+            q=normalize(args.search.strip())
+            items=(t for t in items if q in normalize(t.title) or q in normalize(t.subject))
+      if args.status != "ALL":
+            items=(t for t in items if t.status == args.status)
+      return itertools.islice(items, args.offset, end)
+
+
+def _emit(tasks, fmt: str, out) -> int:
+      if fmt in EXPORT_FORMATS:
+            return export_tasks(tasks, out, fmt)
+      n=0
+      for t in tasks:
+            out.write(f"{t.duedate}  {t.status:<11}  {t.subject:<20.20}  {t.title}\n")
+            n += 1
+      return n
+
+
+def cmd_list(args) -> int:
+      store=_open(args)
+      _emit(_select(args, store), args.format, sys.stdout)
+      store.close()
+      return EXIT_OK
+
+
+def cmd_import(args) -> int:
+      store=_open(args)
+      tasks=store.load()
+      job=CsvImport(args.csv, {t.id for t in tasks}).run()
+      if job.error:
+            raise CliError(f"could not import {args.csv}: {job.error}")
+      if job.missing:
+            raise CliError(f"missing required column(s): {','.join(job.missing)}")
+      if job.tasks:
+            store.apply(tasks + job.tasks, changed=job.tasks, removed=[])
+      store.close()
+      print(f"Added: {job.added}\nSkipped (duplicate ids): {job.skipped_dup}\nInvalid rows: {job.invalid}")
+      return EXIT_PARTIAL if job.invalid else EXIT_OK
+
+
+def cmd_export(args) -> int:
+      store=_open(args)
+      tasks=_select(args, store)
+      fmt=args.format or export_format(args.out)
+      if args.out == "-":
+            n=_emit(tasks, fmt, sys.stdout)
+      else:
+            n=export_file(tasks, args.out, fmt)
+            print(f"Exported {n} task(s) to {args.out}", file=sys.stderr)
+      store.close()
+      return EXIT_OK
+
+
+def cmd_backup(args) -> int:
+      from planner.backup import BackupStore
+      store=_open(args)
+      entry=BackupStore(args.store).backup(store.load())
+      store.close()
+      print(f"{entry['name']}  {entry['kind']}  {entry['count']} task(s), {entry['changed']} changed")
+      return EXIT_OK
+
+
+def cmd_restore(args) -> int:
+      from planner.backup import BackupStore
+      backups=BackupStore(args.store)
+      if args.list:
+            for g in backups.generations():
+                  print(f"{g['name']}  {g['kind']:<5}  {g['count']} task(s), {g['changed']} changed")
+            return EXIT_OK
+      at=datetime.fromisoformat(args.at) if args.at else None
+      try:
+            tasks=backups.restore(args.name, at)
+      except (LookupError, KeyError, OSError) as e:
+            raise CliError(f"no such backup: {e}")
+      # a restore puts the planner back as it was, tasks added since included
+      _save(_open(args), tasks, replace=True)
+      print(f"Restored {len(tasks)} task(s)")
+      return EXIT_OK
+
+
+def cmd_stats(args) -> int:
+      from planner.stats import TaskStats
+      store=_open(args)
+      counts=TaskStats.from_tasks(store.load())
+      store.close()
+      due=counts.by_bucket
+      stats={"total": counts.total, **dict(zip(statusoptions, counts.by_status)), "subjects": len(counts.by_subject),
+             "overdue": due["overdue"], "due_today": due["today"], "due_week": due["next 7 days"]}
+      if args.json:
+            print(json.dumps(stats))
+      else:
+            for k, v in stats.items():
+                  print(f"{k:<12} {v}")
+      return EXIT_OK
+
+
+def cmd_schedule(args) -> int:
+      from planner.recurrence import load_series, recurrence_window, series_path
+      from planner.schedule import SCHEDULE_MODES, day_str, load_schedule, schedule_path
+      store=_open(args)
+      tasks=store.load()
+      store.close()
+      # repeating tasks take part with the occurrences the app would show
+      tasks += load_series(series_path(args.file)).expand(*recurrence_window())
+      plan=load_schedule(schedule_path(args.file), tasks)
+      plan.configure(args.capacity, args.mode if args.mode in SCHEDULE_MODES else None)
+      until=None if args.days is None else plan.today + args.days - 1
+      for r in plan.rows(until):
+            late=plan.lateness(r.id)
+            flag=f"  (late {late}d)" if late else ""
+            sys.stdout.write(f"{day_str(r.day)}  {r.minutes / 60:>5.2f}h  {r.task.subject:<20.20}  {r.task.title}{flag}\n")
+      info=plan.summary()
+      print(f"{info['tasks']} task(s), {info['hours']:.1f}h, {info['late']} late (worst {info['max_late_days']}d), "
+            f"done by {day_str(info['last_day'])}", file=sys.stderr)
+      return EXIT_OK
+
+
+def cmd_repeat(args) -> int:
+      from planner.recurrence import Series, load_series, save_series, series_path
+      path=series_path(args.file)
+      recurring=load_series(path)
+      if args.list:
+            for s in recurring.series.values():
+                  ends=" ".join(filter(None, [f"until {s.until}" if s.until else "", f"{s.count} times" if s.count else ""])) or "no end"
+                  sys.stdout.write(f"{s.id}  {s.freq} every {s.interval}  from {s.start}, {ends}  {s.subject:<20.20}  {s.title}\n")
+            return EXIT_OK
+      if args.stop:
+            if recurring.series.pop(args.stop, None) is None:
+                  raise CliError(f"no repeating task {args.stop}")
+      else:
+            if not args.title or not args.subject:
+                  raise CliError("a repeating task needs a title and --subject")
+            try:
+                  series=Series(str(uuid.uuid4()), args.title, args.subject, args.start or datetime.now().strftime(dateformat),
+                                args.freq, args.every, args.until, args.count, args.status)
+            except ValueError as e:
+                  raise CliError(str(e)) from None
+            recurring.series[series.id]=series
+            print(series.id)
+      save_series(path, recurring)
+      return EXIT_OK
+
+
+def cmd_serve(args) -> int:
+      from planner.server import serve
+      print(f"Serving {args.file} on http://{args.host}:{args.port}/tasks", file=sys.stderr)
+      serve(args.file, args.engine, args.host, args.port, quiet=not args.verbose)
+      return EXIT_OK
+
+
+def cmd_gui(args) -> int:
+      import main as gui
+      gui.DATA_FILE=args.file
+      if args.profile:
+            metrics.enabled=True
+      gui.main()
+      return EXIT_OK
+
+
+def _sort_arg(text: str):
+      if text == "none":
+            return text
+      try:
+            return parse_sort(text)
+      except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e)) from None
+
+
+def build_parser() -> argparse.ArgumentParser:
+      p=argparse.ArgumentParser(prog="python -m planner", description="Smart Study Planner without the GUI")
+      p.add_argument("--file", default=os.environ.get("PLANNER_FILE", DATA_FILE), help="planner file (.json or .jsonl)")
+      p.add_argument("--engine", default=STORAGE_ENGINE, choices=["json", "journal", "sqlite"])
+      sub=p.add_subparsers(dest="command", required=True)
+
+      def selection(sp, fmt_default):
+            sp.add_argument("--status", default="ALL", choices=["ALL"] + statusoptions)
+            sp.add_argument("--sort", default="duedate", type=_sort_arg, metavar="COLUMNS",
+                            help="check, title, subject, duedate or status, or a comma list such as status,-duedate "
+                                 "(- sorts that column descending); none keeps file order and streams without loading everything")
+            sp.add_argument("--group", metavar="SUBJECT_OR_TAG",
+                            help='only tasks in a subject, its nested subjects included ("Math" covers "Math/Calculus"), or with a #tag')
+            sp.add_argument("--reverse", action="store_true")
+            sp.add_argument("--limit", type=int)
+            sp.add_argument("--offset", type=int, default=0)
+            sp.add_argument("--format", default=fmt_default, choices=["table", *EXPORT_FORMATS])
+
+      sp=sub.add_parser("list", help="print tasks")
+      selection(sp, "table")
+      sp.set_defaults(func=cmd_list, search=None)
+
+      sp=sub.add_parser("query", help="print tasks whose title or subject contains TEXT")
+      sp.add_argument("search", metavar="TEXT")
+      selection(sp, "table")
+      sp.set_defaults(func=cmd_list)
+
+      sp=sub.add_parser("import", help="add tasks from a CSV file")
+      sp.add_argument("csv")
+      sp.set_defaults(func=cmd_import)
+
+      sp=sub.add_parser("export", help="write tasks to a file, or - for stdout; the format follows the extension (.csv, .jsonl, .ics)")
+      sp.add_argument("out")
+      sp.add_argument("--search")
+      selection(sp, None)
+      sp.set_defaults(func=cmd_export)
+
+      sp=sub.add_parser("backup", help="add a generation to the backup store")
+      sp.add_argument("--store", default=None)
+      sp.set_defaults(func=cmd_backup)
+
+      sp=sub.add_parser("restore", help="replace all tasks with a backup generation")
+      sp.add_argument("name", nargs="?")
+      sp.add_argument("--at", help="restore the newest backup taken at or before this ISO time")
+      sp.add_argument("--list", action="store_true", help="list generations instead")
+      sp.add_argument("--store", default=None)
+      sp.set_defaults(func=cmd_restore)
+
+      sp=sub.add_parser("stats", help="task counts")
+      sp.add_argument("--json", action="store_true")
+      sp.set_defaults(func=cmd_stats)
+
+      sp=sub.add_parser("schedule", help="day-by-day study plan of the open tasks")
+      sp.add_argument("--capacity", type=float, help="study hours per day (default: saved setting)")
+      sp.add_argument("--mode", choices=["edf", "fewest-late"])
+      sp.add_argument("--days", type=int, help="only print the next N days")
+      sp.set_defaults(func=cmd_schedule)
+
+      sp=sub.add_parser("repeat", help="add a repeating task; --list and --stop manage them")
+      sp.add_argument("title", nargs="?")
+      sp.add_argument("--subject")
+      sp.add_argument("--start", help="first due date, yyyy/mm/dd (default: today)")
+      sp.add_argument("--freq", default="weekly", choices=["daily", "weekly"])
+      sp.add_argument("--every", type=int, default=1, help="repeat every N days or weeks")
+      sp.add_argument("--until", help="last possible due date, yyyy/mm/dd")
+      sp.add_argument("--count", type=int, help="stop after N occurrences")
+      sp.add_argument("--status", default="To Do", choices=statusoptions)
+      sp.add_argument("--list", action="store_true", help="list repeating tasks instead")
+      sp.add_argument("--stop", metavar="ID", help="remove a repeating task and all its occurrences")
+      sp.set_defaults(func=cmd_repeat)
+
+      sp=sub.add_parser("serve", help="run the local HTTP/JSON API")
+      sp.add_argument("--host", default="127.0.0.1")
+      sp.add_argument("--port", type=int, default=8765)
+      sp.add_argument("--verbose", action="store_true", help="log every request")
+      sp.set_defaults(func=cmd_serve)
+
+      sp=sub.add_parser("gui", help="open the Tk app")
+      sp.add_argument("--profile", action="store_true", help="record timings from the start (same as PLANNER_PROFILE=1)")
+      sp.set_defaults(func=cmd_gui)
+      return p
+
+
+def main(argv: Optional[List[str]]=None) -> int:
+      args=build_parser().parse_args(argv)
+      if getattr(args, "store", "") is None:
+            from planner.backup import BACKUP_STORE_DIR
+            args.store=BACKUP_STORE_DIR
+      try:
+            return args.func(args)
+      except CliError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return EXIT_ERROR
+      except BrokenPipeError:
+            # e.g. piped into head; not an error for scripts
+            sys.stderr.close()
+            return EXIT_OK
+      except (OSError, StorageError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            return EXIT_ERROR
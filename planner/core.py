@@ -0,0 +1,552 @@
+import uuid
+
+import json
+
+import csv
+
+import threading
+
+import unicodedata
+
+import itertools
+
+import sys
+
+from operator import attrgetter
+
+from bisect import bisect_left
+
+from datetime import datetime, date
+
+from typing import Dict, List, Optional, Tuple
+
+
+dateformat="%Y/%m/%d"
+statusoptions=["To Do", "Done","In progress"]
+statusorder={a:b for b,a in enumerate(statusoptions)}
+DATA_FILE="planner.json"
+BACKUP_DIR="backups"
+CSV_HEADERS=["id","title","subject","duedate","status"]
+IMPORT_BATCH_SIZE=5000
+CSV_WRITE_BATCH=2000
+DATE_CACHE_SIZE=65536
+
+class Task:
+    """One study task, slotted; status is kept as its index in statusoptions"""
+    __slots__=("id","title","subject","duedate","due_ord","_status")
+    def __init__(self,id:str,title:str,subject:str,duedate:str,status:str="To Do"):
+        self.id=id
+        self.title=title
+        self.subject=subject
+        self.duedate=duedate
+        self.status=status
+    def __setattr__(self, name, value):
+        if name == "subject" or name == "duedate":
+            value=sys.intern(value)
+        object.__setattr__(self, name, value)
+        if name == "duedate":
+            object.__setattr__(self, "due_ord", date_ordinal(value) or 0)
+    @property
+    def status(self) -> str:
+        return statusoptions[self._status]
+    @status.setter
+    def status(self, value: str):
+        try:
+            object.__setattr__(self, "_status", statusorder[value])
+        except KeyError:
+            raise ValueError(f"unknown status {value!r}") from None
+    @classmethod
+    def from_valid(cls, id, title, subject, duedate, due_ord, status_code):
+        """Build a task from already validated fields, skipping __setattr__"""
+        t=object.__new__(cls)
+        _set=object.__setattr__
+        _set(t, "id", id)
+        _set(t, "title", title)
+        _set(t, "subject", sys.intern(subject))
+        _set(t, "duedate", sys.intern(duedate))
+        _set(t, "due_ord", due_ord)
+        _set(t, "_status", status_code)
+        return t
+    def as_tuple(self):
+        return (self.id, self.title, self.subject, self.duedate, self.status)
+    def to_dict(self) -> dict:
+        return dict(zip(CSV_HEADERS, self.as_tuple()))
+    def __eq__(self, other):
+        return isinstance(other, Task) and self.as_tuple() == other.as_tuple()
+    __hash__=None
+    def __repr__(self):
+        return "Task(id=%r, title=%r, subject=%r, duedate=%r, status=%r)" % self.as_tuple()
+# Task.as_tuple without the method call, for bulk writes
+_csv_row=attrgetter(*CSV_HEADERS)
+def today_str()->str:
+        return datetime.now().strftime(dateformat)
+_date_cache: dict={}
+def date_ordinal(s: str) -> Optional[int]:
+      """Proleptic ordinal of a yyyy/mm/dd string, or None if it isn't a valid date"""
+      o=_date_cache.get(s)
+      if o is None:
+            # int() also takes signs, spaces, "_" and non-ASCII digits, which strptime rejects
+            if len(s) == 10 and s[4] == "/" and s[7] == "/" and s.isascii() and (s[:4] + s[5:7] + s[8:]).isdigit():
+                  try:
+                        o=date(int(s[:4]), int(s[5:7]), int(s[8:])).toordinal()
+                  except (ValueError, TypeError):
+                        o=0
+            else:
+                  # strptime also accepts unpadded months/days such as 2026/1/5
+                  try:
+                        o=datetime.strptime(s, dateformat).toordinal()
+                  except (ValueError, TypeError):
+                        o=0
+            if len(_date_cache) < DATE_CACHE_SIZE:
+                  _date_cache[s]=o
+      return o or None
+def valid_date(s:str)->bool:
+        return date_ordinal(s) is not None
+def parse_date(s:str)-> Optional[date]:
+      o=date_ordinal(s)
+      return date.fromordinal(o) if o else None
+
+def task_from_dict(item) -> Optional[Task]:
+      if not isinstance(item,dict):
+            return None
+      tid=str(item.get("id") or uuid.uuid4())
+      title=str(item.get("title") or "").strip()
+      subject=str(item.get("subject") or "").strip()
+      duedate=str(item.get("duedate") or today_str()).strip()
+      status=str(item.get("status") or "To Do").strip()
+      if not title or not subject or not valid_date(duedate):
+            return None
+      if status not in statusoptions:
+            status="To Do"
+      return Task(id=tid, title=title, subject=subject,duedate=duedate,status=status)
+
+def tasks_from_records(records, statuses: List[str]=statusoptions) -> List[Task]:
+      """Bulk decode of task dicts or [id, title, subject, duedate, status] rows; odd ones go through task_from_dict"""
+      tasks: List[Task]=[]
+      append=tasks.append
+      for rec in records:
+            if type(rec) is list and len(rec) == 5:
+                  tid, title, subject, due, status=rec
+                  if type(status) is int:
+                        status=statuses[status] if 0 <= status < len(statuses) else ""
+            elif type(rec) is dict:
+                  tid, title, subject, due, status=(rec.get(k) for k in CSV_HEADERS)
+            else:
+                  continue
+            if tid and due and type(tid) is str and type(title) is str and type(subject) is str and type(due) is str and type(status) is str:
+                  title=title.strip()
+                  subject=subject.strip()
+                  due=due.strip()
+                  status=status.strip()
+                  o=date_ordinal(due)
+                  if title and subject and o:
+                        append(Task.from_valid(tid, title, subject, due, o, statusorder.get(status, 0)))
+                  continue
+            t=task_from_dict(dict(zip(CSV_HEADERS, (tid, title, subject, due, status))))
+            if t:
+                  append(t)
+      return tasks
+
+def normalize(s: str) -> str:
+      """Casefold and strip accents so 'Éco' matches 'eco'"""
+      s=unicodedata.normalize("NFKD", s)
+      if not s.isascii():
+            s="".join(c for c in s if not unicodedata.combining(c))
+      return s.casefold()
+
+SORT_KEYS={
+      "check": lambda t: t.status == "Done",
+      "title": lambda t: t.title.lower(),
+      "subject": lambda t: t.subject.lower(),
+      "duedate": lambda t: t.due_ord,
+      "status": lambda t: t._status,
+}
+
+_INVERT=bytes(range(255, -1, -1))
+
+def _descending(value):
+      """A key that sorts opposite to value: numbers negate, strings become inverted UTF-8"""
+      if isinstance(value, str):
+            # 0xff never occurs in UTF-8, so a prefix still sorts after the longer strings it starts
+            return value.encode("utf-8", "surrogatepass").translate(_INVERT) + b"\xff"
+      return -value
+
+def sort_spec(sort_key="duedate", reverse: bool=False) -> Tuple[Tuple[str, bool], ...]:
+      """((column, descending), ...) from a column name or such pairs; reverse flips every column"""
+      if isinstance(sort_key, str):
+            sort_key=[(sort_key, False)]
+      spec=tuple((col, bool(desc) != reverse) for col, desc in sort_key if col in SORT_KEYS)
+      return spec or (("duedate", reverse),)
+
+def parse_sort(text: str, reverse: bool=False) -> Tuple[Tuple[str, bool], ...]:
+      """Spec from "status,-duedate": comma separated columns, a leading - sorts that one descending"""
+      spec=[]
+      for part in text.split(","):
+            col=part.strip().lstrip("-")
+            if col not in SORT_KEYS:
+                  raise ValueError(f"unknown sort column {col!r}; use {', '.join(SORT_KEYS)}")
+            spec.append((col, part.strip().startswith("-")))
+      return sort_spec(spec, reverse)
+
+def _column_keys(spec) -> list:
+      """One key function per column of a spec, each sorting ascending"""
+      return [(lambda t, get=SORT_KEYS[col]: _descending(get(t))) if desc else SORT_KEYS[col] for col, desc in spec]
+
+def sort_key_func(spec):
+      """Composite key of a task for a sort spec"""
+      funcs=_column_keys(spec)
+      if len(funcs) == 1:
+            f=funcs[0]
+            return lambda t: (f(t),)
+      return lambda t: tuple([f(t) for f in funcs])
+
+def filter_sort(tasks, q: str="", status: str="ALL", sort_key="duedate", reverse: bool=False,
+                index: Optional["SearchIndex"]=None, view: Optional["SortedView"]=None,
+                group: Optional[Dict[str, Task]]=None) -> List[Task]:
+      """Search, status filter and sort as the list view does it
+
+      sort_key is a column name or a spec of (column, descending) pairs. index speeds up
+      repeated searches; a view kept sorted the same way saves sorting altogether. group
+      limits the result to those tasks by id, e.g. a subject or tag from TagIndex.lookup.
+      """
+      spec=sort_spec(sort_key, reverse)
+      q=q.strip()
+      if q and index is not None:
+            items=index.search(q)
+      elif q:
+            q=normalize(q)
+            items=[t for t in tasks if q in normalize(t.title) or q in normalize(t.subject)]
+      else:
+            items=None
+      if group is not None:
+            if items is not None:
+                  items=[t for t in items if t.id in group]
+            elif view is not None and view.spec == spec and len(group) * 8 > len(view.rows):
+                  # a large share of the tasks: walking the sorted rows beats sorting the group
+                  rows=[t for t in view.rows if t.id in group]
+                  return [t for t in rows if t.status == status] if status and status != "ALL" else rows
+            else:
+                  items=list(group.values())
+      if items is None and view is not None and view.spec == spec:
+            # the view is already in this order and filtering keeps it
+            return [t for t in view.rows if t.status == status] if status and status != "ALL" else list(view.rows)
+      if items is None:
+            items=tasks
+      if status and status != "ALL":
+            items=[t for t in items if t.status == status]
+      return sorted(items, key=view.key if view is not None and view.spec == spec else sort_key_func(spec))
+
+class SortedView:
+      """Every task in one sort order, kept sorted from TaskCollection events
+
+      Each task's composite key is built once per spec and cached. An edit to a few tasks
+      moves their rows by binary search; ties keep the order tasks were added in, as a
+      stable sort of the collection would.
+      """
+      def __init__(self, spec=(("duedate", False),)):
+            self.spec=sort_spec(spec)
+            self._columns=_column_keys(self.spec)
+            self._keyfunc=sort_key_func(self.spec)
+            self._seq: Dict[str, int]={}
+            self._next=0
+            self._keys: Dict[str, tuple]={}
+            self._order: List[tuple]=[]
+            self.rows: List[Task]=[]
+      def __len__(self) -> int:
+            return len(self.rows)
+      def key(self, t: Task) -> tuple:
+            k=self._keys.get(t.id)
+            return k if k is not None else self._keyfunc(t) + (self._seq.get(t.id, self._next),)
+      def set_spec(self, spec) -> None:
+            spec=sort_spec(spec)
+            if spec != self.spec:
+                  self.spec=spec
+                  self._columns=_column_keys(spec)
+                  self._keyfunc=sort_key_func(spec)
+                  self._keys.clear()
+                  self._sort(self.rows)
+      def rebuild(self, tasks) -> None:
+            tasks=list(tasks)
+            self._seq={t.id: i for i, t in enumerate(tasks)}
+            self._next=len(tasks)
+            self._keys.clear()
+            self._sort(tasks)
+      def _sort(self, tasks: List[Task]) -> None:
+            """Sort tasks by their cached keys, building the ones that are missing"""
+            keys=self._keys
+            missing=[t for t in tasks if t.id not in keys] if keys else tasks
+            if missing:
+                  # a column at a time: one map per column is much cheaper than a tuple per task in Python
+                  ids=[t.id for t in missing]
+                  columns=[list(map(f, missing)) for f in self._columns]
+                  keys.update(zip(ids, zip(*columns, map(self._seq.__getitem__, ids))))
+            order=[keys[t.id] for t in tasks]
+            # sorting positions by key lets the sort compare the key tuples directly
+            idx=sorted(range(len(order)), key=order.__getitem__)
+            self._order=[order[i] for i in idx]
+            self.rows=[tasks[i] for i in idx]
+      def update(self, t: Task) -> None:
+            old=self._keys.get(t.id)
+            if old is None:
+                  self._seq[t.id]=self._next
+                  self._next += 1
+            else:
+                  i=bisect_left(self._order, old)
+                  del self._order[i]
+                  del self.rows[i]
+            key=self._keys[t.id]=self._keyfunc(t) + (self._seq[t.id],)
+            i=bisect_left(self._order, key)
+            self._order.insert(i, key)
+            self.rows.insert(i, t)
+      def remove(self, tid: str) -> None:
+            key=self._keys.pop(tid, None)
+            self._seq.pop(tid, None)
+            if key is not None:
+                  i=bisect_left(self._order, key)
+                  del self._order[i]
+                  del self.rows[i]
+      def on_change(self, kind: str, changed: List[Task], removed: List[str]) -> None:
+            if kind in ("load", "reset"):
+                  self.rebuild(changed)
+                  return
+            for tid in removed:
+                  self.remove(tid)
+            if len(changed) > 64:
+                  # past a few dozen rows one sort of the cached keys beats moving rows one by one
+                  for t in changed:
+                        self._keys.pop(t.id, None)
+                        if t.id not in self._seq:
+                              self._seq[t.id]=self._next
+                              self._next += 1
+                  ids={t.id for t in changed}
+                  self._sort([t for t in self.rows if t.id not in ids] + list(changed))
+                  return
+            for t in changed:
+                  self.update(t)
+
+def write_tasks_csv(tasks, f) -> int:
+      """Stream tasks to an open CSV file with the CSV_HEADERS columns; returns the row count"""
+      writer=csv.writer(f)
+      writer.writerow(CSV_HEADERS)
+      rows=map(_csv_row, tasks)
+      n=0
+      # writerows on a slice at a time: one C call per batch instead of one per row, memory stays flat
+      while True:
+            batch=list(itertools.islice(rows, CSV_WRITE_BATCH))
+            if not batch:
+                  return n
+            writer.writerows(batch)
+            n += len(batch)
+
+class TaskCollection:
+      """Tasks in insertion order, indexed by id; listeners get (kind, changed, removed)"""
+      def __init__(self, tasks: Optional[List[Task]]=None):
+            self._by_id: dict={t.id: t for t in tasks or ()}
+            self._listeners: list=[]
+      def __iter__(self):
+            return iter(self._by_id.values())
+      def __len__(self) -> int:
+            return len(self._by_id)
+      def __contains__(self, tid) -> bool:
+            return tid in self._by_id
+      def get(self, tid: str) -> Optional[Task]:
+            return self._by_id.get(tid)
+      def subscribe(self, listener) -> None:
+            self._listeners.append(listener)
+      def _emit(self, kind: str, changed: List[Task], removed: List[str]) -> None:
+            for listener in self._listeners:
+                  listener(kind, changed, removed)
+      def load(self, tasks: List[Task]) -> None:
+            self._by_id={t.id: t for t in tasks}
+            self._emit("load", list(self), [])
+      def replace(self, tasks: List[Task]) -> None:
+            self._by_id={t.id: t for t in tasks}
+            self._emit("reset", list(self), [])
+      def add(self, task: Task) -> None:
+            self.add_many([task])
+      def add_many(self, tasks: List[Task]) -> None:
+            for t in tasks:
+                  self._by_id[t.id]=t
+            if tasks:
+                  self._emit("add", list(tasks), [])
+      def update(self, tid: str, **fields) -> Optional[Task]:
+            task=self._by_id.get(tid)
+            if task is None:
+                  return None
+            for name, value in fields.items():
+                  setattr(task, name, value)
+            self._emit("update", [task], [])
+            return task
+      def set_status(self, tids: List[str], status: str) -> List[Task]:
+            changed=[t for t in map(self._by_id.get, tids) if t is not None and t.status != status]
+            for t in changed:
+                  t.status=status
+            if changed:
+                  self._emit("update", changed, [])
+            return changed
+      def merge(self, changed: List[Task], removed: List[str]) -> None:
+            """Take edits another process saved; emitted as "merge" so they aren't written back"""
+            taken=[]
+            for t in changed:
+                  task=self._by_id.get(t.id)
+                  if task is None:
+                        self._by_id[t.id]=task=t
+                  elif task.as_tuple() != t.as_tuple():
+                        # patch in place so rows and cards holding the object stay current
+                        for name in ("title", "subject", "duedate", "status"):
+                              setattr(task, name, getattr(t, name))
+                  else:
+                        continue
+                  taken.append(task)
+            removed=[tid for tid in removed if self._by_id.pop(tid, None) is not None]
+            if taken or removed:
+                  self._emit("merge", taken, removed)
+      def remove(self, tid: str) -> None:
+            self.remove_many([tid])
+      def remove_many(self, tids: List[str]) -> List[str]:
+            removed=[tid for tid in tids if self._by_id.pop(tid, None) is not None]
+            if removed:
+                  self._emit("remove", [], removed)
+            return removed
+
+class SearchIndex:
+      """Normalized title/subject keys per task, with prefix-narrowing of the last result"""
+      def __init__(self):
+            self._entries: dict={}
+            self._last_query=""
+            self._last: list=[]
+      def rebuild(self, tasks: List[Task]) -> None:
+            self._entries={t.id: (normalize(t.title) + "\0" + normalize(t.subject), t) for t in tasks}
+            self._last_query=""
+            self._last=[]
+      def update(self, task: Task) -> None:
+            self._apply([task], ())
+      def remove(self, tid: str) -> None:
+            self._apply((), [tid])
+      def _apply(self, changed: List[Task], removed) -> None:
+            """Reindex a change set; the last result is filtered once per set, not once per task"""
+            entries=self._entries
+            fresh={}
+            for t in changed:
+                  fresh[t.id]=entries[t.id]=(normalize(t.title) + "\0" + normalize(t.subject), t)
+            gone=set(removed)
+            for tid in gone:
+                  entries.pop(tid, None)
+                  fresh.pop(tid, None)
+            if not self._last_query:
+                  return
+            gone.update(fresh)
+            q=self._last_query
+            self._last=[e for e in self._last if e[1].id not in gone]
+            self._last.extend(e for e in fresh.values() if q in e[0])
+      def on_change(self, kind: str, changed: List[Task], removed: List[str]) -> None:
+            if kind in ("load", "reset"):
+                  self.rebuild(changed)
+                  return
+            self._apply(changed, removed)
+      def search(self, query: str) -> List[Task]:
+            q=normalize(query.strip())
+            if not q:
+                  # nothing left to narrow, and edits shouldn't keep paying to maintain it
+                  self._last_query=""
+                  self._last=[]
+                  return [t for _, t in self._entries.values()]
+            pool=self._last if self._last_query and q.startswith(self._last_query) else self._entries.values()
+            self._last=[e for e in pool if q in e[0]]
+            self._last_query=q
+            return [t for _, t in self._last]
+
+_encode=json.encoder.encode_basestring
+_TASK_JSON='  {\n    "id": %s,\n    "title": %s,\n    "subject": %s,\n    "duedate": %s,\n    "status": %s\n  }'
+
+def write_tasks_json(tasks, f) -> None:
+      """Same bytes as json.dump([...], indent=2, ensure_ascii=False) without a dict per task"""
+      first=True
+      for t in tasks:
+            f.write("[\n" if first else ",\n")
+            f.write(_TASK_JSON % (_encode(t.id), _encode(t.title), _encode(t.subject), _encode(t.duedate), _encode(t.status)))
+            first=False
+      f.write("[]" if first else "\n]")
+
+class CsvImport:
+      """Reads and validates a CSV file in batches on a worker thread"""
+      def __init__(self, path: str, existing, batch_size: int=IMPORT_BATCH_SIZE):
+            self.path=path
+            self.existing=existing
+            self.batch_size=batch_size
+            self.tasks: List[Task]=[]
+            self.rows=0
+            self.added=self.skipped_dup=self.invalid=0
+            self.missing: List[str]=[]
+            self.error: Optional[Exception]=None
+            self.cancelled=threading.Event()
+            self.done=threading.Event()
+            self._thread=threading.Thread(target=self.run, daemon=True)
+      def start(self) -> "CsvImport":
+            self._thread.start()
+            return self
+      def cancel(self) -> None:
+            self.cancelled.set()
+      def run(self) -> "CsvImport":
+            """Read the whole file on the calling thread"""
+            try:
+                  self._read()
+            except Exception as e:
+                  self.error=e
+            finally:
+                  self.done.set()
+            return self
+      def _read(self) -> None:
+            seen=set()
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                  reader=csv.DictReader(f)
+                  self.missing = [h for h in ["title", "subject", "duedate"]if h not in (reader.fieldnames or [])]
+                  if self.missing:
+                        return
+                  while not self.cancelled.is_set():
+                        batch=list(itertools.islice(reader, self.batch_size))
+                        if not batch:
+                              break
+                        for row in batch:
+                              title=(row.get("title")or "").strip()
+                              subject=(row.get("subject")or "").strip()
+                              duedate=(row.get("duedate")or "").strip()
+                              status=(row.get("status")or "To Do").strip()
+                              tid=(row.get("id")or "").strip()
+                              if not title or not subject or not valid_date(duedate):
+                                    self.invalid +=1
+                                    continue
+                              if status not in statusoptions:
+                                    status="To Do"
+                              if not tid:
+                                    tid= str(uuid.uuid4())
+                              if tid in seen or tid in self.existing:
+                                    self.skipped_dup +=1
+                                    continue
+                              self.tasks.append(Task(id=tid,title=title, subject=subject,duedate=duedate, status=status))
+                              seen.add(tid)
+                              self.added +=1
+                        self.rows += len(batch)
+
+def write_tasks_jsonl(tasks, f) -> None:
+      """Compact format: a header line, then one minified [id, title, subject, duedate, status] per line"""
+      f.write(json.dumps({"format": "planner-jsonl", "version": 1, "fields": CSV_HEADERS, "statuses": statusoptions}) + "\n")
+      for t in tasks:
+            f.write("[%s,%s,%s,%s,%d]\n" % (_encode(t.id), _encode(t.title), _encode(t.subject), _encode(t.duedate), t._status))
+
+def read_tasks_jsonl(f) -> List[Task]:
+      header=json.loads(f.readline() or "{}")
+      if header.get("format") != "planner-jsonl":
+            raise ValueError("not a planner-jsonl file")
+      body=f.read().strip("\n")
+      try:
+            rows=json.loads("[" + body.replace("\n", ",") + "]")
+      except ValueError:
+            # a torn line (e.g. a crash mid-write) costs that line only
+            rows=[]
+            for line in body.split("\n"):
+                  try:
+                        rows.append(json.loads(line))
+                  except ValueError:
+                        continue
+      return tasks_from_records(rows, header.get("statuses") or statusoptions)
@@ -0,0 +1,125 @@
+"""Exports that stream tasks to an open file: CSV, JSON Lines and iCalendar
+
+Each writer takes any iterable of tasks (the collection, a filtered view, or a storage
+iterator) and writes it in batches of joined lines, so memory stays flat however many
+tasks go through and no dict is built per row.
+"""
+import json
+
+import os
+
+from datetime import date, datetime, timezone
+
+from typing import Iterable, Optional
+
+from planner.core import Task, write_tasks_csv
+
+
+_encode=json.encoder.encode_basestring
+
+# format: (label, extension)
+EXPORT_FORMATS={"csv": ("CSV", ".csv"), "jsonl": ("JSON Lines", ".jsonl"), "ics": ("iCalendar", ".ics")}
+EXPORT_BATCH=2000
+ICS_PRODID="-//Smart Study Planner//Tasks//EN"
+ICS_UID_DOMAIN="smartstudyplanner"
+_JSONL_ROW='{"id": %s, "title": %s, "subject": %s, "duedate": %s, "status": %s}\n'
+
+def export_format(path: str, default: str="csv") -> str:
+      """Format picked from the file extension, e.g. tasks.ics -> "ics" """
+      ext=os.path.splitext(path)[1].lower()
+      for fmt, (_, fmt_ext) in EXPORT_FORMATS.items():
+            if ext == fmt_ext:
+                  return fmt
+      return default
+
+def _write_batched(lines: Iterable[str], f) -> int:
+      n=0
+      batch=[]
+      for line in lines:
+            batch.append(line)
+            if len(batch) >= EXPORT_BATCH:
+                  f.write("".join(batch))
+                  n += len(batch)
+                  batch.clear()
+      f.write("".join(batch))
+      return n + len(batch)
+
+def write_tasks_jsonlines(tasks: Iterable[Task], f) -> int:
+      """One {"id", "title", "subject", "duedate", "status"} object per line; returns the row count"""
+      return _write_batched((_JSONL_ROW % (_encode(t.id), _encode(t.title), _encode(t.subject), _encode(t.duedate), _encode(t.status))
+                             for t in tasks), f)
+
+def _ics_text(s: str) -> str:
+      return s.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+
+def _ics_fold(line: str) -> str:
+      """Content lines are at most 75 octets, continued on lines starting with a space (RFC 5545 3.1)"""
+      if len(line) <= 18 or len(line.encode("utf-8")) <= 75:
+            return line + "\r\n"
+      parts=[]
+      part, size=[], 0
+      for ch in line:
+            n=len(ch.encode("utf-8"))
+            # the first line has 75 octets, continuations lose one to the leading space
+            if size + n > (75 if not parts else 74):
+                  parts.append("".join(part))
+                  part, size=[], 0
+            part.append(ch)
+            size += n
+      parts.append("".join(part))
+      return "\r\n ".join(parts) + "\r\n"
+
+def _ics_events(tasks: Iterable[Task], stamp: str):
+      days={}
+      for t in tasks:
+            if not t.due_ord:
+                  continue
+            span=days.get(t.due_ord)
+            if span is None:
+                  span=days[t.due_ord]=(date.fromordinal(t.due_ord).strftime("%Y%m%d"), date.fromordinal(t.due_ord + 1).strftime("%Y%m%d"))
+            yield ("BEGIN:VEVENT\r\n"
+                   f"UID:{t.id}@{ICS_UID_DOMAIN}\r\n"
+                   f"DTSTAMP:{stamp}\r\n"
+                   f"DTSTART;VALUE=DATE:{span[0]}\r\n"
+                   f"DTEND;VALUE=DATE:{span[1]}\r\n"
+                   + _ics_fold("SUMMARY:" + _ics_text(t.title))
+                   + _ics_fold("CATEGORIES:" + _ics_text(t.subject))
+                   + _ics_fold(f"DESCRIPTION:{_ics_text(t.subject)} - {t.status}")
+                   + "TRANSP:TRANSPARENT\r\n"
+                   "END:VEVENT\r\n")
+
+def write_tasks_ics(tasks: Iterable[Task], f, stamp: Optional[datetime]=None) -> int:
+      """An all-day event on each task's due date; returns the event count
+
+      Events rather than to-dos, since that is what calendar apps import. Open the file with
+      newline="" so the CRLF line ends survive.
+      """
+      stamp=(stamp or datetime.now(timezone.utc)).astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+      f.write(f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:{ICS_PRODID}\r\nCALSCALE:GREGORIAN\r\n")
+      n=_write_batched(_ics_events(tasks, stamp), f)
+      f.write("END:VCALENDAR\r\n")
+      return n
+
+EXPORTERS={"csv": write_tasks_csv, "jsonl": write_tasks_jsonlines, "ics": write_tasks_ics}
+
+def export_tasks(tasks: Iterable[Task], f, fmt: str="csv") -> int:
+      """Stream tasks to f in one of EXPORT_FORMATS; returns how many were written"""
+      try:
+            writer=EXPORTERS[fmt]
+      except KeyError:
+            raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}") from None
+      return writer(tasks, f)
+
+def export_file(tasks: Iterable[Task], path: str, fmt: Optional[str]=None) -> int:
+      """Export to path, written to a temporary file first so a failed export leaves no half file"""
+      fmt=fmt or export_format(path)
+      tmp=path + ".tmp"
+      try:
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                  n=export_tasks(tasks, f, fmt)
+            os.replace(tmp, path)
+      except BaseException:
+            if os.path.exists(tmp):
+                  os.remove(tmp)
+            raise
+      return n
@@ -0,0 +1,137 @@
+"""Opt-in timing spans and counters for finding what makes the app slow
+
+Off unless PLANNER_PROFILE is set (or the debug tab switches it on); while off a timed
+call costs one attribute check. Each span keeps its last METRICS_WINDOW samples, so the
+percentiles follow what the app is doing now rather than since it started.
+"""
+import functools
+
+import json
+
+import os
+
+import threading
+
+import time
+
+from collections import Counter, deque
+
+from typing import Dict, Optional
+
+
+METRICS_WINDOW=2048
+# upper bounds in ms of the histogram buckets; the last one catches everything slower
+METRICS_BUCKETS_MS=(0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+class Histogram:
+      """Rolling window of durations in seconds, plus lifetime count and total"""
+      def __init__(self, window: int=METRICS_WINDOW):
+            self.samples: deque=deque(maxlen=window)
+            self.count=0
+            self.total=0.0
+      def add(self, seconds: float) -> None:
+            self.samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+      def summary(self) -> dict:
+            ms=sorted(s * 1000 for s in self.samples)
+            n=len(ms)
+            pick=lambda q: ms[min(n - 1, int(q * n))] if n else 0.0
+            buckets=[0] * (len(METRICS_BUCKETS_MS) + 1)
+            i=0
+            for v in ms:
+                  # samples are sorted, so the bucket index only moves forward
+                  while i < len(METRICS_BUCKETS_MS) and v > METRICS_BUCKETS_MS[i]:
+                        i += 1
+                  buckets[i] += 1
+            return {
+                  "count": self.count,
+                  "total_ms": self.total * 1000,
+                  "window": n,
+                  "mean_ms": sum(ms) / n if n else 0.0,
+                  "p50_ms": pick(0.5),
+                  "p90_ms": pick(0.9),
+                  "p99_ms": pick(0.99),
+                  "max_ms": ms[-1] if n else 0.0,
+                  "buckets": dict(zip([f"<={b}ms" for b in METRICS_BUCKETS_MS] + [f">{METRICS_BUCKETS_MS[-1]}ms"], buckets)),
+            }
+
+class _Span:
+      __slots__=("metrics", "name", "start")
+      def __init__(self, metrics: "Metrics", name: str):
+            self.metrics=metrics
+            self.name=name
+      def __enter__(self):
+            self.start=time.perf_counter()
+            return self
+      def __exit__(self, *exc):
+            self.metrics.observe(self.name, time.perf_counter() - self.start)
+            return False
+
+class _NullSpan:
+      __slots__=()
+      def __enter__(self):
+            return self
+      def __exit__(self, *exc):
+            return False
+
+_NULL_SPAN=_NullSpan()
+
+class Metrics:
+      """Named duration histograms and counters, shared by the Tk thread and the persistence worker"""
+      def __init__(self, enabled: bool=False, window: int=METRICS_WINDOW):
+            self.enabled=enabled
+            self.window=window
+            self.spans: Dict[str, Histogram]={}
+            self.counters: Counter=Counter()
+            self.started=time.time()
+            self._lock=threading.Lock()
+      def observe(self, name: str, seconds: float) -> None:
+            if not self.enabled:
+                  return
+            with self._lock:
+                  hist=self.spans.get(name)
+                  if hist is None:
+                        hist=self.spans[name]=Histogram(self.window)
+                  hist.add(seconds)
+      def count(self, name: str, n: int=1) -> None:
+            if self.enabled:
+                  with self._lock:
+                        self.counters[name] += n
+      def span(self, name: str):
+            """with metrics.span("name"): ... times the block"""
+            return _Span(self, name) if self.enabled else _NULL_SPAN
+      def timed(self, name: Optional[str]=None):
+            """Decorator timing every call; checks enabled per call so profiling can be switched at runtime"""
+            def wrap(fn):
+                  label=name or fn.__qualname__
+                  @functools.wraps(fn)
+                  def timed_call(*args, **kwargs):
+                        if not self.enabled:
+                              return fn(*args, **kwargs)
+                        start=time.perf_counter()
+                        try:
+                              return fn(*args, **kwargs)
+                        finally:
+                              self.observe(label, time.perf_counter() - start)
+                  return timed_call
+            return wrap
+      def reset(self) -> None:
+            with self._lock:
+                  self.spans.clear()
+                  self.counters.clear()
+                  self.started=time.time()
+      def snapshot(self) -> dict:
+            with self._lock:
+                  spans={name: h.summary() for name, h in sorted(self.spans.items())}
+                  counters=dict(sorted(self.counters.items()))
+            return {"enabled": self.enabled, "since": self.started, "seconds": time.time() - self.started, "spans": spans, "counters": counters}
+      def export(self, path: str, extra: Optional[dict]=None) -> None:
+            data=self.snapshot()
+            data.update(extra or {})
+            tmp=path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                  json.dump(data, f, indent=2)
+            os.replace(tmp, path)
+
+metrics=Metrics(os.environ.get("PLANNER_PROFILE", "") not in ("", "0"))
@@ -0,0 +1,209 @@
+"""Recurring tasks: one rule per series, occurrences expanded only for the days in view
+
+A series keeps its rule plus, sparsely, the occurrences that differ from it: edited
+fields by day, and the days that were deleted. A year of daily revision is one record
+and its exceptions, never 365 tasks in the planner file.
+"""
+import json
+
+import os
+
+from datetime import date
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from planner.core import DATA_FILE, Task, TaskCollection, date_ordinal, dateformat, statusoptions, statusorder
+
+
+RECURRENCE_FREQS={"daily": 1, "weekly": 7}
+RECURRENCE_LOOKBACK_DAYS=14
+RECURRENCE_LOOKAHEAD_DAYS=42
+OVERRIDE_FIELDS=("title", "subject", "duedate", "status")
+
+def series_path(data_file: str=DATA_FILE) -> str:
+      """Series live next to the planner file, e.g. planner.series.json"""
+      return os.path.splitext(data_file)[0] + ".series.json"
+
+def recurrence_window(today: Optional[int]=None) -> Tuple[int, int]:
+      today=today or date.today().toordinal()
+      return today - RECURRENCE_LOOKBACK_DAYS, today + RECURRENCE_LOOKAHEAD_DAYS
+
+class Occurrence(Task):
+      """One day of a series; kept in memory only, its edits go back to the series"""
+      __slots__=("series_id", "day")
+
+class Series:
+      """Repeats every interval days or weeks from start, until a date and/or for count occurrences"""
+      def __init__(self, id: str, title: str, subject: str, start: str, freq: str="weekly", interval: int=1,
+                   until: Optional[str]=None, count: Optional[int]=None, status: str="To Do",
+                   overrides: Optional[Dict[int, dict]]=None, skipped: Iterable[int]=()):
+            if freq not in RECURRENCE_FREQS:
+                  raise ValueError(f"freq must be one of {', '.join(RECURRENCE_FREQS)}")
+            if int(interval) < 1 or (count is not None and int(count) < 1):
+                  raise ValueError("interval and count must be at least 1")
+            if not title.strip() or not subject.strip():
+                  raise ValueError("title and subject are required")
+            if status not in statusoptions:
+                  raise ValueError(f"unknown status {status!r}")
+            self.start_ord=date_ordinal(start)
+            self.until_ord=date_ordinal(until) if until else None
+            if self.start_ord is None or (until and self.until_ord is None):
+                  raise ValueError("start and until need to be valid dates")
+            self.id=id
+            self.title=title.strip()
+            self.subject=subject.strip()
+            self.start=start
+            self.freq=freq
+            self.interval=int(interval)
+            self.until=until or None
+            self.count=None if count is None else int(count)
+            self.status=status
+            self.step=RECURRENCE_FREQS[freq] * self.interval
+            self.overrides: Dict[int, dict]=dict(overrides or {})
+            self.skipped=set(skipped)
+      def last_day(self) -> Optional[int]:
+            """Day of the final occurrence, None when the series never ends"""
+            ends=[]
+            if self.count is not None:
+                  ends.append(self.start_ord + (self.count - 1) * self.step)
+            if self.until_ord is not None:
+                  ends.append(self.until_ord)
+            return min(ends) if ends else None
+      def days(self, lo: int, hi: int) -> List[int]:
+            """Occurrence days in [lo, hi], stepped to directly rather than walked from the start"""
+            last=self.last_day()
+            hi=hi if last is None else min(hi, last)
+            first=self.start_ord if lo <= self.start_ord else self.start_ord + -(-(lo - self.start_ord) // self.step) * self.step
+            return [d for d in range(first, hi + 1, self.step) if d not in self.skipped]
+      def occurrence(self, day: int) -> Occurrence:
+            f={**self.defaults(day), **self.overrides.get(day, {})}
+            t=Occurrence.from_valid(f"{self.id}@{date.fromordinal(day).isoformat()}", f["title"], f["subject"], f["duedate"],
+                                    date_ordinal(f["duedate"]) or day, statusorder.get(f["status"], 0))
+            t.series_id=self.id
+            t.day=day
+            return t
+      def defaults(self, day: int) -> dict:
+            """Fields of the occurrence on day before any edit"""
+            return {"title": self.title, "subject": self.subject, "duedate": date.fromordinal(day).strftime(dateformat), "status": self.status}
+      def expand(self, lo: int, hi: int) -> List[Occurrence]:
+            return [self.occurrence(d) for d in self.days(lo, hi)]
+      def record(self, occ: Occurrence) -> None:
+            """Keep only the fields where the occurrence differs from the series"""
+            default=self.defaults(occ.day)
+            fields={k: getattr(occ, k) for k in OVERRIDE_FIELDS if getattr(occ, k) != default[k]}
+            if fields:
+                  self.overrides[occ.day]=fields
+            else:
+                  self.overrides.pop(occ.day, None)
+      def skip(self, day: int) -> None:
+            self.skipped.add(day)
+            self.overrides.pop(day, None)
+      def to_dict(self) -> dict:
+            day=lambda d: date.fromordinal(d).strftime(dateformat)
+            return {
+                  "id": self.id, "title": self.title, "subject": self.subject, "start": self.start,
+                  "freq": self.freq, "interval": self.interval, "until": self.until, "count": self.count, "status": self.status,
+                  "overrides": {day(d): f for d, f in sorted(self.overrides.items())},
+                  "skipped": [day(d) for d in sorted(self.skipped)],
+            }
+      @classmethod
+      def from_dict(cls, raw: dict) -> "Series":
+            overrides={date_ordinal(d): {k: v for k, v in f.items() if k in OVERRIDE_FIELDS}
+                       for d, f in (raw.get("overrides") or {}).items() if date_ordinal(d) and isinstance(f, dict)}
+            skipped=[o for o in map(date_ordinal, raw.get("skipped") or ()) if o]
+            return cls(str(raw["id"]), str(raw["title"]), str(raw["subject"]), str(raw["start"]), raw.get("freq", "weekly"),
+                       raw.get("interval", 1), raw.get("until"), raw.get("count"), raw.get("status", "To Do"), overrides, skipped)
+
+class RecurringTasks:
+      """Every series, and the occurrences of the window in view expanded into a TaskCollection
+
+      Occurrences go in and out as "merge" events, which listeners don't write to storage.
+      Moving the window only touches the occurrences that appear, change or drop out.
+      """
+      def __init__(self, series: Iterable[Series]=()):
+            self.series: Dict[str, Series]={s.id: s for s in series}
+            self.window=recurrence_window()
+            self.expanded: Dict[str, Occurrence]={}
+            self._ids: Dict[tuple, str]={}
+      def __len__(self) -> int:
+            return len(self.series)
+      def owns(self, tid: str) -> bool:
+            return tid in self.expanded
+      def expand(self, lo: int, hi: int) -> List[Occurrence]:
+            return [o for s in self.series.values() for o in s.expand(lo, hi)]
+      def show(self, tasks: TaskCollection, window: Optional[Tuple[int, int]]=None) -> None:
+            """Bring tasks in line with the window
+
+            Occurrences still held by tasks are kept as they are, so moving the window a day
+            only builds the new days; after a load or restore the missing ones are rebuilt.
+            """
+            if window is not None:
+                  self.window=window
+            lo, hi=self.window
+            expanded, ids=self.expanded, self._ids
+            shown: Dict[str, Occurrence]={}
+            keys: Dict[tuple, str]={}
+            added=[]
+            for s in self.series.values():
+                  for d in s.days(lo, hi):
+                        tid=ids.get((s.id, d))
+                        if tid is not None and tasks.get(tid) is expanded[tid]:
+                              shown[tid]=expanded[tid]
+                        else:
+                              o=s.occurrence(d)
+                              tid=o.id
+                              shown[tid]=o
+                              added.append(o)
+                        keys[(s.id, d)]=tid
+            tasks.merge(added, [tid for tid in expanded if tid not in shown])
+            self.expanded={tid: tasks.get(tid) for tid in shown}
+            self._ids=keys
+      def add(self, series: Series, tasks: TaskCollection) -> None:
+            self.series[series.id]=series
+            self.show(tasks)
+      def remove(self, sid: str, tasks: TaskCollection) -> None:
+            if self.series.pop(sid, None) is not None:
+                  self.show(tasks)
+      def record(self, changed: List[Task], removed: List[str]) -> Tuple[List[Task], List[str], bool]:
+            """Take edits and deletes of occurrences into their series
+
+            Returns the changes that belong to stored tasks, and whether any series changed.
+            """
+            touched=False
+            stored=[]
+            for t in changed:
+                  if isinstance(t, Occurrence) and t.id in self.expanded:
+                        self.series[t.series_id].record(t)
+                        touched=True
+                  else:
+                        stored.append(t)
+            kept=[]
+            for tid in removed:
+                  occ=self.expanded.pop(tid, None)
+                  if occ is None:
+                        kept.append(tid)
+                  elif occ.series_id in self.series:
+                        self.series[occ.series_id].skip(occ.day)
+                        touched=True
+            return stored, kept, touched
+
+def load_series(path: str) -> RecurringTasks:
+      try:
+            with open(path, "r", encoding="utf-8") as f:
+                  raw=json.load(f)
+      except (OSError, ValueError):
+            raw=[]
+      series=[]
+      for item in raw if isinstance(raw, list) else ():
+            try:
+                  series.append(Series.from_dict(item))
+            except (KeyError, TypeError, ValueError):
+                  # one damaged record shouldn't take the others with it
+                  continue
+      return RecurringTasks(series)
+
+def save_series(path: str, recurring: RecurringTasks) -> None:
+      tmp=path + ".tmp"
+      with open(tmp, "w", encoding="utf-8") as f:
+            json.dump([s.to_dict() for s in recurring.series.values()], f, indent=2)
+      os.replace(tmp, path)
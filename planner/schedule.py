@@ -0,0 +1,238 @@
+"""Study schedule: spreads open tasks over days under a daily study capacity
+
+Efforts and capacity are in hours at the edges and whole minutes inside, so splitting
+a task across days never accumulates float error.
+"""
+import heapq
+
+import json
+
+import os
+
+from bisect import bisect_left, insort
+
+from collections import namedtuple
+
+from datetime import date
+
+from typing import Dict, List, Optional
+
+from planner.core import DATA_FILE, Task, dateformat
+
+
+SCHEDULE_CAPACITY_HOURS=4.0
+SCHEDULE_DEFAULT_EFFORT_HOURS=1.0
+SCHEDULE_MODES=("edf", "fewest-late")
+OPEN_STATUSES=("To Do", "In progress")
+
+ScheduleRow=namedtuple("ScheduleRow", "id task day minutes")
+
+def _minutes(hours: float) -> int:
+      return max(0, int(round(float(hours) * 60)))
+
+def schedule_path(data_file: str=DATA_FILE) -> str:
+      """Efforts and capacity live next to the planner file, e.g. planner.schedule.json"""
+      return os.path.splitext(data_file)[0] + ".schedule.json"
+
+class StudySchedule:
+      """Day-by-day plan of the open tasks
+
+      edf allocates in earliest-deadline-first order, splitting a task across days when
+      it doesn't fit, which keeps the worst lateness as small as it can be. fewest-late
+      first drops the longest tasks that can't make their deadline (Moore-Hodgson) and
+      plans them after everything that can.
+      """
+      def __init__(self, capacity_hours: float=SCHEDULE_CAPACITY_HOURS, default_effort_hours: float=SCHEDULE_DEFAULT_EFFORT_HOURS,
+                   efforts: Optional[Dict[str, float]]=None, mode: str="edf", today: Optional[int]=None):
+            self.capacity=max(1, _minutes(capacity_hours))
+            self.default_effort=_minutes(default_effort_hours)
+            self.efforts: Dict[str, int]={tid: _minutes(h) for tid, h in (efforts or {}).items()}
+            self.mode=mode if mode in SCHEDULE_MODES else "edf"
+            self.today=today or date.today().toordinal()
+            self.tasks: Dict[str, Task]={}
+            self.blocks: Dict[str, list]={}
+            self.finish: Dict[str, int]={}
+            self._keys: Dict[str, tuple]={}
+            self._order: List[tuple]=[]
+            self._sequence: List[str]=[]
+            self._start: Dict[str, tuple]={}
+            self._end: Dict[str, tuple]={}
+      def __len__(self) -> int:
+            return len(self._order)
+      def effort(self, tid: str) -> float:
+            return self.efforts.get(tid, self.default_effort) / 60
+      def set_effort(self, tid: str, hours: float) -> None:
+            self.efforts[tid]=_minutes(hours)
+            if tid in self._keys:
+                  self._replan(bisect_left(self._order, self._keys[tid]), tid)
+      def configure(self, capacity_hours: Optional[float]=None, mode: Optional[str]=None, today: Optional[int]=None) -> None:
+            if capacity_hours is not None:
+                  self.capacity=max(1, _minutes(capacity_hours))
+            if mode in SCHEDULE_MODES:
+                  self.mode=mode
+            if today is not None:
+                  self.today=today
+            self._start.clear()
+            self._replan(0)
+      def rebuild(self, tasks) -> None:
+            self.tasks={t.id: t for t in tasks if t.status in OPEN_STATUSES}
+            self._keys={tid: (t.due_ord, tid) for tid, t in self.tasks.items()}
+            self._order=sorted(self._keys.values())
+            for d in (self.blocks, self.finish, self._start, self._end):
+                  d.clear()
+            self._replan(0)
+      def update(self, task: Task) -> None:
+            old=self._keys.pop(task.id, None)
+            lo=hi=None
+            if old is not None:
+                  i=bisect_left(self._order, old)
+                  del self._order[i]
+                  lo=hi=i
+            if task.status in OPEN_STATUSES:
+                  key=(task.due_ord, task.id)
+                  self.tasks[task.id]=task
+                  self._keys[task.id]=key
+                  insort(self._order, key)
+                  i=bisect_left(self._order, key)
+                  lo=i if lo is None else min(lo, i)
+                  hi=i if hi is None else max(hi, i)
+            else:
+                  self._forget(task.id)
+            if lo is not None:
+                  self._replan(lo, task.id, hi)
+      def remove(self, tid: str) -> None:
+            key=self._keys.pop(tid, None)
+            if key is None:
+                  return
+            i=bisect_left(self._order, key)
+            del self._order[i]
+            self._forget(tid)
+            self._replan(i)
+      def _forget(self, tid: str) -> None:
+            for d in (self.tasks, self.blocks, self.finish, self._start, self._end):
+                  d.pop(tid, None)
+      def on_change(self, kind: str, changed: List[Task], removed: List[str]) -> None:
+            if kind in ("load", "reset"):
+                  self.rebuild(changed)
+                  return
+            if len(changed) + len(removed) > 64:
+                  # a bulk change touches most of the plan anyway; one sort beats many insorts
+                  for tid in removed:
+                        self._forget(tid)
+                  # _forget already dropped the removed ids; changed tasks replace their old versions
+                  current=dict(self.tasks)
+                  current.update((t.id, t) for t in changed)
+                  self.rebuild(current.values())
+                  return
+            for t in changed:
+                  self.update(t)
+            for tid in removed:
+                  self.remove(tid)
+      def _replan(self, k: int, changed: Optional[str]=None, hi: int=-1) -> None:
+            """Re-allocate from position k of the deadline order; stops once the plan lines up with the old one"""
+            if self.mode != "edf":
+                  # dropping one task can reorder everything after it, so plan from scratch
+                  self._sequence=self._fewest_late_order()
+                  self._start.clear()
+                  self._allocate(self._sequence, 0)
+                  return
+            self._sequence=[tid for _, tid in self._order]
+            self._allocate(self._sequence, k, changed, hi)
+      def _allocate(self, seq: List[str], k: int, changed: Optional[str]=None, hi: int=-1) -> None:
+            cap=self.capacity
+            day, used=self._end[seq[k - 1]] if 0 < k <= len(seq) else (self.today, 0)
+            start=self._start
+            efforts=self.efforts
+            default=self.default_effort
+            for i in range(k, len(seq)):
+                  tid=seq[i]
+                  if i > hi and tid != changed and start.get(tid) == (day, used):
+                        # same starting point as before, so this task and everything after is unchanged
+                        return
+                  start[tid]=(day, used)
+                  left=efforts.get(tid, default)
+                  blocks=[]
+                  while left > 0:
+                        if used >= cap:
+                              day += 1
+                              used=0
+                        m=min(cap - used, left)
+                        blocks.append((day, m))
+                        used += m
+                        left -= m
+                  self.blocks[tid]=blocks
+                  self.finish[tid]=day
+                  self._end[tid]=(day, used)
+      def _fewest_late_order(self) -> List[str]:
+            cap=self.capacity
+            efforts=self.efforts
+            default=self.default_effort
+            kept=[]
+            late=set()
+            total=0
+            for due, tid in self._order:
+                  e=efforts.get(tid, default)
+                  heapq.heappush(kept, (-e, tid))
+                  total += e
+                  if total and self.today + (total - 1) // cap > due:
+                        e, longest=heapq.heappop(kept)
+                        total += e
+                        late.add(longest)
+            ids=[tid for _, tid in self._order]
+            return [tid for tid in ids if tid not in late] + [tid for tid in ids if tid in late]
+      def lateness(self, tid: str) -> int:
+            """Days the plan finishes a task after its due date, 0 if on time"""
+            return max(0, self.finish[tid] - self._keys[tid][0])
+      def late(self) -> List[str]:
+            return [tid for tid in self._sequence if self.finish[tid] > self._keys[tid][0]]
+      def summary(self) -> dict:
+            late=self.late()
+            return {
+                  "tasks": len(self._sequence),
+                  "hours": sum(self.efforts.get(tid, self.default_effort) for tid in self._sequence) / 60,
+                  "late": len(late),
+                  "max_late_days": max((self.lateness(tid) for tid in late), default=0),
+                  "last_day": max(self.finish.values(), default=self.today),
+            }
+      def rows(self, until: Optional[int]=None) -> List[ScheduleRow]:
+            """One row per study block in day order; until limits it to days up to that ordinal"""
+            out: List[ScheduleRow]=[]
+            for tid in self._sequence:
+                  task=self.tasks[tid]
+                  for day, m in self.blocks[tid]:
+                        if until is not None and day > until:
+                              # blocks are allocated in sequence order, so days only grow from here
+                              return out
+                        out.append(ScheduleRow(tid, task, day, m))
+            return out
+      def settings(self) -> dict:
+            return {
+                  "capacity_hours": self.capacity / 60,
+                  "mode": self.mode,
+                  "efforts": {tid: m / 60 for tid, m in self.efforts.items()},
+            }
+
+def load_schedule(path: str, tasks=()) -> StudySchedule:
+      try:
+            with open(path, "r", encoding="utf-8") as f:
+                  raw=json.load(f)
+      except (OSError, ValueError):
+            raw={}
+      if not isinstance(raw, dict):
+            raw={}
+      plan=StudySchedule(raw.get("capacity_hours", SCHEDULE_CAPACITY_HOURS), efforts=raw.get("efforts") or {}, mode=raw.get("mode", "edf"))
+      plan.rebuild(tasks)
+      return plan
+
+def save_schedule(path: str, plan: StudySchedule, task_ids=None) -> None:
+      settings=plan.settings()
+      if task_ids is not None:
+            # efforts of deleted tasks would only pile up
+            settings["efforts"]={tid: h for tid, h in settings["efforts"].items() if tid in task_ids}
+      tmp=path + ".tmp"
+      with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=2)
+      os.replace(tmp, path)
+
+def day_str(ordinal: int) -> str:
+      return date.fromordinal(ordinal).strftime(dateformat)
@@ -0,0 +1,339 @@
+"""Local HTTP/JSON API over the planner: python -m planner serve
+
+GET    /tasks?q=&status=&sort=&reverse=&limit=&cursor=   one page plus a "next" cursor
+POST   /tasks                                            create, 201 with Location and ETag
+GET    /tasks/<id>                                       one task
+PUT    /tasks/<id>, PATCH /tasks/<id>                    replace / partial update
+DELETE /tasks/<id>
+
+sort takes one column or a comma list such as status,-duedate; a leading - sorts that
+column descending.
+
+Every response carries an ETag; GETs honour If-None-Match with 304, and writes with
+If-Match get 412 when the task changed since the client read it.
+"""
+import base64
+
+import binascii
+
+import json
+
+import signal
+
+import threading
+
+import uuid
+
+from http import HTTPStatus
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from typing import List, Optional, Tuple
+
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from planner.core import DATA_FILE, SearchIndex, SortedView, Task, TaskCollection, filter_sort, parse_sort, sort_spec, statusoptions, valid_date
+
+from planner.storage import STORAGE_ENGINE, PersistWorker, open_storage, storage
+
+
+API_HOST="127.0.0.1"
+API_PORT=8765
+API_PAGE_SIZE=100
+API_MAX_PAGE_SIZE=1000
+API_MAX_BODY=1 << 20
+API_RESULT_CACHE=32
+
+class ApiError(Exception):
+      def __init__(self, status: int, message: str):
+            super().__init__(message)
+            self.status=status
+
+class PlannerService:
+      """Tasks shared by all request threads; one lock, one storage and one persistence worker"""
+      def __init__(self, store: storage):
+            self.storage=store
+            self.tasks=TaskCollection()
+            self.search_index=SearchIndex()
+            self.tasks.subscribe(self.search_index.on_change)
+            # the default listing order stays sorted, so it survives the result cache being cleared
+            self.view=SortedView()
+            self.tasks.subscribe(self.view.on_change)
+            self.tasks.subscribe(self._on_tasks_changed)
+            self.persister=PersistWorker(store)
+            self.revision=0
+            # revisions restart with the process, so tags carry an epoch to keep old ones from matching
+            self.epoch=uuid.uuid4().hex[:8]
+            self._versions: dict={}
+            self._results: dict={}
+            self._lock=threading.Lock()
+            self.tasks.load(store.load())
+      def _on_tasks_changed(self, kind: str, changed: List[Task], removed: List[str]) -> None:
+            self.revision += 1
+            if kind in ("load", "reset"):
+                  self._versions={t.id: self.revision for t in changed}
+            else:
+                  for t in changed:
+                        self._versions[t.id]=self.revision
+                  for tid in removed:
+                        self._versions.pop(tid, None)
+            self._results.clear()
+            if kind not in ("load", "merge"):
+                  self.persister.submit(self.tasks, changed if kind != "reset" else None, removed if kind != "reset" else None)
+      def etag(self, tid: Optional[str]=None) -> str:
+            return '"%s-%d"' % (self.epoch, self.revision if tid is None else self._versions[tid])
+      def revision_etag(self) -> str:
+            with self._lock:
+                  self._sync()
+                  return self.etag()
+      def _check(self, tid: str, if_match: Optional[str]) -> None:
+            if if_match and if_match.strip() != "*" and self.etag(tid) not in (s.strip() for s in if_match.split(",")):
+                  raise ApiError(HTTPStatus.PRECONDITION_FAILED, f"task {tid} was changed by someone else")
+      def _sync(self) -> None:
+            """Merge whatever the app or a script saved since the last request"""
+            if self.storage.changed():
+                  incoming=self.storage.poll(list(self.tasks))
+                  if incoming:
+                        self.tasks.merge(*incoming)
+      def _get(self, tid: str) -> Task:
+            self._sync()
+            task=self.tasks.get(tid)
+            if task is None:
+                  raise ApiError(HTTPStatus.NOT_FOUND, f"no task {tid}")
+            return task
+      def get(self, tid: str) -> Tuple[dict, str]:
+            with self._lock:
+                  return self._get(tid).to_dict(), self.etag(tid)
+      def page(self, q: str="", status: str="ALL", sort_key="duedate", reverse: bool=False,
+               limit: int=API_PAGE_SIZE, cursor: Optional[str]=None) -> Tuple[dict, str]:
+            spec=sort_spec(sort_key, reverse)
+            with self._lock:
+                  self._sync()
+                  key=(q, status, spec)
+                  items=self._results.get(key)
+                  if items is None:
+                        # later pages of the same listing reuse the sorted result until the next change
+                        items=filter_sort(self.tasks, q, status, spec, index=self.search_index, view=self.view)
+                        if len(self._results) >= API_RESULT_CACHE:
+                              self._results.pop(next(iter(self._results)))
+                        self._results[key]=items
+                  start=_resume(items, cursor)
+                  rows=items[start:start + limit]
+                  end=start + len(rows)
+                  body={
+                        "tasks": [t.to_dict() for t in rows],
+                        "total": len(items),
+                        "next": _cursor(end, rows[-1].id) if rows and end < len(items) else None,
+                  }
+                  return body, self.etag()
+      def create(self, data) -> Tuple[dict, str]:
+            fields=_fields(data, partial=False)
+            tid=str(fields.pop("id", None) or uuid.uuid4())
+            with self._lock:
+                  self._sync()
+                  if tid in self.tasks:
+                        raise ApiError(HTTPStatus.CONFLICT, f"task {tid} already exists")
+                  task=Task(id=tid, **fields)
+                  self.tasks.add(task)
+                  return task.to_dict(), self.etag(tid)
+      def update(self, tid: str, data, partial: bool, if_match: Optional[str]=None) -> Tuple[dict, str]:
+            fields=_fields(data, partial)
+            if fields.pop("id", tid) != tid:
+                  raise ApiError(HTTPStatus.BAD_REQUEST, "id can't be changed")
+            with self._lock:
+                  task=self._get(tid)
+                  self._check(tid, if_match)
+                  if any(getattr(task, k) != v for k, v in fields.items()):
+                        self.tasks.update(tid, **fields)
+                  return task.to_dict(), self.etag(tid)
+      def delete(self, tid: str, if_match: Optional[str]=None) -> None:
+            with self._lock:
+                  self._get(tid)
+                  self._check(tid, if_match)
+                  self.tasks.remove(tid)
+      def close(self) -> bool:
+            ok=self.persister.stop()
+            self.storage.close()
+            return ok
+
+def _fields(data, partial: bool) -> dict:
+      if not isinstance(data, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "expected a JSON object")
+      fields={}
+      for k in ("id", "title", "subject", "duedate", "status"):
+            if k not in data:
+                  continue
+            v=data[k]
+            if not isinstance(v, str) or not v.strip():
+                  raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, f"{k} must be a non-empty string")
+            fields[k]=v.strip()
+      if not partial:
+            missing=[k for k in ("title", "subject", "duedate") if k not in fields]
+            if missing:
+                  raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, f"missing field(s): {', '.join(missing)}")
+            fields.setdefault("status", "To Do")
+      if "duedate" in fields and not valid_date(fields["duedate"]):
+            raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, "duedate must be yyyy/mm/dd")
+      if "status" in fields and fields["status"] not in statusoptions:
+            raise ApiError(HTTPStatus.UNPROCESSABLE_ENTITY, f"status must be one of {', '.join(statusoptions)}")
+      return fields
+
+def _cursor(offset: int, last_id: str) -> str:
+      return base64.urlsafe_b64encode(json.dumps([offset, last_id]).encode()).decode().rstrip("=")
+
+def _resume(items: List[Task], cursor: Optional[str]) -> int:
+      """Index after the cursor's last task, found again by id if edits shifted the list"""
+      if not cursor:
+            return 0
+      try:
+            offset, last_id=json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            offset=int(offset)
+      except (ValueError, TypeError, binascii.Error):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "bad cursor") from None
+      if 0 < offset <= len(items) and items[offset - 1].id == last_id:
+            return offset
+      for i, t in enumerate(items):
+            if t.id == last_id:
+                  return i + 1
+      return min(max(offset, 0), len(items))
+
+class ApiHandler(BaseHTTPRequestHandler):
+      protocol_version="HTTP/1.1"
+      server_version="SmartStudyPlanner"
+      # headers and body go out as separate writes; without this keep-alive clients hit delayed ACKs
+      disable_nagle_algorithm=True
+      service: PlannerService
+      quiet=True
+      _unread=0
+
+      def do_GET(self):
+            self._dispatch(self._get)
+      def do_POST(self):
+            self._dispatch(self._post)
+      def do_PUT(self):
+            self._dispatch(lambda path, query: self._put(path, query, partial=False))
+      def do_PATCH(self):
+            self._dispatch(lambda path, query: self._put(path, query, partial=True))
+      def do_DELETE(self):
+            self._dispatch(self._delete)
+
+      def _dispatch(self, handler) -> None:
+            url=urlsplit(self.path)
+            parts=[unquote(p) for p in url.path.strip("/").split("/")]
+            self._unread=self._content_length()
+            try:
+                  if parts[0] != "tasks" or len(parts) > 2:
+                        raise ApiError(HTTPStatus.NOT_FOUND, "not found")
+                  handler(parts[1:], parse_qs(url.query))
+            except ApiError as e:
+                  self._send(e.status, {"error": str(e)})
+            except Exception as e:
+                  self._send(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(e)})
+      def _get(self, path: List[str], query: dict) -> None:
+            if path:
+                  body, etag=self.service.get(path[0])
+            else:
+                  arg=lambda k, d: query.get(k, [d])[-1]
+                  reverse=arg("reverse", "0").lower() in ("1", "true", "yes")
+                  try:
+                        spec=parse_sort(arg("sort", "duedate"), reverse)
+                  except ValueError as e:
+                        raise ApiError(HTTPStatus.BAD_REQUEST, str(e)) from None
+                  try:
+                        limit=min(max(int(arg("limit", API_PAGE_SIZE)), 1), API_MAX_PAGE_SIZE)
+                  except ValueError:
+                        raise ApiError(HTTPStatus.BAD_REQUEST, "limit must be a number") from None
+                  if self._not_modified(self.service.revision_etag()):
+                        return
+                  body, etag=self.service.page(arg("q", ""), arg("status", "ALL"), spec, limit=limit, cursor=arg("cursor", None))
+            if not self._not_modified(etag):
+                  self._send(HTTPStatus.OK, body, etag)
+      def _post(self, path: List[str], query: dict) -> None:
+            if path:
+                  raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "POST to /tasks")
+            body, etag=self.service.create(self._read_json())
+            self._send(HTTPStatus.CREATED, body, etag, {"Location": "/tasks/" + body["id"]})
+      def _put(self, path: List[str], query: dict, partial: bool) -> None:
+            if not path:
+                  raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "PUT/PATCH a single task")
+            body, etag=self.service.update(path[0], self._read_json(), partial, self.headers.get("If-Match"))
+            self._send(HTTPStatus.OK, body, etag)
+      def _delete(self, path: List[str], query: dict) -> None:
+            if not path:
+                  raise ApiError(HTTPStatus.METHOD_NOT_ALLOWED, "DELETE a single task")
+            self.service.delete(path[0], self.headers.get("If-Match"))
+            self._send(HTTPStatus.NO_CONTENT)
+
+      def _not_modified(self, etag: str) -> bool:
+            tags=self.headers.get("If-None-Match")
+            if tags and (tags.strip() == "*" or etag in (s.strip() for s in tags.split(","))):
+                  self._send(HTTPStatus.NOT_MODIFIED, etag=etag)
+                  return True
+            return False
+      def _content_length(self) -> int:
+            """Body bytes the request says follow; -1 when that can't be told, e.g. chunked"""
+            if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+                  return -1
+            try:
+                  n=int(self.headers.get("Content-Length") or 0)
+            except ValueError:
+                  return -1
+            return n if n >= 0 else -1
+      def _discard_body(self) -> None:
+            # on a keep-alive connection an unread body would be parsed as the next request
+            n=self._unread
+            self._unread=0
+            if 0 < n <= API_MAX_BODY:
+                  self.rfile.read(n)
+            elif n:
+                  self.close_connection=True
+      def _read_json(self):
+            n=self._unread
+            if not 0 < n <= API_MAX_BODY:
+                  raise ApiError(HTTPStatus.BAD_REQUEST, "expected a JSON body")
+            self._unread=0
+            try:
+                  return json.loads(self.rfile.read(n))
+            except ValueError:
+                  raise ApiError(HTTPStatus.BAD_REQUEST, "body is not valid JSON") from None
+      def _send(self, status: int, body=None, etag: Optional[str]=None, headers: Optional[dict]=None) -> None:
+            data=b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self._discard_body()
+            self.send_response(status)
+            if data:
+                  self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            if etag:
+                  self.send_header("ETag", etag)
+            if self.close_connection:
+                  self.send_header("Connection", "close")
+            for k, v in (headers or {}).items():
+                  self.send_header(k, v)
+            self.end_headers()
+            if data:
+                  self.wfile.write(data)
+      def log_message(self, format, *args):
+            if not self.quiet:
+                  super().log_message(format, *args)
+
+def make_server(service: PlannerService, host: str=API_HOST, port: int=API_PORT, quiet: bool=True) -> ThreadingHTTPServer:
+      handler=type("Handler", (ApiHandler,), {"service": service, "quiet": quiet})
+      server=ThreadingHTTPServer((host, port), handler)
+      server.daemon_threads=True
+      return server
+
+def _interrupt(signum, frame):
+      # a plain kill should still flush the write window before exiting
+      raise KeyboardInterrupt
+
+def serve(path: str=DATA_FILE, engine: str=STORAGE_ENGINE, host: str=API_HOST, port: int=API_PORT, quiet: bool=True) -> None:
+      service=PlannerService(open_storage(path, engine))
+      server=make_server(service, host, port, quiet)
+      signal.signal(signal.SIGTERM, _interrupt)
+      try:
+            server.serve_forever()
+      except KeyboardInterrupt:
+            pass
+      finally:
+            server.server_close()
+            service.close()
@@ -0,0 +1,109 @@
+"""Running task statistics, kept current from TaskCollection events"""
+from collections import Counter, namedtuple
+
+from datetime import date
+
+from typing import Dict, List, Optional
+
+from planner.core import Task, statusoptions, statusorder
+
+
+DUE_BUCKETS=("overdue", "today", "next 7 days", "later")
+DONE=statusorder["Done"]
+
+# id is the subject, so rows can go straight into a VirtualTable
+SubjectCount=namedtuple("SubjectCount", "id total done")
+
+class TaskStats:
+      """Counts per status, per subject and per due bucket; each add/edit/delete/toggle is O(1)
+
+      Due buckets count open (not Done) tasks relative to today. Open tasks are also counted
+      per due date, so moving to a new day re-buckets per distinct date rather than per task.
+      """
+      def __init__(self, today: Optional[int]=None):
+            self.today=today or date.today().toordinal()
+            self.total=0
+            self.by_status: List[int]=[0] * len(statusoptions)
+            self.by_subject: Counter=Counter()
+            self.done_by_subject: Counter=Counter()
+            self.by_bucket: Dict[str, int]=dict.fromkeys(DUE_BUCKETS, 0)
+            self.open_by_due: Counter=Counter()
+            self._seen: Dict[str, tuple]={}
+      @classmethod
+      def from_tasks(cls, tasks, today: Optional[int]=None) -> "TaskStats":
+            stats=cls(today)
+            stats.rebuild(tasks)
+            return stats
+      def rebuild(self, tasks) -> None:
+            self.__init__(self.today)
+            for t in tasks:
+                  self._add(t)
+      def bucket(self, due: int) -> str:
+            if due < self.today:
+                  return "overdue"
+            if due == self.today:
+                  return "today"
+            if due <= self.today + 7:
+                  return "next 7 days"
+            return "later"
+      def set_today(self, today: int) -> None:
+            if today == self.today:
+                  return
+            self.today=today
+            buckets=dict.fromkeys(DUE_BUCKETS, 0)
+            for due, n in self.open_by_due.items():
+                  buckets[self.bucket(due)] += n
+            self.by_bucket=buckets
+      def on_change(self, kind: str, changed: List[Task], removed: List[str]) -> None:
+            if kind in ("load", "reset"):
+                  self.rebuild(changed)
+                  return
+            for t in changed:
+                  self._remove(t.id)
+                  self._add(t)
+            for tid in removed:
+                  self._remove(tid)
+      def _add(self, t: Task) -> None:
+            # remember what was counted; update events only carry the task as it is now
+            key=(t._status, t.subject, t.due_ord)
+            self._seen[t.id]=key
+            self._count(key, 1)
+      def _remove(self, tid: str) -> None:
+            key=self._seen.pop(tid, None)
+            if key is not None:
+                  self._count(key, -1)
+      def _count(self, key: tuple, n: int) -> None:
+            status, subject, due=key
+            self.total += n
+            self.by_status[status] += n
+            self.by_subject[subject] += n
+            if not self.by_subject[subject]:
+                  del self.by_subject[subject]
+            if status == DONE:
+                  self.done_by_subject[subject] += n
+                  if not self.done_by_subject[subject]:
+                        del self.done_by_subject[subject]
+                  return
+            self.open_by_due[due] += n
+            if not self.open_by_due[due]:
+                  del self.open_by_due[due]
+            self.by_bucket[self.bucket(due)] += n
+      def subjects(self) -> List[SubjectCount]:
+            """Per-subject counts, largest first"""
+            done=self.done_by_subject
+            return sorted((SubjectCount(s, n, done.get(s, 0)) for s, n in self.by_subject.items()), key=lambda r: (-r.total, r.id.lower()))
+      def snapshot(self) -> dict:
+            return {
+                  "total": self.total,
+                  "status": dict(zip(statusoptions, self.by_status)),
+                  "subjects": {s: (n, self.done_by_subject.get(s, 0)) for s, n in self.by_subject.items()},
+                  "due": dict(self.by_bucket),
+            }
+      def verify(self, tasks) -> List[str]:
+            """Differences from a full recount of tasks; empty when the running counters are right"""
+            mine, full=self.snapshot(), TaskStats.from_tasks(tasks, self.today).snapshot()
+            diffs=[]
+            for section in full:
+                  if mine[section] != full[section]:
+                        diffs.append(f"{section}: running {mine[section]!r}, recount {full[section]!r}")
+            return diffs
@@ -0,0 +1,826 @@
+import os
+
+import json
+
+import threading
+
+import sqlite3
+
+import glob
+
+import itertools
+
+import time
+
+from contextlib import contextmanager
+
+from datetime import datetime
+
+from operator import attrgetter
+
+from typing import Iterator, List, Optional, Tuple
+
+try:
+      import fcntl
+except ImportError:
+      fcntl=None
+
+try:
+      import msvcrt
+except ImportError:
+      msvcrt=None
+
+from planner.backup import BackupStore, legacy_backup_time
+
+from planner.core import (
+      BACKUP_DIR, Task, date_ordinal, normalize, read_tasks_jsonl, sort_spec, statusoptions, statusorder, task_from_dict,
+      tasks_from_records, write_tasks_json, write_tasks_jsonl,
+)
+
+from planner.metrics import metrics
+
+
+STORAGE_ENGINE=os.environ.get("PLANNER_STORAGE","json")
+STORAGE_FORMAT=os.environ.get("PLANNER_FORMAT","json")
+JOURNAL_COMPACT_EVERY=500
+PERSIST_WINDOW_MS=250
+PERSIST_RETRY_MAX_MS=30000
+STREAM_BATCH=1000
+
+# what merges compare; a C-level getter keeps remembering 100k tasks per save cheap
+_state=attrgetter("id", "title", "subject", "duedate", "_status")
+_task_id=attrgetter("id")
+
+def _search_text(title: str, subject: str) -> str:
+      # the SQL side of SearchIndex's keys; a newline keeps a match from spanning both fields
+      return normalize(title) + "\n" + normalize(subject)
+
+def _collate_lower(a: str, b: str) -> int:
+      """str.lower() order, the same as core.SORT_KEYS sorts title and subject in memory"""
+      a, b=a.lower(), b.lower()
+      return (a > b) - (a < b)
+
+def _with_changes(tasks: List[Task], changed: List[Task], removed: List[str]) -> List[Task]:
+      """tasks with a change set applied, in their order with new ones at the end"""
+      by_id={t.id: t for t in changed}
+      gone=set(removed)
+      out=[by_id.pop(t.id, t) for t in tasks if t.id not in gone]
+      return out + list(by_id.values())
+
+class StorageError(Exception):
+      """A planner file that is there but can't be parsed"""
+
+@contextmanager
+def file_lock(path: str, exclusive: bool=True):
+      """Advisory lock on path; flock on POSIX, msvcrt on Windows"""
+      if not exclusive and not os.path.exists(path):
+            # nobody has written with locking yet, and replace() already makes single-file reads atomic
+            yield
+            return
+      with open(path, "a+") as f:
+            if fcntl is not None:
+                  fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            elif msvcrt is not None:
+                  while True:
+                        try:
+                              msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                              break
+                        except OSError:
+                              continue
+            try:
+                  yield
+            finally:
+                  if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                  elif msvcrt is not None:
+                        f.seek(0)
+                        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class storage:
+      """Tiny JSON storage helper; a .jsonl path selects the compact format
+
+      Writes are merged by task id with whatever another process wrote since we last
+      looked, and poll() hands those remote edits to the app.
+      """
+      # apply() writes a change set without needing the rest of the tasks
+      partial=False
+      def __init__(self,path: str):
+            self.path=path
+            self.jsonl=path.endswith(".jsonl")
+            self.lock_path=path + ".lock"
+            self._sig=None
+            self._base: dict={}
+            self._incoming: dict={}
+            self._remote: dict={}
+            self._sync_lock=threading.RLock()
+      def lock(self, exclusive: bool=True):
+            return file_lock(self.lock_path, exclusive)
+      def _watched(self) -> List[str]:
+            return [self.path]
+      def _signature(self):
+            sig=[]
+            for p in self._watched():
+                  try:
+                        st=os.stat(p)
+                  except OSError:
+                        sig.append(None)
+                        continue
+                  sig.append((st.st_ino, st.st_size, st.st_mtime_ns))
+            return tuple(sig)
+      def _seen(self, tasks: List[Task], sig=None) -> None:
+            self._base=dict(zip(map(_task_id, tasks), map(_state, tasks)))
+            self._sig=self._signature() if sig is None else sig
+      def changed(self) -> bool:
+            """Cheap check (a stat) for writes by another process, or remote edits not yet polled"""
+            if self._sig is None:
+                  # nothing loaded or written yet, so there is nothing to have changed since
+                  return False
+            return bool(self._incoming) or self._signature() != self._sig
+      def load(self) ->List[Task]:
+            with self._sync_lock, self.lock(False):
+                  # signature first: a write landing during the read then shows up as a change
+                  sig=self._signature()
+                  try:
+                        tasks=self._read()
+                  except StorageError:
+                        # an unreadable file opens empty as it always has; there is no base to merge against yet
+                        tasks=[]
+                  # what was read is the whole truth now, remote edits queued before it are in it or superseded
+                  self._forget_remote()
+                  self._seen(tasks, sig)
+            return tasks
+      def _read(self) -> List[Task]:
+            path=self.path
+            if not os.path.exists(path):
+                  # first start after switching formats reads the other file; the next save converts it
+                  path=os.path.splitext(self.path)[0] + (".json" if self.jsonl else ".jsonl")
+                  if not os.path.exists(path):
+                        return[]
+            try:
+                  with open(path,"r", encoding="utf-8") as f:
+                        if path.endswith(".jsonl"):
+                              return read_tasks_jsonl(f)
+                        raw= json.load(f)
+            except (OSError, ValueError) as e:
+                  # never [], a merge would read that as every task deleted over there
+                  raise StorageError(f"can't read {path}: {e}") from e
+            if not isinstance(raw,list):
+                  raise StorageError(f"can't read {path}: expected a list of tasks")
+            return tasks_from_records(raw)
+      def iter(self) -> Iterator[Task]:
+            """Tasks in file order; the compact format is read a line at a time"""
+            if not (self.jsonl and os.path.exists(self.path)):
+                  yield from self.load()
+                  return
+            with open(self.path, "r", encoding="utf-8") as f:
+                  header=json.loads(f.readline() or "{}")
+                  statuses=header.get("statuses") or statusoptions
+                  batch=[]
+                  for line in f:
+                        try:
+                              batch.append(json.loads(line))
+                        except ValueError:
+                              continue
+                        if len(batch) >= STREAM_BATCH:
+                              yield from tasks_from_records(batch, statuses)
+                              batch=[]
+                  yield from tasks_from_records(batch, statuses)
+      def save(self, tasks: List[Task], replace: bool=False) -> None:
+            """Write tasks, merged with other writers' edits; replace overwrites the file with exactly these"""
+            self._save(tasks, replace=replace)
+      def _save(self, tasks: List[Task], removed=(), replace: bool=False) -> None:
+            with self._sync_lock, self.lock():
+                  if replace:
+                        self._forget_remote()
+                  else:
+                        tasks=self._reconcile(tasks, removed)
+                  self._write(tasks)
+                  self._seen(tasks)
+      def _write(self, tasks: List[Task]) -> None:
+            tmp = self.path + ".tmp"
+            with open(tmp,"w",encoding="utf-8") as f:
+                  if self.jsonl:
+                        write_tasks_jsonl(tasks, f)
+                  else:
+                        write_tasks_json(tasks, f)
+            os.replace(tmp, self.path)
+      def _forget_remote(self) -> None:
+            self._remote.clear()
+            self._incoming.clear()
+      def _reconcile(self, tasks: List[Task], removed=()) -> List[Task]:
+            """Fold remote edits into a snapshot about to be written, so saving never drops them"""
+            if self._remote:
+                  for tid in removed:
+                        self._remote.pop(tid, None)
+                  tasks=self._with_remote(tasks, prune=True)
+            if self._signature() != self._sig:
+                  tasks, incoming=self._merge(tasks, self._read())
+                  self._take(incoming)
+            return tasks
+      def _merge(self, mine: List[Task], theirs: List[Task]):
+            """Three-way merge by id against what we last read or wrote; local edits win conflicts
+
+            Returns the merged list and the remote edits taken, as {id: task or None if deleted}.
+            """
+            base=self._base
+            by_id={t.id: t for t in theirs}
+            merged: List[Task]=[]
+            incoming: dict={}
+            for t in mine:
+                  other=by_id.pop(t.id, None)
+                  if base.get(t.id) == _state(t):
+                        # untouched here, so whatever the other writer did stands
+                        if other is None:
+                              incoming[t.id]=None
+                              continue
+                        if _state(other) != base[t.id]:
+                              incoming[t.id]=other
+                              t=other
+                  merged.append(t)
+            for tid, other in by_id.items():
+                  # ids we deleted stay deleted; the rest are new over there
+                  if tid not in base:
+                        merged.append(other)
+                        incoming[tid]=other
+            return merged, incoming
+      def _take(self, incoming: dict) -> None:
+            """Queue remote edits for poll() and remember them until the app's snapshots show them"""
+            for tid, t in incoming.items():
+                  old=self._remote[tid][0] if tid in self._remote else self._base.get(tid)
+                  self._remote[tid]=(old, t)
+                  self._incoming[tid]=t
+      def _with_remote(self, tasks: List[Task], prune: bool=False) -> List[Task]:
+            """tasks with remote edits applied where they still hold the version those edits replaced
+
+            The app merges remote edits a tick later, so a snapshot taken in between would undo
+            them. With prune, edits the snapshot already shows (or overrode locally) are forgotten.
+            """
+            remote=self._remote
+            out: List[Task]=[]
+            present=set()
+            for t in tasks:
+                  present.add(t.id)
+                  entry=remote.get(t.id)
+                  if entry is not None:
+                        old, new=entry
+                        if _state(t) == old:
+                              if new is not None:
+                                    out.append(new)
+                              continue
+                        if prune:
+                              del remote[t.id]
+                  out.append(t)
+            for tid, (old, new) in list(remote.items()):
+                  if tid in present:
+                        continue
+                  if old is None and new is not None:
+                        # added over there and not merged here yet
+                        out.append(new)
+                  elif prune:
+                        del remote[tid]
+            return out
+      def poll(self, tasks: List[Task]) -> Optional[Tuple[List[Task], List[str]]]:
+            """Remote edits the app should merge, as (changed, removed ids), or None if there are none"""
+            with self._sync_lock:
+                  if self._sig is not None and self._signature() != self._sig:
+                        try:
+                              with self.lock(False):
+                                    sig=self._signature()
+                                    theirs=self._read()
+                        except StorageError:
+                              # left unmerged, and polled again until the other writer fixes the file
+                              theirs=None
+                        if theirs is not None:
+                              _, remote=self._merge(self._with_remote(tasks), theirs)
+                              self._take(remote)
+                              self._seen(theirs, sig)
+                  incoming, self._incoming=self._incoming, {}
+            if not incoming:
+                  return None
+            return [t for t in incoming.values() if t is not None], [tid for tid, t in incoming.items() if t is None]
+      def apply(self, tasks: List[Task], changed: Optional[List[Task]]=None, removed: Optional[List[str]]=None) -> None:
+            """Persist a change set; engines that can't do partial writes save everything"""
+            self._save(tasks, removed or ())
+      def close(self) -> None:
+            pass
+
+class journalstorage(storage):
+      """planner.json snapshot plus an append-only log of per-task changes"""
+      partial=True
+      def __init__(self, path: str, compact_every: int=JOURNAL_COMPACT_EVERY):
+            super().__init__(path)
+            self.log_path=path + ".log"
+            self.old_log_path=path + ".log.old"
+            self.compact_every=compact_every
+            self.pending=0
+            self.last_error: Optional[Exception]=None
+            self._log=None
+            self._lock=threading.Lock()
+            self._compactor: Optional[threading.Thread]=None
+      def _watched(self) -> List[str]:
+            return [self.path, self.old_log_path, self.log_path]
+      def load(self) -> List[Task]:
+            loaded=super().load()
+            if os.path.exists(self.old_log_path):
+                  # a compaction from an older version never finished, fold everything into a fresh snapshot
+                  self.save(loaded)
+            return loaded
+      def _read(self) -> List[Task]:
+            tasks={t.id: t for t in super()._read()}
+            self.pending=0
+            for p in (self.old_log_path, self.log_path):
+                  self.pending += self._replay(p, tasks)
+            return list(tasks.values())
+      def iter(self) -> Iterator[Task]:
+            yield from self.load()
+      def _replay(self, path: str, tasks: dict) -> int:
+            if not os.path.exists(path):
+                  return 0
+            n=0
+            with open(path, "r", encoding="utf-8") as f:
+                  for line in f:
+                        try:
+                              rec=json.loads(line)
+                        except ValueError:
+                              continue
+                        if rec.get("op") == "put":
+                              t=task_from_dict(rec.get("task"))
+                              if t:
+                                    tasks.pop(t.id, None)
+                                    tasks[t.id]=t
+                        elif rec.get("op") == "del":
+                              tasks.pop(rec.get("id"), None)
+                        n += 1
+            return n
+      def _write(self, tasks: List[Task]) -> None:
+            with self._lock:
+                  self._close_log()
+                  super()._write(tasks)
+                  for p in (self.old_log_path, self.log_path):
+                        if os.path.exists(p):
+                              os.remove(p)
+                  self.pending=0
+      def save(self, tasks: List[Task], replace: bool=False) -> None:
+            self._wait_compactor()
+            super().save(tasks, replace)
+      def apply(self, tasks: List[Task], changed: Optional[List[Task]]=None, removed: Optional[List[str]]=None) -> None:
+            if changed is None and removed is None:
+                  self.save(tasks)
+                  return
+            lines=[json.dumps({"op": "put", "task": t.to_dict()}, ensure_ascii=False) for t in changed or ()]
+            lines += [json.dumps({"op": "del", "id": tid}) for tid in removed or ()]
+            if not lines:
+                  return
+            with self._sync_lock, self.lock():
+                  current=self._signature() == self._sig
+                  for tid in itertools.chain((t.id for t in changed or ()), removed or ()):
+                        # edited here after the remote edit arrived, so the local version wins
+                        self._remote.pop(tid, None)
+                  with self._lock:
+                        if self._log is not None and not self._log_is_current():
+                              # another process compacted and removed the log we hold open
+                              self._close_log()
+                        if self._log is None:
+                              self._log=open(self.log_path, "a", encoding="utf-8")
+                        self._log.write("\n".join(lines) + "\n")
+                        self._log.flush()
+                        self.pending += len(lines)
+                  for t in changed or ():
+                        self._base[t.id]=_state(t)
+                  for tid in removed or ():
+                        self._base.pop(tid, None)
+                  if current:
+                        # only our own append moved the files; other writers' changes still have to be polled
+                        self._sig=self._signature()
+            if self.pending >= self.compact_every:
+                  self.compact()
+      def compact(self) -> None:
+            """Fold the log into a new snapshot on a background thread"""
+            if self._compactor and self._compactor.is_alive():
+                  return
+            self._compactor=threading.Thread(target=self._write_snapshot, daemon=True)
+            self._compactor.start()
+      def _write_snapshot(self) -> None:
+            # the snapshot is rebuilt from the files, so edits other processes logged are kept too
+            try:
+                  with self._sync_lock, self.lock():
+                        current=self._signature() == self._sig
+                        self._write(self._read())
+                        if current:
+                              self._sig=self._signature()
+                  self.last_error=None
+            except Exception as e:
+                  self.last_error=e
+      def _wait_compactor(self) -> None:
+            if self._compactor:
+                  self._compactor.join()
+                  self._compactor=None
+      def _log_is_current(self) -> bool:
+            try:
+                  return os.path.samestat(os.fstat(self._log.fileno()), os.stat(self.log_path))
+            except OSError:
+                  return False
+      def _close_log(self) -> None:
+            if self._log is not None:
+                  self._log.close()
+                  self._log=None
+      def close(self) -> None:
+            self._wait_compactor()
+            with self._lock:
+                  self._close_log()
+
+class sqlitestorage(storage):
+      """SQLite task store; search, filter, sort and paging run as indexed queries"""
+      partial=True
+      SORT_COLUMNS={
+            "check": "(status = 'Done')",
+            "title": "title COLLATE PYLOWER",
+            "subject": "subject COLLATE PYLOWER",
+            "duedate": "due_ord",
+            "status": "status_rank",
+      }
+      def __init__(self, path: str, backup_dir: Optional[str]=None):
+            super().__init__(path)
+            # the backups/ folder next to the planner file; just "backups" for the app's planner.json
+            backup_dir=os.path.join(os.path.dirname(path), BACKUP_DIR) if backup_dir is None else backup_dir
+            self.db_path=os.path.splitext(path)[0] + ".db"
+            # the persistence worker writes while the Tk thread queries, so share one locked connection
+            self.conn=sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.create_collation("PYLOWER", _collate_lower)
+            self._lock=threading.RLock()
+            self.fts=self._create_schema()
+            if self._meta("migrated") is None:
+                  self.migrate(path, backup_dir)
+      def _create_schema(self) -> bool:
+            c=self.conn
+            with c:
+                  c.executescript("""
+                        CREATE TABLE IF NOT EXISTS meta(key TEXT PRIMARY KEY, value TEXT);
+                        CREATE TABLE IF NOT EXISTS tasks(
+                              seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                              id TEXT NOT NULL UNIQUE,
+                              title TEXT NOT NULL,
+                              subject TEXT NOT NULL,
+                              duedate TEXT NOT NULL,
+                              status TEXT NOT NULL,
+                              status_rank INTEGER NOT NULL,
+                              due_ord INTEGER NOT NULL DEFAULT 0,
+                              search TEXT NOT NULL DEFAULT '');
+                  """)
+                  if "due_ord" not in {r[1] for r in c.execute("PRAGMA table_info(tasks)")}:
+                        # databases from before the ordinal and search columns fill them in once
+                        c.execute("ALTER TABLE tasks ADD COLUMN due_ord INTEGER NOT NULL DEFAULT 0")
+                        c.execute("ALTER TABLE tasks ADD COLUMN search TEXT NOT NULL DEFAULT ''")
+                        c.executemany("UPDATE tasks SET due_ord = ?, search = ? WHERE seq = ?",
+                                      [(date_ordinal(due) or 0, _search_text(title, subject), seq)
+                                       for seq, title, subject, due in c.execute("SELECT seq, title, subject, duedate FROM tasks").fetchall()])
+                  c.executescript("""
+                        -- backups/*.json used to be copied here; the backup store holds them now
+                        DROP TABLE IF EXISTS backup_tasks;
+                        DROP INDEX IF EXISTS idx_tasks_duedate;
+                        DROP INDEX IF EXISTS idx_tasks_status;
+                        CREATE INDEX IF NOT EXISTS idx_tasks_due_ord ON tasks(due_ord);
+                        CREATE INDEX IF NOT EXISTS idx_tasks_status_due ON tasks(status, due_ord);
+                        -- NOCASE only folds ASCII, so É and é sorted apart from the in-memory views
+                        DROP INDEX IF EXISTS idx_tasks_subject;
+                        CREATE INDEX IF NOT EXISTS idx_tasks_subject_lower ON tasks(subject COLLATE PYLOWER);
+                  """)
+            try:
+                  with c:
+                        if [r[1] for r in c.execute("PRAGMA table_info(tasks_fts)")] not in ([], ["search"]):
+                              # the index used to hold title and subject as typed, which missed accents and case
+                              c.executescript("""
+                                    DROP TRIGGER IF EXISTS tasks_ai;
+                                    DROP TRIGGER IF EXISTS tasks_ad;
+                                    DROP TRIGGER IF EXISTS tasks_au;
+                                    DROP TABLE tasks_fts;
+                              """)
+                        fresh=c.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone() is None
+                        c.executescript("""
+                              CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+                                    search, content='tasks', content_rowid='seq', tokenize='trigram');
+                              CREATE TRIGGER IF NOT EXISTS tasks_ai AFTER INSERT ON tasks BEGIN
+                                    INSERT INTO tasks_fts(rowid, search) VALUES (new.seq, new.search);
+                              END;
+                              CREATE TRIGGER IF NOT EXISTS tasks_ad AFTER DELETE ON tasks BEGIN
+                                    INSERT INTO tasks_fts(tasks_fts, rowid, search) VALUES ('delete', old.seq, old.search);
+                              END;
+                              CREATE TRIGGER IF NOT EXISTS tasks_au AFTER UPDATE OF search ON tasks BEGIN
+                                    INSERT INTO tasks_fts(tasks_fts, rowid, search) VALUES ('delete', old.seq, old.search);
+                                    INSERT INTO tasks_fts(rowid, search) VALUES (new.seq, new.search);
+                              END;
+                        """)
+                        if fresh:
+                              c.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+                  return True
+            except sqlite3.OperationalError:
+                  # no FTS5 / trigram tokenizer in this sqlite build, searches fall back to LIKE
+                  return False
+      def _meta(self, key: str) -> Optional[str]:
+            row=self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+      def migrate(self, json_path: str, backup_dir: str) -> None:
+            """One-shot import of planner.json, and of the backups/ folder as backup store generations"""
+            tasks=storage(json_path).load()
+            paths=sorted(glob.glob(os.path.join(backup_dir, "*.json")), key=legacy_backup_time)
+            # a file at a time, so a long backup history isn't all in memory at once
+            BackupStore(os.path.join(backup_dir, "store")).import_generations(
+                  (legacy_backup_time(p), storage(p).load()) for p in paths)
+            with self.conn as c:
+                  self._upsert(tasks)
+                  c.execute("INSERT OR REPLACE INTO meta VALUES ('migrated', ?)", (datetime.now().isoformat(),))
+      @staticmethod
+      def _task(row) -> Task:
+            return Task(id=row[0], title=row[1], subject=row[2], duedate=row[3], status=row[4])
+      def lock(self, exclusive: bool=True):
+            # sqlite does its own file locking across processes
+            return self._lock
+      def _signature(self):
+            # bumped whenever another connection commits
+            with self._lock:
+                  return self.conn.execute("PRAGMA data_version").fetchone()[0]
+      def _read(self) -> List[Task]:
+            with self._lock:
+                  rows=self.conn.execute("SELECT id, title, subject, duedate, status FROM tasks ORDER BY seq").fetchall()
+            return [self._task(r) for r in rows]
+      def _upsert(self, tasks: List[Task]) -> None:
+            self.conn.executemany(
+                  """INSERT INTO tasks(id, title, subject, duedate, status, status_rank, due_ord, search) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                     ON CONFLICT(id) DO UPDATE SET title=excluded.title, subject=excluded.subject,
+                        duedate=excluded.duedate, status=excluded.status, status_rank=excluded.status_rank,
+                        due_ord=excluded.due_ord, search=excluded.search""",
+                  [(t.id, t.title, t.subject, t.duedate, t.status, statusorder.get(t.status, 999), t.due_ord, _search_text(t.title, t.subject))
+                   for t in tasks])
+      def save(self, tasks: List[Task], replace: bool=False) -> None:
+            with self._sync_lock, self._lock, self.conn as c:
+                  # take the write lock before reading so nobody commits between the merge and the write
+                  c.execute("BEGIN IMMEDIATE")
+                  if replace:
+                        self._forget_remote()
+                        self._write(tasks)
+                  else:
+                        # the table holds what we last read or wrote, unless another connection committed since
+                        held=self._base if self._signature() == self._sig else None
+                        tasks=self._reconcile(tasks)
+                        if held is None:
+                              held={t.id: _state(t) for t in self._read()}
+                        self._write_changes(tasks, held)
+                  # our own commit doesn't move data_version, another one right after it would
+                  self._seen(tasks)
+      def _write(self, tasks: List[Task]) -> None:
+            self.conn.execute("DELETE FROM tasks")
+            self._upsert(tasks)
+      def _write_changes(self, tasks: List[Task], held: dict) -> None:
+            """Make the table hold tasks, touching only the rows that differ from held ({id: state})"""
+            changed=[t for t in tasks if held.get(t.id) != _state(t)]
+            keep=set(map(_task_id, tasks))
+            removed=[(tid,) for tid in held if tid not in keep]
+            if removed:
+                  self.conn.executemany("DELETE FROM tasks WHERE id = ?", removed)
+            if changed:
+                  self._upsert(changed)
+      def apply(self, tasks: List[Task], changed: Optional[List[Task]]=None, removed: Optional[List[str]]=None) -> None:
+            if changed is None and removed is None:
+                  self.save(tasks)
+                  return
+            with self._sync_lock, self._lock, self.conn as c:
+                  for tid in itertools.chain((t.id for t in changed or ()), removed or ()):
+                        # edited here after the remote edit arrived, so the local version wins
+                        self._remote.pop(tid, None)
+                  if removed:
+                        c.executemany("DELETE FROM tasks WHERE id = ?", [(tid,) for tid in removed])
+                  if changed:
+                        self._upsert(changed)
+                  for t in changed or ():
+                        self._base[t.id]=_state(t)
+                  for tid in removed or ():
+                        self._base.pop(tid, None)
+      def _select(self, q: str, status: str, sort_key, reverse: bool, limit: Optional[int], offset: int):
+            where, params=self._where(q, status)
+            order=", ".join(f"{self.SORT_COLUMNS[col]} {'DESC' if desc else 'ASC'}" for col, desc in sort_spec(sort_key, reverse))
+            sql=(f"SELECT id, title, subject, duedate, status FROM tasks{where} "
+                 f"ORDER BY {order}, seq LIMIT ? OFFSET ?")
+            return sql, params + [-1 if limit is None else limit, offset]
+      def query(self, q: str="", status: str="ALL", sort_key="duedate", reverse: bool=False,
+                limit: Optional[int]=None, offset: int=0) -> List[Task]:
+            sql, params=self._select(q, status, sort_key, reverse, limit, offset)
+            with self._lock:
+                  rows=self.conn.execute(sql, params).fetchall()
+            return [self._task(r) for r in rows]
+      def iter_query(self, q: str="", status: str="ALL", sort_key="duedate", reverse: bool=False,
+                     limit: Optional[int]=None, offset: int=0) -> Iterator[Task]:
+            """query() as a stream, for exports that shouldn't hold every row at once"""
+            return self._stream(*self._select(q, status, sort_key, reverse, limit, offset))
+      def iter(self) -> Iterator[Task]:
+            return self._stream("SELECT id, title, subject, duedate, status FROM tasks ORDER BY seq")
+      def _stream(self, sql: str, params=()) -> Iterator[Task]:
+            # locked per batch rather than for the whole read, so a long export doesn't stall the persistence worker
+            with self._lock:
+                  cur=self.conn.execute(sql, params)
+            try:
+                  while True:
+                        with self._lock:
+                              rows=cur.fetchmany(STREAM_BATCH)
+                        if not rows:
+                              return
+                        yield from map(self._task, rows)
+            finally:
+                  cur.close()
+      def count(self, q: str="", status: str="ALL") -> int:
+            where, params=self._where(q, status)
+            with self._lock:
+                  return self.conn.execute(f"SELECT COUNT(*) FROM tasks{where}", params).fetchone()[0]
+      def _where(self, q: str, status: str):
+            clauses, params=[], []
+            # matched against the normalized search column, the way SearchIndex matches in memory
+            q=normalize(q.strip())
+            if q:
+                  if self.fts and len(q) >= 3:
+                        clauses.append("seq IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)")
+                        params.append('"' + q.replace('"', '""') + '"')
+                  else:
+                        clauses.append("search LIKE ? ESCAPE '\\'")
+                        params.append("%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+            if status and status != "ALL":
+                  clauses.append("status = ?")
+                  params.append(status)
+            return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+      def close(self) -> None:
+            with self._lock:
+                  self.conn.close()
+
+class PersistWorker:
+      """Single writer thread; saves requested within window_ms are merged into one write"""
+      def __init__(self, store: storage, window_ms: int=PERSIST_WINDOW_MS):
+            self.storage=store
+            self.window=window_ms / 1000
+            self.requests=0
+            self.writes=0
+            self.coalesced=0
+            self.failures=0
+            self.last_latency=0.0
+            self.max_latency=0.0
+            self.total_latency=0.0
+            self._cond=threading.Condition()
+            self._tasks: Optional[List[Task]]=None
+            self._full=False
+            self._replace=False
+            self._changed: dict={}
+            self._removed: set=set()
+            self._dirty_since: Optional[float]=None
+            # extra wait after a failed write, doubled per failure in a row
+            self._backoff=0.0
+            self._flush_now=False
+            self._stopping=False
+            self._requested=0
+            self._written=0
+            self._errors: List[Exception]=[]
+            self._thread=threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+      def submit(self, tasks, changed: Optional[List[Task]]=None, removed: Optional[List[str]]=None, replace: bool=False) -> None:
+            """Queue a save; same arguments as storage.apply, with None/None meaning a full save
+
+            replace makes it a full save that overwrites the file instead of merging, e.g. a restore.
+            tasks is only copied when the write will need all of them, so an edit on an engine
+            that writes change sets costs the calling thread nothing but the change itself.
+            """
+            full=replace or (changed is None and removed is None)
+            # reading _full unlocked is fine: a stale True copies for nothing, a stale False is covered by the deltas
+            snapshot=list(tasks) if full or self._full or not self.storage.partial else None
+            with self._cond:
+                  self.requests += 1
+                  if self._dirty_since is not None:
+                        self.coalesced += 1
+                  if snapshot is not None:
+                        self._tasks=snapshot
+                  if full:
+                        self._full=True
+                        self._replace=self._replace or replace
+                        self._changed.clear()
+                        self._removed.clear()
+                  else:
+                        # kept during a pending full save too, in case that save fails and is retried from an older snapshot
+                        for t in changed or ():
+                              self._changed[t.id]=t
+                              self._removed.discard(t.id)
+                        for tid in removed or ():
+                              self._changed.pop(tid, None)
+                              self._removed.add(tid)
+                  self._mark_dirty()
+      def _mark_dirty(self) -> None:
+            self._requested += 1
+            if self._dirty_since is None:
+                  self._dirty_since=time.monotonic()
+            self._cond.notify_all()
+      @property
+      def pending(self) -> int:
+            with self._cond:
+                  return self._requested - self._written
+      def stats(self) -> dict:
+            with self._cond:
+                  return {
+                        "requests": self.requests,
+                        "writes": self.writes,
+                        "coalesced": self.coalesced,
+                        "queued": self._requested - self._written,
+                        "failures": self.failures,
+                        "last_ms": self.last_latency * 1000,
+                        "max_ms": self.max_latency * 1000,
+                        "avg_ms": self.total_latency / self.writes * 1000 if self.writes else 0.0,
+                  }
+      def take_errors(self) -> List[Exception]:
+            with self._cond:
+                  errors, self._errors=self._errors, []
+                  return errors
+      def flush(self, timeout: Optional[float]=None) -> bool:
+            """Write anything pending now; True once everything requested so far is on disk"""
+            deadline=None if timeout is None else time.monotonic() + timeout
+            with self._cond:
+                  target=self._requested
+                  failures=self.failures
+                  if self._written < target and self._dirty_since is None:
+                        self._dirty_since=time.monotonic()
+                  self._flush_now=True
+                  self._cond.notify_all()
+                  while self._written < target:
+                        if self.failures > failures:
+                              return False
+                        left=None if deadline is None else deadline - time.monotonic()
+                        if left is not None and left <= 0:
+                              return False
+                        self._cond.wait(left)
+                  return True
+      def stop(self, timeout: Optional[float]=None) -> bool:
+            ok=self.flush(timeout)
+            with self._cond:
+                  self._stopping=True
+                  self._cond.notify_all()
+            self._thread.join(timeout)
+            return ok
+      def _run(self) -> None:
+            while True:
+                  with self._cond:
+                        while self._dirty_since is None and not self._stopping:
+                              self._cond.wait()
+                        if self._dirty_since is None:
+                              return
+                        while not (self._flush_now or self._stopping):
+                              left=self._dirty_since + self.window + self._backoff - time.monotonic()
+                              if left <= 0:
+                                    break
+                              self._cond.wait(left)
+                        tasks, full, replace=self._tasks, self._full, self._replace
+                        changed, removed=list(self._changed.values()), list(self._removed)
+                        target=self._requested
+                        self._tasks=None
+                        self._full=False
+                        self._replace=False
+                        self._changed.clear()
+                        self._removed.clear()
+                        self._dirty_since=None
+                        self._flush_now=False
+                  if full and (changed or removed):
+                        # edits that came after the snapshot, when a failed full save is retried
+                        tasks=_with_changes(tasks, changed, removed)
+                  start=time.perf_counter()
+                  try:
+                        if full:
+                              self.storage.save(tasks, replace)
+                        else:
+                              self.storage.apply(tasks, changed, removed)
+                  except Exception as e:
+                        with self._cond:
+                              self.failures += 1
+                              self._errors.append(e)
+                              # keep the lost batch for the retry, behind anything submitted since
+                              self._full=self._full or full
+                              self._replace=self._replace or replace
+                              if self._tasks is None:
+                                    self._tasks=tasks
+                              for t in changed:
+                                    if t.id not in self._removed:
+                                          self._changed.setdefault(t.id, t)
+                              self._removed.update(tid for tid in removed if tid not in self._changed)
+                              # retried on its own, not only on the next edit, unless we're shutting down
+                              self._backoff=min(max(self._backoff * 2, self.window), PERSIST_RETRY_MAX_MS / 1000)
+                              if self._dirty_since is None and not self._stopping:
+                                    self._dirty_since=time.monotonic()
+                              self._cond.notify_all()
+                        continue
+                  elapsed=time.perf_counter() - start
+                  metrics.observe("storage.save" if full else "storage.apply", elapsed)
+                  with self._cond:
+                        self.writes += 1
+                        self._backoff=0.0
+                        self.last_latency=elapsed
+                        self.max_latency=max(self.max_latency, elapsed)
+                        self.total_latency += elapsed
+                        self._written=max(self._written, target)
+                        self._cond.notify_all()
+
+STORAGE_ENGINES={"json": storage, "journal": journalstorage, "sqlite": sqlitestorage}
+
+def open_storage(path: str, engine: str=STORAGE_ENGINE, fmt: str=STORAGE_FORMAT) -> storage:
+      if fmt == "jsonl" and engine != "sqlite":
+            path=os.path.splitext(path)[0] + ".jsonl"
+      return STORAGE_ENGINES.get(engine, storage)(path)
@@ -0,0 +1,164 @@
+"""Subject hierarchy and #tags, indexed from each group to the tasks filed under it
+
+Subjects nest with "/": a task in "Math/Calculus" is in "Math" too. Tags are #words in
+a task's title, as many as it has. Both live in fields tasks already have, so every
+storage engine, the CSV format and the API carry them unchanged.
+"""
+import re
+
+from typing import Dict, List, Optional, Set, Tuple
+
+from planner.core import Task, normalize
+
+
+SUBJECT_SEP="/"
+TAG_PREFIX="#"
+TAGS_KEY="#"
+NO_SUBJECT="(no subject)"
+_TAG_RE=re.compile(r"(?<![\w#])#(\w[\w\-/]*)")
+
+def subject_parts(subject: str) -> List[str]:
+      """"Math / Calculus" -> ["Math", "Calculus"]"""
+      parts=[p.strip() for p in subject.split(SUBJECT_SEP)]
+      return [p for p in parts if p] or [NO_SUBJECT]
+
+def task_tags(title: str) -> List[str]:
+      """Tags written in a title, without the #, first spelling of each"""
+      if TAG_PREFIX not in title:
+            return []
+      seen={}
+      for tag in _TAG_RE.findall(title):
+            tag=tag.rstrip(SUBJECT_SEP + "-")
+            seen.setdefault(normalize(tag), tag)
+      return list(seen.values())
+
+def group_key(label: str) -> str:
+      """Index key of a subject path or #tag as typed: casefolded, accents and spacing ignored"""
+      label=label.strip()
+      if label.startswith(TAG_PREFIX):
+            return TAG_PREFIX + normalize(label[len(TAG_PREFIX):].strip())
+      return SUBJECT_SEP.join(normalize(p) for p in subject_parts(label))
+
+def parent_key(key: str) -> str:
+      """Key of the group one level up; "" for top-level subjects, TAGS_KEY for tags"""
+      if key.startswith(TAG_PREFIX):
+            return TAGS_KEY
+      return key.rpartition(SUBJECT_SEP)[0]
+
+class TagIndex:
+      """Inverted index from every subject path prefix and tag to the tasks under it
+
+      Kept current from TaskCollection events; an edit only refiles the task when its
+      subject or tags changed. A lookup is one dict access rather than a scan.
+      """
+      def __init__(self):
+            self.groups: Dict[str, Dict[str, Task]]={}
+            # tasks whose subject is exactly the path, without those in subgroups
+            self.exact: Dict[str, Dict[str, Task]]={}
+            self.labels: Dict[str, str]={}
+            self.children: Dict[str, Set[str]]={"": set(), TAGS_KEY: set()}
+            self._filed: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]]={}
+            # subjects repeat across many tasks, so their paths are split and normalized once
+            self._paths: Dict[str, Tuple[Tuple[str, ...], List[str]]]={}
+      def __len__(self) -> int:
+            return len(self._filed)
+      def _subject_keys(self, subject: str):
+            cached=self._paths.get(subject)
+            if cached is None:
+                  parts=subject_parts(subject)
+                  norm=[normalize(p) for p in parts]
+                  cached=self._paths[subject]=(tuple(SUBJECT_SEP.join(norm[:i + 1]) for i in range(len(norm))),
+                                               [SUBJECT_SEP.join(parts[:i + 1]) for i in range(len(parts))])
+            return cached
+      def _group(self, key: str, label: str) -> Dict[str, Task]:
+            group=self.groups.get(key)
+            if group is None:
+                  group=self.groups[key]={}
+                  self.labels[key]=label
+                  self.children.setdefault(parent_key(key), set()).add(key)
+            return group
+      def rebuild(self, tasks: List[Task]) -> None:
+            """Refile everything, a subject at a time so most of the work is dict.update"""
+            self.__init__()
+            by_subject: Dict[str, List[Task]]={}
+            for t in tasks:
+                  members=by_subject.get(t.subject)
+                  if members is None:
+                        members=by_subject[t.subject]=[]
+                  members.append(t)
+            for subject, members in by_subject.items():
+                  paths, labels=self._subject_keys(subject)
+                  entries={t.id: t for t in members}
+                  for key, label in zip(paths, labels):
+                        self._group(key, label).update(entries)
+                  self.exact.setdefault(paths[-1], {}).update(entries)
+                  self._filed.update(dict.fromkeys(entries, (paths, ())))
+                  for t in members:
+                        if TAG_PREFIX in t.title:
+                              self._tag(t, paths)
+      def _tag(self, t: Task, paths) -> None:
+            tags=task_tags(t.title)
+            keys=tuple(TAG_PREFIX + normalize(tag) for tag in tags)
+            for key, tag in zip(keys, tags):
+                  self._group(key, TAG_PREFIX + tag)[t.id]=t
+            self._filed[t.id]=(paths, keys)
+      def add(self, t: Task) -> None:
+            paths, labels=self._subject_keys(t.subject)
+            for key, label in zip(paths, labels):
+                  self._group(key, label)[t.id]=t
+            self.exact.setdefault(paths[-1], {})[t.id]=t
+            self._filed[t.id]=(paths, ())
+            if TAG_PREFIX in t.title:
+                  self._tag(t, paths)
+      def remove(self, tid: str) -> None:
+            filed=self._filed.pop(tid, None)
+            if filed is None:
+                  return
+            paths, tags=filed
+            exact=self.exact.get(paths[-1])
+            if exact is not None:
+                  exact.pop(tid, None)
+                  if not exact:
+                        del self.exact[paths[-1]]
+            for key in paths + tags:
+                  group=self.groups.get(key)
+                  if group is None:
+                        continue
+                  group.pop(tid, None)
+                  if not group:
+                        del self.groups[key]
+                        del self.labels[key]
+                        self.children.get(parent_key(key), set()).discard(key)
+                        self.children.pop(key, None)
+      def update(self, t: Task) -> None:
+            paths, _=self._subject_keys(t.subject)
+            tags=tuple(TAG_PREFIX + normalize(tag) for tag in task_tags(t.title))
+            if self._filed.get(t.id) == (paths, tags):
+                  # same groups; the entries already hold this task object
+                  for key in paths + tags:
+                        self.groups[key][t.id]=t
+                  self.exact[paths[-1]][t.id]=t
+                  return
+            self.remove(t.id)
+            self.add(t)
+      def on_change(self, kind: str, changed: List[Task], removed: List[str]) -> None:
+            if kind in ("load", "reset"):
+                  self.rebuild(changed)
+                  return
+            for tid in removed:
+                  self.remove(tid)
+            for t in changed:
+                  self.update(t)
+      def lookup(self, label: str) -> Dict[str, Task]:
+            """Tasks in a subject (subgroups included) or with a #tag, by id"""
+            return self.groups.get(group_key(label), {})
+      def top_subject(self, tid: str) -> Optional[str]:
+            filed=self._filed.get(tid)
+            return filed[0][0] if filed else None
+      def subgroups(self, key: str="") -> List[str]:
+            """Keys of the groups directly under key, by label; "" is the top level, TAGS_KEY the tags"""
+            return sorted(self.children.get(key, ()), key=lambda k: normalize(self.labels[k]))
+      def options(self) -> List[str]:
+            """Every subject path, then every tag, as labels for a filter"""
+            subjects=sorted((k for k in self.groups if not k.startswith(TAG_PREFIX)), key=lambda k: normalize(self.labels[k]))
+            return [self.labels[k] for k in subjects] + [self.labels[k] for k in self.subgroups(TAGS_KEY)]
@@ -0,0 +1,94 @@
+"""TaskStats' running counters against a full recount after every kind of change"""
+import random
+
+from datetime import date
+
+from planner.core import Task, TaskCollection, statusoptions
+from planner.stats import TaskStats
+
+
+TODAY=date(2026, 3, 10).toordinal()
+
+def due(offset: int) -> str:
+      return date.fromordinal(TODAY + offset).strftime("%Y/%m/%d")
+
+def make(i: int, subject: str="Maths", offset: int=0, status: str="To Do") -> Task:
+      return Task(id=f"t{i}", title=f"task {i}", subject=subject, duedate=due(offset), status=status)
+
+def tracked(tasks=()):
+      coll=TaskCollection()
+      stats=TaskStats(TODAY)
+      coll.subscribe(stats.on_change)
+      coll.load(list(tasks))
+      return coll, stats
+
+def test_load_counts_every_bucket():
+      coll, stats=tracked([make(0, offset=-2), make(1, offset=0), make(2, offset=3), make(3, offset=30), make(4, offset=-5, status="Done")])
+      assert stats.by_bucket == {"overdue": 1, "today": 1, "next 7 days": 1, "later": 1}
+      assert stats.verify(coll) == []
+
+def test_add_edit_delete():
+      coll, stats=tracked([make(i, offset=i) for i in range(5)])
+      coll.add(make(10, subject="Physics", offset=-1))
+      coll.add_many([make(11, subject="Physics"), make(12, subject="Art", status="In progress")])
+      assert stats.verify(coll) == []
+      coll.update("t0", subject="Chemistry", duedate=due(12))
+      coll.update("t10", title="renamed")
+      assert stats.verify(coll) == []
+      coll.remove("t1")
+      coll.remove_many(["t2", "t12", "missing"])
+      assert stats.verify(coll) == []
+      assert stats.total == len(coll)
+
+def test_toggle_status():
+      coll, stats=tracked([make(i, subject="Maths" if i % 2 else "Art", offset=i - 3) for i in range(8)])
+      coll.update("t1", status="Done")
+      coll.update("t1", status="To Do")
+      coll.update("t2", status="Done")
+      assert stats.verify(coll) == []
+      coll.set_status([t.id for t in coll], "Done")
+      assert stats.by_bucket == dict.fromkeys(stats.by_bucket, 0)
+      assert stats.verify(coll) == []
+      coll.set_status(["t3", "t4"], "In progress")
+      assert stats.verify(coll) == []
+
+def test_merge_from_another_process():
+      coll, stats=tracked([make(i, offset=i) for i in range(6)])
+      theirs=[make(0, subject="History", offset=-4, status="Done"), make(1, offset=1), make(20, subject="History", offset=2)]
+      coll.merge(theirs, ["t3", "t4"])
+      assert stats.verify(coll) == []
+      assert stats.by_subject["History"] == 2
+
+def test_replace_and_new_day():
+      coll, stats=tracked([make(i, offset=i) for i in range(6)])
+      coll.replace([make(i, subject="Art", offset=i - 6) for i in range(3)])
+      assert stats.verify(coll) == []
+      stats.set_today(TODAY + 4)
+      assert stats.verify(coll) == []
+
+def test_random_sequence():
+      rng=random.Random(7)
+      coll, stats=tracked([make(i, subject=rng.choice(["Maths", "Art", "Physics"]), offset=rng.randint(-10, 20)) for i in range(200)])
+      next_id=200
+      for step in range(2000):
+            ids=[t.id for t in coll]
+            op=rng.randrange(6)
+            if op == 0 or not ids:
+                  coll.add(make(next_id, subject=rng.choice(["Maths", "Art", "Biology"]), offset=rng.randint(-10, 20)))
+                  next_id += 1
+            elif op == 1:
+                  coll.remove(rng.choice(ids))
+            elif op == 2:
+                  coll.update(rng.choice(ids), status=rng.choice(statusoptions), duedate=due(rng.randint(-10, 20)))
+            elif op == 3:
+                  coll.set_status(rng.sample(ids, min(5, len(ids))), rng.choice(statusoptions))
+            elif op == 4:
+                  tid=rng.choice(ids)
+                  coll.merge([Task(tid, "merged", rng.choice(["Maths", "Chemistry"]), due(rng.randint(-5, 5)), rng.choice(statusoptions))],
+                             [rng.choice(ids)] if rng.random() < 0.3 else [])
+            else:
+                  coll.update(rng.choice(ids), subject=rng.choice(["Maths", "Art", "Physics", "Biology"]))
+            if step % 100 == 0:
+                  assert stats.verify(coll) == [], step
+      stats.set_today(TODAY + 2)
+      assert stats.verify(coll) == []
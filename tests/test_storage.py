@@ -0,0 +1,186 @@
+"""Two stores on one planner file: merges on save, remote edits through poll(), restores"""
+import pytest
+
+from planner.backup import BackupStore
+from planner.core import Task, filter_sort
+from planner.storage import PersistWorker, open_storage
+
+
+ENGINES=["json", "journal", "sqlite"]
+
+def make(i: int, title: str="") -> Task:
+      return Task(id=f"t{i}", title=title or f"task {i}", subject="Maths", duedate=f"2026/03/{i + 1:02d}")
+
+def ids(tasks) -> list:
+      return sorted(t.id for t in tasks)
+
+def by_id(tasks) -> dict:
+      return {t.id: t for t in tasks}
+
+@pytest.fixture(params=ENGINES)
+def stores(request, tmp_path):
+      """Two processes' views of one planner file, both loaded with t0..t3"""
+      path=str(tmp_path / "planner.json")
+      seed=open_storage(path, request.param)
+      seed.save([make(i) for i in range(4)], replace=True)
+      seed.close()
+      a, b=open_storage(path, request.param), open_storage(path, request.param)
+      yield a, b, lambda: open_storage(path, request.param)
+      a.close()
+      b.close()
+
+def edit(tasks, tid: str, **fields) -> Task:
+      t=by_id(tasks)[tid]
+      for name, value in fields.items():
+            setattr(t, name, value)
+      return t
+
+def test_not_changed_before_load(tmp_path):
+      store=open_storage(str(tmp_path / "planner.json"), "json")
+      store.save([make(0)], replace=True)
+      other=open_storage(str(tmp_path / "planner.json"), "json")
+      assert not other.changed()
+      assert other.poll([]) is None
+
+def test_concurrent_edits_merge(stores):
+      a, b, reopen=stores
+      mine, theirs=a.load(), b.load()
+      a.apply(mine, [edit(mine, "t0", title="edited by a")], [])
+      assert b.changed()
+      b.apply(theirs, [edit(theirs, "t1", title="edited by b")], [])
+      on_disk=by_id(reopen().load())
+      assert on_disk["t0"].title == "edited by a"
+      assert on_disk["t1"].title == "edited by b"
+      changed, removed=b.poll(theirs)
+      assert [t.title for t in changed] == ["edited by a"] and removed == []
+      assert not b.changed()
+
+def test_remote_add(stores):
+      a, b, reopen=stores
+      mine, theirs=a.load(), b.load()
+      mine.append(make(9))
+      a.apply(mine, [mine[-1]], [])
+      changed, removed=b.poll(theirs)
+      assert ids(changed) == ["t9"] and removed == []
+      # a full save from b before it merged the add keeps it
+      b.save(theirs)
+      assert "t9" in ids(reopen().load())
+
+def test_remote_delete(stores):
+      a, b, reopen=stores
+      mine, theirs=a.load(), b.load()
+      a.apply([t for t in mine if t.id != "t2"], [], ["t2"])
+      # b still holds t2 untouched, saving its snapshot doesn't bring it back
+      b.save(theirs)
+      assert ids(reopen().load()) == ["t0", "t1", "t3"]
+      changed, removed=b.poll(theirs)
+      assert changed == [] and removed == ["t2"]
+
+def test_conflict_local_edit_wins(stores):
+      a, b, reopen=stores
+      mine, theirs=a.load(), b.load()
+      a.apply(mine, [edit(mine, "t0", title="a's version")], [])
+      b.save([edit(theirs, "t0", title="b's version")] + [t for t in theirs if t.id != "t0"])
+      assert by_id(reopen().load())["t0"].title == "b's version"
+
+def test_unpolled_remote_edit_survives_full_save(stores):
+      a, b, reopen=stores
+      mine, theirs=a.load(), b.load()
+      a.apply(mine, [edit(mine, "t3", status="Done")], [])
+      b.save(theirs + [make(7)])
+      on_disk=by_id(reopen().load())
+      assert on_disk["t3"].status == "Done"
+      assert "t7" in on_disk
+
+def test_save_after_restore_replaces(stores):
+      a, b, reopen=stores
+      mine, theirs=a.load(), b.load()
+      mine.append(make(8))
+      a.apply(mine, [mine[-1]], [])
+      # b polls the add, then restores an older generation holding only t0
+      b.poll(theirs)
+      b.save([make(0)], replace=True)
+      assert ids(reopen().load()) == ["t0"]
+      assert b.poll([make(0)]) is None
+
+def test_load_forgets_queued_remote_edits(stores):
+      a, b, reopen=stores
+      mine, theirs=a.load(), b.load()
+      mine.append(make(5))
+      a.apply(mine, [mine[-1]], [])
+      b.save(theirs)
+      reloaded=b.load()
+      assert "t5" in ids(reloaded)
+      b.save([t for t in reloaded if t.id != "t5"], replace=True)
+      assert "t5" not in ids(reopen().load())
+
+def test_sqlite_migrates_old_backups(tmp_path):
+      path=str(tmp_path / "planner.json")
+      open_storage(path, "json").save([make(i) for i in range(3)], replace=True)
+      (tmp_path / "backups").mkdir()
+      for stamp, n in (("2026-01-10-13-45-42", 2), ("2026-01-10-13-33-26", 1)):
+            open_storage(str(tmp_path / "backups" / f"planner-{stamp}.json"), "json").save([make(i) for i in range(n)], replace=True)
+      store=open_storage(path, "sqlite")
+      assert ids(store.load()) == ["t0", "t1", "t2"]
+      backups=BackupStore(str(tmp_path / "backups" / "store"))
+      gens=backups.generations()
+      assert [g["time"] for g in gens] == ["2026-01-10T13:33:26", "2026-01-10T13:45:42"]
+      assert [len(backups.restore(g["name"])) for g in gens] == [1, 2]
+      store.close()
+      # reopening doesn't import them again
+      open_storage(path, "sqlite").close()
+      assert len(backups.generations()) == 2
+
+def test_sqlite_sorts_like_memory(tmp_path):
+      titles=["école", "Zebra", "Éclair", "apple", "ÉCOLE", "Ärger", "zeta", "Apple", "öl", "Oslo"]
+      tasks=[Task(id=f"t{i}", title=t, subject=t[::-1], duedate="2026/03/01") for i, t in enumerate(titles)]
+      store=open_storage(str(tmp_path / "planner.json"), "sqlite")
+      store.save(tasks, replace=True)
+      for spec in ([("title", False)], [("title", True)], [("subject", False), ("title", True)]):
+            assert [t.id for t in store.query(sort_key=spec)] == [t.id for t in filter_sort(tasks, sort_key=spec)], spec
+      store.close()
+
+class Counted(list):
+      """A task list that counts how often it is copied"""
+      copies=0
+      def __iter__(self):
+            Counted.copies += 1
+            return super().__iter__()
+
+def reopen_loaded(store, engine):
+      store.close()
+      return open_storage(store.path, engine).load()
+
+@pytest.mark.parametrize("engine", ["journal", "sqlite"])
+def test_worker_copies_tasks_only_for_full_saves(tmp_path, engine):
+      store=open_storage(str(tmp_path / "planner.json"), engine)
+      tasks=Counted(make(i) for i in range(4))
+      worker=PersistWorker(store, window_ms=0)
+      Counted.copies=0
+      for i in range(3):
+            tasks[1].title=f"edit {i}"
+            worker.submit(tasks, [tasks[1]], [])
+      assert worker.flush(5)
+      assert Counted.copies == 0
+      worker.submit(tasks)
+      assert worker.stop(5)
+      assert Counted.copies == 1
+      assert by_id(reopen_loaded(store, engine))["t1"].title == "edit 2"
+
+def test_failed_full_save_keeps_later_edits(tmp_path):
+      store=open_storage(str(tmp_path / "planner.json"), "sqlite")
+      worker=PersistWorker(store, window_ms=0)
+      save, failed=store.save, []
+      def flaky(tasks, replace=False):
+            if not failed:
+                  failed.append(True)
+                  # an edit lands while the full save is under way, then the save fails
+                  worker.submit(tasks, [make(9)], ["t0"])
+                  raise OSError("disk full")
+            save(tasks, replace)
+      store.save=flaky
+      worker.submit([make(i) for i in range(3)], replace=True)
+      worker.flush(5)
+      assert worker.stop(5)
+      assert [type(e) for e in worker.take_errors()] == [OSError]
+      assert ids(reopen_loaded(store, "sqlite")) == ["t1", "t2", "t9"]